@@ -0,0 +1,113 @@
+"""
+Contexto de embeddings de un mensaje
+====================================
+Un mensaje de /chat pasa por varias búsquedas vectoriales (FAQ y funciones,
+por cláusula y del mensaje completo). El contexto guarda el embedding del
+mensaje por modelo, de modo que se calcula una sola vez por solicitud y se
+pasa a cada búsqueda.
+
+Además hay un LRU por proceso de (modelo, mensaje normalizado) → embedding:
+las frases repetidas ("hola", "productos más vendidos") no se vuelven a
+codificar. Tamaño configurable con EMBEDDINGS_LRU_TAMANO (0 lo desactiva).
+
+Métricas (GET /api/metrics):
+    embeddings_lru_aciertos, embeddings_lru_fallos, embeddings_lru_tamano
+
+USO:
+    contexto = ContextoEmbedding(mensaje)
+    caller.consultar_faq(mensaje, contexto=contexto)
+    caller.identificar_funcion(mensaje, contexto=contexto)   # no vuelve a codificar
+"""
+
+import os
+import re
+import threading
+import unicodedata
+from collections import OrderedDict
+from typing import Callable, Dict, Hashable, List, Optional
+
+from endpoint import metricas
+
+TAMANO_LRU_POR_DEFECTO = 2048
+
+
+def normalizar_mensaje(mensaje: str) -> str:
+    """
+    Forma canónica del mensaje: minúsculas, espacios colapsados y sin signos
+    de puntuación en los extremos ("¿Hola?" y "hola" comparten embedding).
+    Los acentos se conservan porque cambian el significado en español.
+    """
+    texto = unicodedata.normalize("NFC", mensaje or "").lower()
+    texto = re.sub(r"\s+", " ", texto).strip()
+    return texto.strip("¿?¡!.,;: ")
+
+
+class LRUEmbeddings:
+    """Diccionario LRU acotado y seguro entre hilos."""
+
+    def __init__(self, capacidad: int):
+        self.capacidad = capacidad
+        self._datos: "OrderedDict[Hashable, List[float]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def obtener(self, clave: Hashable) -> Optional[List[float]]:
+        with self._lock:
+            vector = self._datos.get(clave)
+            if vector is not None:
+                self._datos.move_to_end(clave)
+        metricas.incrementar("embeddings_lru_aciertos" if vector is not None else "embeddings_lru_fallos")
+        return vector
+
+    def guardar(self, clave: Hashable, vector: List[float]):
+        if self.capacidad <= 0:
+            return
+        with self._lock:
+            self._datos[clave] = vector
+            self._datos.move_to_end(clave)
+            while len(self._datos) > self.capacidad:
+                self._datos.popitem(last=False)
+            tamano = len(self._datos)
+        metricas.fijar("embeddings_lru_tamano", tamano)
+
+    def limpiar(self):
+        with self._lock:
+            self._datos.clear()
+        metricas.fijar("embeddings_lru_tamano", 0)
+
+
+lru_embeddings = LRUEmbeddings(int(os.getenv("EMBEDDINGS_LRU_TAMANO", TAMANO_LRU_POR_DEFECTO)))
+
+
+class ContextoEmbedding:
+    """Embeddings de un mensaje, calculados una vez por modelo y solicitud."""
+
+    def __init__(self, mensaje: str):
+        self.mensaje = mensaje
+        self.normalizado = normalizar_mensaje(mensaje)
+        self._vectores: Dict[str, List[float]] = {}
+        self._lock = threading.Lock()
+
+    def vector(self, modelo: str, codificar: Callable[[str], List[float]]) -> List[float]:
+        """
+        Embedding del mensaje con `modelo`.
+
+        Se codifica el mensaje original, como antes del LRU (el modelo distingue
+        mayúsculas y los umbrales de FAQ y funciones están ajustados a eso); la
+        forma normalizada solo es la clave del LRU.
+
+        Args:
+            modelo: Nombre del modelo (clave del LRU; modelos distintos no comparten vectores)
+            codificar: Función texto → vector, usada solo si no está en el contexto ni en el LRU
+        """
+        with self._lock:
+            vector = self._vectores.get(modelo)
+            if vector is not None:
+                return vector
+
+            clave = (modelo, self.normalizado)
+            vector = lru_embeddings.obtener(clave)
+            if vector is None:
+                vector = list(codificar(self.mensaje))
+                lru_embeddings.guardar(clave, vector)
+            self._vectores[modelo] = vector
+            return vector
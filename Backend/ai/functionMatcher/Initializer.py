@@ -405,12 +405,31 @@ def indexar_faqs():
 # 5. FUNCIÓN PRINCIPAL DE INICIALIZACIÓN
 # ============================================
 
-def initialize_chatbot_db(force_reindex: bool = False):
+def prerenderizar_audio(forzar: bool = False):
+    """
+    Genera audio y lipsync de las respuestas regex y de FAQ_DATA (lipsync/prerender.py).
+
+    Es opcional: sin gTTS/Rhubarb o sin red solo se avisa, y esas respuestas
+    se sintetizarán en la primera solicitud.
+    """
+    try:
+        from lipsync.prerender import prerenderizar_respuestas_fijas
+    except ImportError as e:
+        print(f"⚠ Pre-render de audio omitido (ejecuta desde Backend/ con las dependencias de audio): {e}")
+        return
+    try:
+        prerenderizar_respuestas_fijas(FAQ_DATA, "faq_knowledge", forzar=forzar)
+    except Exception as e:
+        print(f"⚠ Pre-render de audio fallido: {e}")
+
+
+def initialize_chatbot_db(force_reindex: bool = False, prerender_audio: bool = True):
     """
     Función principal para inicializar todo el sistema
     
     Args:
         force_reindex: Si True, re-indexa todo (útil después de cambios)
+        prerender_audio: Si generar el audio y lipsync de las respuestas fijas
     """
     print("\n" + "="*70)
     print("INICIALIZANDO SISTEMA DE CHATBOT EN POSTGRESQL")
@@ -440,6 +459,10 @@ def initialize_chatbot_db(force_reindex: bool = False):
         
         indexar_faqs()
         
+        # Paso 4: Audio y lipsync de las respuestas fijas
+        if prerender_audio:
+            prerenderizar_audio(forzar=force_reindex)
+        
         print("\n" + "="*70)
         print("✅ INICIALIZACIÓN COMPLETA")
         print("="*70)
@@ -6,6 +6,7 @@ from sqlalchemy.dialects.postgresql import UUID
 import pandas as pd
 import os
 import uuid
+import tempfile
 
 # ============================================
 # CONFIGURACIÓN DE BASE DE DATOS
@@ -148,46 +149,87 @@ def least_selling():
 
 
 
-def generate_csv(month=None):
+# Filas por bloque al leer registros para reportes (progreso y memoria acotada)
+TAMANO_BLOQUE_REPORTE = 20000
+
+
+def _rango_reporte(month=None):
+    """(inicio, fin) del mes "YYYY-MM" indicado o de los últimos 30 días."""
+    if month:
+        año, mes = map(int, month.split("-"))
+        inicio = datetime(año, mes, 1)
+        if mes == 12:
+            fin = datetime(año + 1, 1, 1)
+        else:
+            fin = datetime(año, mes + 1, 1)
+    else:
+        fin = datetime.now()
+        inicio = fin - timedelta(days=30)
+    return inicio, fin
+
+
+def _bloques_reporte(session, inicio, fin, progreso=None, tramo=1.0):
+    """
+    Lee los registros del rango en bloques de TAMANO_BLOQUE_REPORTE filas.
+
+    Si se indica `progreso(fraccion, mensaje)` se llama tras cada bloque, con
+    la fracción escalada a `tramo` (el resto queda para la escritura).
+    """
+    query = (
+        session.query(
+            RegistroInventario.id,
+            RegistroInventario.product_id,
+            RegistroInventario.created_at,
+            RegistroInventario.quantity_available,
+            RegistroInventario.ventas_diarias,
+            RegistroInventario.total_value
+        )
+        .filter(RegistroInventario.created_at >= inicio)
+        .filter(RegistroInventario.created_at < fin)
+        .order_by(RegistroInventario.created_at)
+    )
+    total = query.count() if progreso is not None else None
+    leidas = 0
+    bloques = pd.read_sql(query.statement, session.bind, chunksize=TAMANO_BLOQUE_REPORTE)
+    for bloque in bloques:
+        leidas += len(bloque)
+        if progreso is not None:
+            progreso(tramo * leidas / max(total, 1), f"{leidas:,} de {total:,} registros")
+        yield bloque
+
+
+def generate_csv(month=None, progreso=None):
     """
     Genera un archivo CSV con los registros del último mes o del mes especificado.
     Retorna la ruta del archivo generado.
     
     Args:
         month: String en formato "YYYY-MM" (ej: "2024-12") o None para último mes
+        progreso: Función opcional progreso(fraccion, mensaje), llamada por bloque
     """
     session = SessionLocal()
+    temporal = None
     try:
-        if month:
-            año, mes = map(int, month.split("-"))
-            inicio = datetime(año, mes, 1)
-            if mes == 12:
-                fin = datetime(año + 1, 1, 1)
-            else:
-                fin = datetime(año, mes + 1, 1)
-        else:
-            fin = datetime.now()
-            inicio = fin - timedelta(days=30)
-        
-        query = (
-            session.query(
-                RegistroInventario.id,
-                RegistroInventario.product_id,
-                RegistroInventario.created_at,
-                RegistroInventario.quantity_available,
-                RegistroInventario.ventas_diarias,
-                RegistroInventario.total_value
-            )
-            .filter(RegistroInventario.created_at >= inicio)
-            .filter(RegistroInventario.created_at < fin)
-        )
-
-        df = pd.read_sql(query.statement, session.bind)
+        inicio, fin = _rango_reporte(month)
         
         os.makedirs("reportes", exist_ok=True)
         
         file_path = f"reportes/reporte_{inicio.date()}_{fin.date()}.csv"
-        df.to_csv(file_path, index=False)
+        # Temporal único: dos trabajos pueden generar el mismo reporte a la vez
+        descriptor, temporal = tempfile.mkstemp(dir="reportes", suffix=".csv.tmp")
+        os.close(descriptor)
+        
+        # Se escribe bloque a bloque y se publica al terminar
+        escritas = 0
+        for bloque in _bloques_reporte(session, inicio, fin, progreso):
+            bloque.to_csv(temporal, index=False, mode="w" if escritas == 0 else "a", header=escritas == 0)
+            escritas += len(bloque)
+        if escritas == 0:
+            pd.DataFrame(columns=[
+                "id", "product_id", "created_at", "quantity_available", "ventas_diarias", "total_value"
+            ]).to_csv(temporal, index=False)
+        os.replace(temporal, file_path)
+        temporal = None
 
         print(f"✓ CSV generado: {file_path}")
         return file_path
@@ -198,49 +240,42 @@ def generate_csv(month=None):
         traceback.print_exc()
         return None
     finally:
+        if temporal and os.path.exists(temporal):
+            os.remove(temporal)
         session.close()
 
 
-def generate_excel(month=None):
+def generate_excel(month=None, progreso=None):
     """
     Genera un archivo Excel con los registros del último mes o del mes especificado.
     Retorna la ruta del archivo generado.
     
     Args:
         month: String en formato "YYYY-MM" (ej: "2024-12") o None para último mes
+        progreso: Función opcional progreso(fraccion, mensaje), llamada por bloque
     """
     session = SessionLocal()
+    temporal = None
     try:
-        if month:
-            año, mes = map(int, month.split("-"))
-            inicio = datetime(año, mes, 1)
-            if mes == 12:
-                fin = datetime(año + 1, 1, 1)
-            else:
-                fin = datetime(año, mes + 1, 1)
-        else:
-            fin = datetime.now()
-            inicio = fin - timedelta(days=30)
+        inicio, fin = _rango_reporte(month)
         
-        query = (
-            session.query(
-                RegistroInventario.id,
-                RegistroInventario.product_id,
-                RegistroInventario.created_at,
-                RegistroInventario.quantity_available,
-                RegistroInventario.ventas_diarias,
-                RegistroInventario.total_value
-            )
-            .filter(RegistroInventario.created_at >= inicio)
-            .filter(RegistroInventario.created_at < fin)
-        )
-
-        df = pd.read_sql(query.statement, session.bind)
+        # openpyxl no permite anexar a una hoja de forma eficiente: se leen
+        # los bloques (con progreso) y se escribe una sola vez
+        bloques = list(_bloques_reporte(session, inicio, fin, progreso, tramo=0.8))
+        df = pd.concat(bloques, ignore_index=True) if bloques else pd.DataFrame(columns=[
+            "id", "product_id", "created_at", "quantity_available", "ventas_diarias", "total_value"
+        ])
         
         os.makedirs("reportes", exist_ok=True)
         
+        if progreso is not None:
+            progreso(0.8, "Escribiendo Excel")
         file_path = f"reportes/reporte_{inicio.date()}_{fin.date()}.xlsx"
-        df.to_excel(file_path, index=False, engine='openpyxl')
+        descriptor, temporal = tempfile.mkstemp(dir="reportes", suffix=".xlsx")
+        os.close(descriptor)
+        df.to_excel(temporal, index=False, engine='openpyxl')
+        os.replace(temporal, file_path)
+        temporal = None
 
         print(f"✓ Excel generado: {file_path}")
         return file_path
@@ -251,4 +286,6 @@ def generate_excel(month=None):
         traceback.print_exc()
         return None
     finally:
+        if temporal and os.path.exists(temporal):
+            os.remove(temporal)
         session.close()
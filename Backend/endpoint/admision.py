@@ -0,0 +1,142 @@
+"""
+Control de admisión para endpoints pesados
+==========================================
+/chat, /predict/all y /upload/retrain pueden ocupar un núcleo durante segundos.
+Sin límite, una sobrecarga hace que todas las solicitudes terminen en timeout.
+Cada clase de endpoint tiene un máximo de ejecuciones simultáneas y una cola
+de espera acotada:
+
+    - Cola llena                 → 429 Too Many Requests + Retry-After
+    - Espera mayor a la permitida → 503 Service Unavailable + Retry-After
+
+Configuración por variables de entorno (CLASE = CHAT, PREDICCION_MASIVA, ENTRENAMIENTO):
+    ADMISION_<CLASE>_CONCURRENTES, ADMISION_<CLASE>_COLA, ADMISION_<CLASE>_ESPERA_S
+
+Métricas (GET /api/metrics):
+    admision_<clase>_activos, admision_<clase>_en_cola          (valores)
+    admision_<clase>_admitidas, _rechazadas_cola, _rechazadas_espera (contadores)
+    admision_<clase>_espera, admision_<clase>_servicio          (tiempos)
+
+USO:
+    async with control_admision("chat").admitir():
+        ...
+"""
+
+import os
+import math
+import time
+import asyncio
+from contextlib import asynccontextmanager
+
+from fastapi import HTTPException
+
+from endpoint import metricas
+
+CONFIGURACION_POR_DEFECTO = {
+    # clase: (concurrentes, cola, espera máxima en segundos)
+    "chat": (4, 16, 15.0),
+    "prediccion_masiva": (2, 8, 10.0),
+    "entrenamiento": (1, 2, 2.0),
+}
+
+
+class ControlAdmision:
+    """Semáforo con cola acotada y rechazo rápido para una clase de endpoint."""
+
+    def __init__(self, nombre: str, concurrentes: int, cola: int, espera_max_s: float):
+        self.nombre = nombre
+        self.concurrentes = concurrentes
+        self.cola = cola
+        self.espera_max_s = espera_max_s
+        self._semaforo = asyncio.Semaphore(concurrentes)
+        self._activos = 0
+        self._en_cola = 0
+        # Media móvil del tiempo de servicio, para estimar Retry-After
+        self._servicio_medio_s = 1.0
+
+    def _retry_after(self) -> str:
+        esperados = (self._en_cola + 1) / max(self.concurrentes, 1)
+        return str(max(1, math.ceil(self._servicio_medio_s * esperados)))
+
+    def _publicar(self):
+        metricas.fijar(f"admision_{self.nombre}_activos", self._activos)
+        metricas.fijar(f"admision_{self.nombre}_en_cola", self._en_cola)
+
+    async def entrar(self):
+        """
+        Reserva un cupo o lanza HTTPException (429 / 503) con Retry-After.
+
+        Cada `entrar()` exitoso debe cerrarse con `salir()`.
+        """
+        if self._semaforo.locked() and self._en_cola >= self.cola:
+            metricas.incrementar(f"admision_{self.nombre}_rechazadas_cola")
+            raise HTTPException(
+                status_code=429,
+                detail=f"Demasiadas solicitudes en curso para {self.nombre}, intenta más tarde",
+                headers={"Retry-After": self._retry_after()}
+            )
+
+        self._en_cola += 1
+        self._publicar()
+        inicio = time.perf_counter()
+        try:
+            await asyncio.wait_for(self._semaforo.acquire(), timeout=self.espera_max_s)
+        except asyncio.TimeoutError:
+            metricas.incrementar(f"admision_{self.nombre}_rechazadas_espera")
+            raise HTTPException(
+                status_code=503,
+                detail=f"Servicio saturado para {self.nombre}, intenta más tarde",
+                headers={"Retry-After": self._retry_after()}
+            )
+        finally:
+            self._en_cola -= 1
+            self._publicar()
+
+        metricas.registrar_tiempo(f"admision_{self.nombre}_espera", time.perf_counter() - inicio)
+        metricas.incrementar(f"admision_{self.nombre}_admitidas")
+        self._activos += 1
+        self._publicar()
+        return time.perf_counter()
+
+    def salir(self, inicio_servicio: float = None):
+        """Libera el cupo y actualiza la estimación del tiempo de servicio."""
+        if inicio_servicio is not None:
+            duracion = time.perf_counter() - inicio_servicio
+            self._servicio_medio_s = 0.8 * self._servicio_medio_s + 0.2 * duracion
+            metricas.registrar_tiempo(f"admision_{self.nombre}_servicio", duracion)
+        self._activos -= 1
+        self._semaforo.release()
+        self._publicar()
+
+    @asynccontextmanager
+    async def admitir(self):
+        inicio = await self.entrar()
+        try:
+            yield
+        finally:
+            self.salir(inicio)
+
+    async def envolver_stream(self, eventos, inicio_servicio: float):
+        """Mantiene el cupo mientras dura un stream ya admitido con `entrar()`."""
+        try:
+            async for evento in eventos:
+                yield evento
+        finally:
+            self.salir(inicio_servicio)
+
+
+_controles = {}
+
+
+def control_admision(clase: str) -> ControlAdmision:
+    """Control de admisión (único por proceso) de una clase de endpoint."""
+    if clase not in _controles:
+        concurrentes, cola, espera = CONFIGURACION_POR_DEFECTO[clase]
+        prefijo = f"ADMISION_{clase.upper()}"
+        _controles[clase] = ControlAdmision(
+            clase,
+            concurrentes=int(os.getenv(f"{prefijo}_CONCURRENTES", concurrentes)),
+            cola=int(os.getenv(f"{prefijo}_COLA", cola)),
+            espera_max_s=float(os.getenv(f"{prefijo}_ESPERA_S", espera)),
+        )
+    return _controles[clase]
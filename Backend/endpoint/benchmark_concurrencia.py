@@ -0,0 +1,100 @@
+"""
+Benchmark de concurrencia
+=========================
+Mide la latencia de una ruta barata (/api/health) en reposo y mientras /chat
+está bajo carga. Con el trabajo bloqueante delegado a los ejecutores, el p99
+de la ruta barata debe mantenerse estable.
+
+USO (con la API levantada en otra terminal):
+    python -m endpoint.benchmark_concurrencia --url http://localhost:8000 --clientes-chat 8
+"""
+
+import json
+import time
+import threading
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+
+def _percentil(valores, p):
+    if not valores:
+        return 0.0
+    ordenados = sorted(valores)
+    idx = min(int(round(p / 100 * (len(ordenados) - 1))), len(ordenados) - 1)
+    return ordenados[idx]
+
+
+def _solicitud(url, cuerpo=None, timeout=120):
+    """Ejecuta una solicitud y devuelve su latencia en ms."""
+    datos = json.dumps(cuerpo).encode("utf-8") if cuerpo is not None else None
+    req = urllib.request.Request(
+        url, data=datos,
+        headers={"Content-Type": "application/json"} if datos else {}
+    )
+    inicio = time.perf_counter()
+    with urllib.request.urlopen(req, timeout=timeout) as resp:
+        resp.read()
+    return (time.perf_counter() - inicio) * 1000
+
+
+def medir_ruta_barata(base_url, n=200, intervalo_s=0.02):
+    """Latencias de /api/health en serie."""
+    latencias = []
+    for _ in range(n):
+        latencias.append(_solicitud(f"{base_url}/api/health"))
+        time.sleep(intervalo_s)
+    return latencias
+
+
+def _carga_chat(base_url, detener, mensaje, contador):
+    while not detener.is_set():
+        try:
+            _solicitud(f"{base_url}/api/chat", {"message": mensaje})
+            contador.append(1)
+        except Exception as e:
+            print(f"✗ /chat falló: {e}")
+            time.sleep(0.5)
+
+
+def _resumen(nombre, latencias):
+    print(f"   {nombre:<22} p50={_percentil(latencias, 50):8.2f} ms  "
+          f"p95={_percentil(latencias, 95):8.2f} ms  p99={_percentil(latencias, 99):8.2f} ms")
+
+
+def benchmark(base_url="http://localhost:8000", clientes_chat=8, n=200,
+              mensaje="¿Cuáles son los productos más vendidos?"):
+    print("\n🔬 Benchmark de concurrencia\n")
+
+    print("→ Ruta barata en reposo...")
+    reposo = medir_ruta_barata(base_url, n)
+
+    print(f"→ Ruta barata con {clientes_chat} clientes de /chat en paralelo...")
+    detener = threading.Event()
+    completados = []
+    with ThreadPoolExecutor(max_workers=clientes_chat) as pool:
+        for _ in range(clientes_chat):
+            pool.submit(_carga_chat, base_url, detener, mensaje, completados)
+        time.sleep(1.0)  # dejar que la carga arranque
+        carga = medir_ruta_barata(base_url, n)
+        detener.set()
+
+    print("\n📊 RESULTADOS")
+    print("=" * 70)
+    _resumen("/health en reposo", reposo)
+    _resumen("/health con /chat", carga)
+    print(f"   /chat completados durante la medición: {len(completados)}")
+    print("=" * 70)
+
+    return {"reposo": reposo, "carga": carga, "chats_completados": len(completados)}
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Benchmark de concurrencia de la API")
+    parser.add_argument("--url", default="http://localhost:8000")
+    parser.add_argument("--clientes-chat", type=int, default=8)
+    parser.add_argument("-n", type=int, default=200)
+    args = parser.parse_args()
+
+    benchmark(args.url, args.clientes_chat, args.n)
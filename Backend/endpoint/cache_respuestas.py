@@ -0,0 +1,129 @@
+"""
+Caché de respuestas completas de /chat
+======================================
+Muchos mensajes son repeticiones (las mismas FAQs, "productos más vendidos").
+Cada uno recalculaba el texto y volvía a generar el MP3 con gTTS, la
+conversión a WAV y el lipsync de Rhubarb. La caché guarda la respuesta final
+(texto, audio y lipsync) y una repetición se responde sin pasar por ninguna
+etapa.
+
+Clave: mensaje normalizado + versión del modelo + marca de agua de los datos
++ fecha de hoy (las predicciones son relativas al día). Al aprobar un modelo
+la clave cambia y las entradas viejas expiran solas. La marca de agua es la
+del dataset que cargó model.methods al arrancar: no sigue los cambios
+posteriores de la BD.
+
+No se guardan respuestas con archivo adjunto (reportes), con errores ni las
+de funciones que consultan la BD en cada llamada (top_selling,
+least_selling; ver FUNCIONES_EN_VIVO en endpoint/routes.py).
+
+Ventana de obsolescencia: las respuestas de FAQ se guardan y las FAQs se
+editan fuera del servidor (initialize_chatbot_db, ingest_faqs), así que un
+cambio en faq_knowledge puede tardar hasta CHAT_CACHE_TTL_S en verse (o hasta
+reiniciar el servidor).
+
+Expulsión:
+    - TTL (CHAT_CACHE_TTL_S, 600 s por defecto)
+    - Tamaño: entradas (CHAT_CACHE_MAX_ENTRADAS) y bytes (CHAT_CACHE_MAX_MB),
+      se expulsa primero la usada hace más tiempo (LRU)
+
+Métricas (GET /api/metrics):
+    cache_chat_aciertos, cache_chat_fallos, cache_chat_expulsiones (contadores)
+    cache_chat_entradas, cache_chat_bytes (valores)
+"""
+
+import os
+import json
+import time
+import hashlib
+import threading
+from collections import OrderedDict
+from datetime import date
+from typing import Any, Hashable, Optional
+
+from endpoint import metricas
+
+TTL_POR_DEFECTO_S = 600
+MAX_ENTRADAS_POR_DEFECTO = 512
+MAX_MB_POR_DEFECTO = 64
+
+
+def _tamano(valor: Any) -> int:
+    """Tamaño aproximado en bytes de una respuesta (dominado por el audio en base64)."""
+    return len(json.dumps(valor, default=str, ensure_ascii=False))
+
+
+class CacheRespuestas:
+    """LRU con TTL y límite de entradas y de bytes, seguro entre hilos."""
+
+    def __init__(self, nombre: str, ttl_s: float, max_entradas: int, max_bytes: int):
+        self.nombre = nombre
+        self.ttl_s = ttl_s
+        self.max_entradas = max_entradas
+        self.max_bytes = max_bytes
+        self._datos: "OrderedDict[Hashable, tuple]" = OrderedDict()  # clave → (expira, bytes, valor)
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    def _quitar(self, clave):
+        _, tamano, _ = self._datos.pop(clave)
+        self._bytes -= tamano
+
+    def _publicar(self):
+        metricas.fijar(f"cache_{self.nombre}_entradas", len(self._datos))
+        metricas.fijar(f"cache_{self.nombre}_bytes", self._bytes)
+
+    def obtener(self, clave: Hashable) -> Optional[Any]:
+        with self._lock:
+            entrada = self._datos.get(clave)
+            if entrada is not None and entrada[0] < time.monotonic():
+                self._quitar(clave)
+                self._publicar()
+                entrada = None
+            if entrada is not None:
+                self._datos.move_to_end(clave)
+        metricas.incrementar(f"cache_{self.nombre}_aciertos" if entrada is not None else f"cache_{self.nombre}_fallos")
+        return entrada[2] if entrada is not None else None
+
+    def guardar(self, clave: Hashable, valor: Any):
+        tamano = _tamano(valor)
+        if self.ttl_s <= 0 or tamano > self.max_bytes:
+            return
+        with self._lock:
+            if clave in self._datos:
+                self._quitar(clave)
+            self._datos[clave] = (time.monotonic() + self.ttl_s, tamano, valor)
+            self._bytes += tamano
+
+            expulsadas = 0
+            ahora = time.monotonic()
+            # Primero las expiradas, luego las menos usadas hasta respetar los límites
+            for vieja in [c for c, (expira, _, _) in self._datos.items() if expira < ahora]:
+                self._quitar(vieja)
+                expulsadas += 1
+            while len(self._datos) > self.max_entradas or self._bytes > self.max_bytes:
+                self._quitar(next(iter(self._datos)))
+                expulsadas += 1
+            self._publicar()
+        if expulsadas:
+            metricas.incrementar(f"cache_{self.nombre}_expulsiones", expulsadas)
+
+    def limpiar(self):
+        with self._lock:
+            self._datos.clear()
+            self._bytes = 0
+            self._publicar()
+
+
+cache_chat = CacheRespuestas(
+    "chat",
+    ttl_s=float(os.getenv("CHAT_CACHE_TTL_S", TTL_POR_DEFECTO_S)),
+    max_entradas=int(os.getenv("CHAT_CACHE_MAX_ENTRADAS", MAX_ENTRADAS_POR_DEFECTO)),
+    max_bytes=int(float(os.getenv("CHAT_CACHE_MAX_MB", MAX_MB_POR_DEFECTO)) * 1024 * 1024),
+)
+
+
+def clave_chat(mensaje_normalizado: str, version_modelo: str, marca_datos: str) -> str:
+    """Clave de caché de una respuesta de /chat."""
+    partes = [mensaje_normalizado, version_modelo, marca_datos, date.today().isoformat()]
+    return hashlib.sha1("|".join(partes).encode("utf-8")).hexdigest()
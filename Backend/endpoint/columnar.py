@@ -0,0 +1,214 @@
+"""
+Respuestas binarias columnares (Arrow IPC / Parquet)
+====================================================
+Para consumidores analíticos que descargan la matriz productos × días
+completa, el JSON es el cuello de botella: se genera y se parsea valor por
+valor. Con pyarrow instalado, los endpoints masivos pueden responder en:
+
+    - Arrow IPC (stream): un record batch por lote del motor de trayectorias,
+      que se emite en cuanto el lote termina.
+    - Parquet: un row group por lote; el footer se escribe al final.
+
+El formato se elige con el campo `formato` del body ("arrow" o "parquet") o
+con la cabecera Accept (application/vnd.apache.arrow.stream,
+application/vnd.apache.parquet).
+
+Esquema (formato largo, una fila por producto y fecha):
+    product_name: string, date: date32, predicted_stock: float64,
+    current_stock: float64, tipo: string, error: string (nulo si no hubo error)
+
+La versión del modelo y la marca de agua de los datos viajan en los metadatos
+del esquema.
+"""
+
+from typing import Any, AsyncIterator, Dict, List, Optional
+
+import numpy as np
+from fastapi import HTTPException
+from fastapi.responses import StreamingResponse
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = None
+    pq = None
+
+MEDIA_TYPES_BINARIOS = {
+    "arrow": "application/vnd.apache.arrow.stream",
+    "parquet": "application/vnd.apache.parquet",
+}
+
+# Alias aceptados en la cabecera Accept
+_ACCEPT = {
+    "application/vnd.apache.arrow.stream": "arrow",
+    "application/vnd.apache.arrow.file": "arrow",
+    "application/vnd.apache.parquet": "parquet",
+    "application/x-parquet": "parquet",
+}
+
+
+def formato_binario(request: Dict[str, Any], accept: Optional[str] = None) -> Optional[str]:
+    """
+    Devuelve "arrow", "parquet" o None (respuesta JSON).
+
+    Lanza 406 si se pide un formato binario y pyarrow no está instalado.
+    """
+    formato = request.get("formato")
+    if formato not in MEDIA_TYPES_BINARIOS:
+        formato = None
+        accept = (accept or "").lower()
+        for media_type, nombre in _ACCEPT.items():
+            if media_type in accept:
+                formato = nombre
+                break
+
+    if formato and pa is None:
+        raise HTTPException(
+            status_code=406,
+            detail="Formato binario no disponible: instala pyarrow en el servidor"
+        )
+    return formato
+
+
+def esquema(metadatos: Optional[Dict[str, str]] = None):
+    """Esquema Arrow de las respuestas de predicción masiva."""
+    return pa.schema(
+        [
+            ("product_name", pa.string()),
+            ("date", pa.date32()),
+            ("predicted_stock", pa.float64()),
+            ("current_stock", pa.float64()),
+            ("tipo", pa.string()),
+            ("error", pa.string()),
+        ],
+        metadata=metadatos
+    )
+
+
+def lote_desde_matriz(
+    productos: List[str],
+    fechas,
+    matriz: np.ndarray,
+    current_stock,
+    tipos: List[str],
+    esquema_lote
+):
+    """
+    Record batch en formato largo a partir de una matriz (P, D).
+
+    Las filas van ordenadas por producto y, dentro de cada producto, por fecha.
+    """
+    n_fechas = len(fechas)
+    dias = np.asarray(fechas, dtype="datetime64[D]")
+    return pa.record_batch(
+        [
+            pa.array(np.repeat(np.asarray(productos, dtype=object), n_fechas), type=pa.string()),
+            pa.array(np.tile(dias, len(productos)), type=pa.date32()),
+            pa.array(np.round(matriz, 2).ravel(), type=pa.float64()),
+            pa.array(np.repeat(np.asarray(current_stock, dtype=float), n_fechas), type=pa.float64()),
+            pa.array(np.repeat(np.asarray(tipos, dtype=object), n_fechas), type=pa.string()),
+            pa.nulls(len(productos) * n_fechas, type=pa.string()),
+        ],
+        schema=esquema_lote
+    )
+
+
+def lote_errores(errores: Dict[str, str], esquema_lote):
+    """Una fila por producto que no se pudo predecir, con el mensaje en `error`."""
+    productos = list(errores)
+    n = len(productos)
+    return pa.record_batch(
+        [
+            pa.array(productos, type=pa.string()),
+            pa.nulls(n, type=pa.date32()),
+            pa.nulls(n, type=pa.float64()),
+            pa.nulls(n, type=pa.float64()),
+            pa.nulls(n, type=pa.string()),
+            pa.array([errores[p] for p in productos], type=pa.string()),
+        ],
+        schema=esquema_lote
+    )
+
+
+def lote_desde_columnas(productos, fechas, stock, current_stock, tipos, errores, esquema_lote):
+    """Record batch a partir de columnas paralelas (NaN en el stock se escribe como nulo)."""
+    return pa.record_batch(
+        [
+            pa.array(productos, type=pa.string()),
+            pa.array(np.asarray(fechas, dtype="datetime64[D]"), type=pa.date32()),
+            pa.array(np.asarray(stock, dtype=float), type=pa.float64(), from_pandas=True),
+            pa.array(np.asarray(current_stock, dtype=float), type=pa.float64(), from_pandas=True),
+            pa.array(tipos, type=pa.string()),
+            pa.array(errores, type=pa.string()),
+        ],
+        schema=esquema_lote
+    )
+
+
+class _Buffer:
+    """Sink de escritura en memoria que se vacía después de cada lote."""
+
+    def __init__(self):
+        self._partes = []
+        self._posicion = 0
+        self.closed = False
+
+    def write(self, datos) -> int:
+        datos = bytes(datos)
+        self._partes.append(datos)
+        self._posicion += len(datos)
+        return len(datos)
+
+    def tell(self) -> int:
+        return self._posicion
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def vaciar(self) -> bytes:
+        datos = b"".join(self._partes)
+        self._partes = []
+        return datos
+
+
+def respuesta_binaria(
+    lotes: AsyncIterator[Any],
+    formato: str,
+    esquema_lote,
+    nombre_archivo: str = "predicciones"
+) -> StreamingResponse:
+    """
+    StreamingResponse que escribe cada record batch de `lotes` en cuanto llega.
+
+    En Arrow IPC cada lote se envía completo al cliente; en Parquet cada lote
+    es un row group y el footer se envía al cerrar.
+    """
+    async def cuerpo():
+        sink = _Buffer()
+        if formato == "parquet":
+            escritor = pq.ParquetWriter(sink, esquema_lote, compression="snappy")
+            escribir = lambda lote: escritor.write_table(pa.Table.from_batches([lote]))
+        else:
+            escritor = pa.ipc.new_stream(sink, esquema_lote)
+            escribir = escritor.write_batch
+
+        try:
+            async for lote in lotes:
+                if lote.num_rows == 0:
+                    continue
+                escribir(lote)
+                yield sink.vaciar()
+        finally:
+            escritor.close()
+        yield sink.vaciar()
+
+    extension = "arrows" if formato == "arrow" else "parquet"
+    headers = {
+        "Cache-Control": "no-cache",
+        "Content-Disposition": f'attachment; filename="{nombre_archivo}.{extension}"',
+    }
+    return StreamingResponse(cuerpo(), media_type=MEDIA_TYPES_BINARIOS[formato], headers=headers)
@@ -0,0 +1,136 @@
+"""
+GET condicional (ETag / Last-Modified)
+======================================
+Las predicciones solo cambian cuando se aprueba un modelo (/retrain/approve)
+o llegan registros nuevos al dataset. El ETag se deriva de:
+
+    (versión del modelo, marca de agua de los datos, parámetros de la solicitud)
+
+y Last-Modified de la última modificación de los ficheros del modelo o del
+último registro del dataset. Si el cliente envía If-None-Match (o, en su
+defecto, If-Modified-Since) y nada cambió, se responde 304 sin tocar el modelo.
+
+Los parámetros deben incluir todo lo que cambia el resultado además del
+modelo y los datos, por ejemplo la fecha de hoy en predicciones relativas.
+
+Métricas (GET /api/metrics):
+    condicional_304, condicional_200
+
+USO:
+    condicional = Condicional(http_request, ("predict-all", hoy, formato))
+    if condicional.no_modificado():
+        return condicional.respuesta_304()
+    ...
+    return condicional.aplicar(resultado, response)
+"""
+
+import hashlib
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Any, Iterable, Optional
+
+from fastapi import Request, Response
+
+from endpoint import metricas
+from model.methods import version_modelo, marca_datos, fecha_modificacion
+
+# Los clientes deben revalidar siempre, pero pueden guardar la respuesta
+CACHE_CONTROL = "private, no-cache"
+
+
+def calcular_etag(parametros: Iterable[Any]) -> str:
+    """ETag débil: mismo modelo, mismos datos y mismos parámetros → mismo valor."""
+    partes = [version_modelo(), marca_datos()] + [str(p) for p in parametros]
+    resumen = hashlib.sha1("|".join(partes).encode("utf-8")).hexdigest()[:20]
+    return f'W/"{resumen}"'
+
+
+def _http_date(fecha: Optional[datetime]) -> Optional[str]:
+    if fecha is None:
+        return None
+    if fecha.tzinfo is None:
+        # Fechas locales del servidor
+        fecha = fecha.astimezone()
+    return format_datetime(fecha.astimezone(timezone.utc).replace(microsecond=0), usegmt=True)
+
+
+def _sin_debil(etag: str) -> str:
+    etag = etag.strip()
+    return etag[2:] if etag.startswith("W/") else etag
+
+
+class Condicional:
+    """Validadores de una respuesta de predicción y evaluación de las precondiciones."""
+
+    def __init__(
+        self,
+        request: Optional[Request],
+        parametros: Iterable[Any],
+        vigente_desde: Optional[datetime] = None
+    ):
+        """
+        Args:
+            request: Solicitud HTTP (cabeceras If-None-Match / If-Modified-Since)
+            parametros: Todo lo que, además del modelo y los datos, cambia el resultado
+            vigente_desde: Inicio de validez de resultados relativos a hoy (medianoche),
+                para que If-Modified-Since no devuelva 304 con la ventana de ayer
+        """
+        self.request = request
+        self.etag = calcular_etag(parametros)
+        fechas = [f for f in (fecha_modificacion(), vigente_desde) if f is not None]
+        self.ultima_modificacion = max(fechas) if fechas else None
+        self.last_modified = _http_date(self.ultima_modificacion)
+
+    def _cabecera(self, nombre: str) -> Optional[str]:
+        if self.request is None:
+            return None
+        return self.request.headers.get(nombre)
+
+    def no_modificado(self) -> bool:
+        """True si el cliente ya tiene la representación actual."""
+        if_none_match = self._cabecera("if-none-match")
+        if if_none_match is not None:
+            # Comparación débil (RFC 9110 §13.1.2)
+            if if_none_match.strip() == "*":
+                return True
+            etags = {_sin_debil(e) for e in if_none_match.split(",")}
+            return _sin_debil(self.etag) in etags
+
+        if_modified_since = self._cabecera("if-modified-since")
+        if if_modified_since and self.ultima_modificacion is not None:
+            try:
+                desde = parsedate_to_datetime(if_modified_since)
+            except (TypeError, ValueError):
+                return False
+            if desde.tzinfo is None:
+                desde = desde.replace(tzinfo=timezone.utc)
+            actual = self.ultima_modificacion
+            if actual.tzinfo is None:
+                actual = actual.astimezone()
+            return actual.replace(microsecond=0) <= desde
+        return False
+
+    def cabeceras(self) -> dict:
+        cabeceras = {"ETag": self.etag, "Cache-Control": CACHE_CONTROL, "Vary": "Accept"}
+        if self.last_modified:
+            cabeceras["Last-Modified"] = self.last_modified
+        return cabeceras
+
+    def respuesta_304(self) -> Response:
+        metricas.incrementar("condicional_304")
+        return Response(status_code=304, headers=self.cabeceras())
+
+    def aplicar(self, resultado: Any, response: Optional[Response] = None) -> Any:
+        """
+        Añade los validadores a la respuesta.
+
+        Si `resultado` ya es una Response (streaming, binaria) se modifica
+        directamente; si no, se usan las cabeceras de `response`, la Response
+        que FastAPI inyecta en el endpoint.
+        """
+        metricas.incrementar("condicional_200")
+        destino = resultado if isinstance(resultado, Response) else response
+        if destino is not None:
+            for nombre, valor in self.cabeceras().items():
+                destino.headers[nombre] = valor
+        return resultado
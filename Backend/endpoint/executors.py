@@ -0,0 +1,84 @@
+"""
+Ejecutores por tipo de carga
+============================
+Las rutas son `async def`, pero el trabajo que hacen (Keras, SentenceTransformer,
+SQLAlchemy, gTTS, pydub, Rhubarb) es bloqueante. Ejecutarlo directamente en el
+event loop congela todas las solicitudes del worker, así que se delega a pools
+de hilos separados por clase de carga: una ráfaga de /chat no agota los hilos
+que usan las consultas baratas.
+
+    Clase           Trabajo                                   Variable de entorno
+    modelo          inferencia Keras                          EJECUTOR_MODELO_HILOS
+    embeddings      SentenceTransformer + búsqueda pgvector   EJECUTOR_EMBEDDINGS_HILOS
+    db              consultas SQLAlchemy                      EJECUTOR_DB_HILOS
+    audio           gTTS, pydub, Rhubarb                      EJECUTOR_AUDIO_HILOS
+    reportes        generación de CSV / Excel                 EJECUTOR_REPORTES_HILOS
+    llm             llamadas HTTP a Gemini                    EJECUTOR_LLM_HILOS
+    entrenamiento   reentrenamiento y aprobación de modelos   EJECUTOR_ENTRENAMIENTO_HILOS
+
+Se usan hilos porque las librerías de cómputo (TensorFlow, torch, pydub vía
+ffmpeg, Rhubarb como subproceso) liberan el GIL durante el trabajo pesado.
+
+USO:
+    from endpoint.executors import en_ejecutor
+    pred = await en_ejecutor("modelo", predict_stock_product_date, product_id, date)
+"""
+
+import os
+import asyncio
+import functools
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+TAMANOS_POR_DEFECTO = {
+    "modelo": 2,
+    "embeddings": 2,
+    "db": 8,
+    # Más de un hilo solo es seguro porque cada síntesis usa su propio
+    # directorio temporal (lipsync.lipsyncgen.generar_audio_avatar); funciones
+    # con rutas fijas (generate_lipsync sobre audios/, tts con su
+    # nombre_archivo por defecto) no deben enviarse a este pool
+    "audio": 4,
+    "reportes": 2,
+    "llm": 4,
+    "entrenamiento": 1,
+}
+
+_ejecutores = {}
+_lock = threading.Lock()
+
+
+def tamano_ejecutor(clase: str) -> int:
+    """Número de hilos del pool de una clase (variable de entorno o valor por defecto)."""
+    if clase not in TAMANOS_POR_DEFECTO:
+        raise ValueError(f"Clase de ejecutor desconocida: {clase}. Opciones: {list(TAMANOS_POR_DEFECTO)}")
+    return int(os.getenv(f"EJECUTOR_{clase.upper()}_HILOS", TAMANOS_POR_DEFECTO[clase]))
+
+
+def obtener_ejecutor(clase: str) -> ThreadPoolExecutor:
+    """Devuelve (creándolo la primera vez) el pool de hilos de la clase."""
+    ejecutor = _ejecutores.get(clase)
+    if ejecutor is None:
+        with _lock:
+            ejecutor = _ejecutores.get(clase)
+            if ejecutor is None:
+                ejecutor = ThreadPoolExecutor(
+                    max_workers=tamano_ejecutor(clase),
+                    thread_name_prefix=f"ejecutor-{clase}"
+                )
+                _ejecutores[clase] = ejecutor
+    return ejecutor
+
+
+async def en_ejecutor(clase: str, fn, *args, **kwargs):
+    """Ejecuta `fn(*args, **kwargs)` en el pool de la clase sin bloquear el event loop."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(obtener_ejecutor(clase), functools.partial(fn, *args, **kwargs))
+
+
+def cerrar_ejecutores(esperar: bool = True):
+    """Cierra todos los pools (al apagar la aplicación)."""
+    with _lock:
+        for ejecutor in _ejecutores.values():
+            ejecutor.shutdown(wait=esperar)
+        _ejecutores.clear()
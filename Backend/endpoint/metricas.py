@@ -0,0 +1,65 @@
+"""
+Métricas del proceso
+====================
+Registro en memoria de contadores, valores instantáneos (gauges) y tiempos,
+expuesto en JSON por GET /api/metrics. Cada worker de uvicorn tiene el suyo.
+
+USO:
+    from endpoint import metricas
+    metricas.incrementar("singleflight_producto_compartidas")
+    metricas.fijar("cola_chat", 3)
+    metricas.registrar_tiempo("chat_faq", 0.042)
+"""
+
+import threading
+from collections import defaultdict, deque
+
+# Muestras recientes que se conservan por métrica de tiempo para los percentiles
+MUESTRAS_TIEMPO = 1000
+
+_lock = threading.Lock()
+_contadores = defaultdict(int)
+_valores = {}
+_tiempos = defaultdict(lambda: deque(maxlen=MUESTRAS_TIEMPO))
+
+
+def incrementar(nombre: str, cantidad: int = 1):
+    with _lock:
+        _contadores[nombre] += cantidad
+
+
+def fijar(nombre: str, valor):
+    with _lock:
+        _valores[nombre] = valor
+
+
+def registrar_tiempo(nombre: str, segundos: float):
+    with _lock:
+        _tiempos[nombre].append(segundos)
+
+
+def _percentil(ordenados, p):
+    idx = min(int(round(p / 100 * (len(ordenados) - 1))), len(ordenados) - 1)
+    return ordenados[idx]
+
+
+def instantanea() -> dict:
+    """Copia de todas las métricas; los tiempos se resumen en ms."""
+    with _lock:
+        contadores = dict(_contadores)
+        valores = dict(_valores)
+        tiempos = {nombre: sorted(muestras) for nombre, muestras in _tiempos.items()}
+
+    resumen_tiempos = {}
+    for nombre, muestras in tiempos.items():
+        if not muestras:
+            continue
+        resumen_tiempos[nombre] = {
+            "n": len(muestras),
+            "media_ms": round(sum(muestras) * 1000 / len(muestras), 3),
+            "p50_ms": round(_percentil(muestras, 50) * 1000, 3),
+            "p99_ms": round(_percentil(muestras, 99) * 1000, 3),
+            "max_ms": round(muestras[-1] * 1000, 3),
+        }
+
+    return {"contadores": contadores, "valores": valores, "tiempos": resumen_tiempos}
@@ -0,0 +1,195 @@
+"""
+Pipeline por etapas de /chat
+============================
+Decide quién responde un mensaje, de la etapa más barata a la más cara:
+
+    1. regex       check_regex_response (sin embeddings ni BD). Si acierta,
+                   se responde sin pasar a las demás etapas.
+    2. embedding   el mensaje se codifica una sola vez (ContextoEmbedding, con
+                   LRU por proceso para frases repetidas).
+    3. faq ∥ funcion
+                   las búsquedas vectoriales de FAQ y de funciones corren en
+                   paralelo con el mismo embedding. Gana por prioridad fija
+                   (FAQ primero, como antes), no por orden de llegada: una FAQ
+                   confiable responde sin esperar a las funciones, y las
+                   funciones solo ganan cuando la FAQ terminó sin un resultado
+                   confiable. La búsqueda que ya no hace falta se cancela (si
+                   aún está en cola del ejecutor no llega a ejecutarse).
+
+Mensajes con varias intenciones ("los más vendidos y cuándo se agota la
+Laptop HP") se dividen en cláusulas (segmentar_mensaje) y cada cláusula se
+identifica en paralelo junto con el mensaje completo; si las cláusulas no
+dan al menos dos funciones distintas se usa el mensaje completo.
+En ese caso las funciones tienen prioridad sobre la FAQ.
+
+Cada etapa registra su tiempo en las métricas (chat_etapa_<nombre>) y en el
+campo `tiempos` del resultado.
+
+USO:
+    clasificacion = await clasificar_mensaje(caller, mensaje)
+    if clasificacion["tipo"] == "funcion": ...
+"""
+
+import time
+import asyncio
+from typing import Any, Dict
+
+from endpoint import metricas
+from endpoint.executors import en_ejecutor
+from llm.agent import check_regex_response
+from ai.contexto import ContextoEmbedding
+from ai.matcher import segmentar_mensaje
+
+# Confianza mínima para ejecutar la función identificada (la FAQ ya aplica su umbral)
+UMBRAL_FUNCION_CHAT = 0.8
+
+
+class _Cronometro:
+    """Acumula los tiempos por etapa de una solicitud."""
+
+    def __init__(self):
+        self.tiempos = {}
+
+    def registrar(self, etapa: str, inicio: float):
+        duracion = time.perf_counter() - inicio
+        self.tiempos[etapa] = round(duracion * 1000, 2)
+        metricas.registrar_tiempo(f"chat_etapa_{etapa}", duracion)
+
+
+def _funcion_confiable(resultado) -> bool:
+    return bool(resultado) and resultado.get("funcion") is not None and resultado["confianza"] > UMBRAL_FUNCION_CHAT
+
+
+def _confiable(etapa: str, resultado) -> bool:
+    if etapa == "faq":
+        return resultado is not None
+    return len(resultado) > 0
+
+
+async def _identificar_funciones(caller, mensaje, clausulas, contexto):
+    """
+    Funciones confiables del mensaje: una búsqueda por cláusula, en paralelo.
+
+    El mensaje completo también se identifica (con el embedding ya calculado):
+    la división por "y" o comas también corta peticiones de una sola intención
+    ("genera el reporte y envíamelo en excel", "stock de Laptop HP y Mouse
+    Logitech"). Solo se responde con varias funciones si las cláusulas dan al
+    menos dos distintas; si no, se usa el mensaje completo cuando es confiable.
+
+    Se descartan duplicados (misma función y mismos parámetros).
+    """
+    completo = en_ejecutor("embeddings", caller.identificar_funcion, mensaje, contexto=contexto)
+    if len(clausulas) == 1:
+        resultado = await completo
+        return [dict(resultado, clausula=mensaje)] if _funcion_confiable(resultado) else []
+
+    resultado_completo, *identificados = await asyncio.gather(completo, *(
+        en_ejecutor("embeddings", caller.identificar_funcion, clausula, contexto=ContextoEmbedding(clausula))
+        for clausula in clausulas
+    ))
+
+    funciones, vistas = [], set()
+    for clausula, resultado in zip(clausulas, identificados):
+        if not _funcion_confiable(resultado):
+            continue
+        clave = (resultado["funcion"], tuple(sorted(resultado["parametros"].items())))
+        if clave in vistas:
+            continue
+        vistas.add(clave)
+        funciones.append(dict(resultado, clausula=clausula))
+
+    if len(funciones) < 2 and _funcion_confiable(resultado_completo):
+        metricas.incrementar("chat_intenciones_mensaje_completo")
+        return [dict(resultado_completo, clausula=mensaje)]
+    return funciones
+
+
+async def clasificar_mensaje(caller, mensaje: str) -> Dict[str, Any]:
+    """
+    Ejecuta las etapas del pipeline y devuelve quién responde.
+
+    Returns:
+        {"tipo": "regex" | "faq" | "funcion" | "ninguno",
+         "respuesta": str (regex / faq), "faq": dict,
+         "funciones": [dict] (una por intención), "funcion": dict (la primera),
+         "contexto": ContextoEmbedding (para búsquedas posteriores),
+         "tiempos": {etapa: ms}}
+    """
+    cronometro = _Cronometro()
+    inicio_total = time.perf_counter()
+
+    # 1. Regex: siempre preferida
+    inicio = time.perf_counter()
+    regex_resp = check_regex_response(mensaje)
+    cronometro.registrar("regex", inicio)
+    if regex_resp:
+        metricas.incrementar("chat_respondido_regex")
+        cronometro.registrar("total", inicio_total)
+        return {"tipo": "regex", "respuesta": regex_resp, "tiempos": cronometro.tiempos}
+
+    # 2. Un solo embedding para las dos búsquedas
+    inicio = time.perf_counter()
+    contexto = ContextoEmbedding(mensaje)
+    await en_ejecutor("embeddings", caller.vectorizar, contexto)
+    cronometro.registrar("embedding", inicio)
+
+    # 3. FAQ y funciones en paralelo; gana el resultado confiable de mayor prioridad
+    inicio_busqueda = time.perf_counter()
+    clausulas = segmentar_mensaje(mensaje)
+    varias_intenciones = len(clausulas) > 1
+    if varias_intenciones:
+        metricas.incrementar("chat_varias_intenciones")
+
+    async def _etapa(nombre, corrutina):
+        inicio = time.perf_counter()
+        resultado = await corrutina
+        # Solo se registran las etapas que terminan (no las canceladas)
+        cronometro.registrar(nombre, inicio)
+        return nombre, resultado
+
+    tareas = {
+        asyncio.ensure_future(_etapa(
+            "faq", en_ejecutor("embeddings", caller.consultar_faq, mensaje, contexto=contexto)
+        )),
+        asyncio.ensure_future(_etapa(
+            "funcion", _identificar_funciones(caller, mensaje, clausulas, contexto)
+        )),
+    }
+    resultados = {}
+    ganador = None
+    try:
+        while tareas and ganador is None:
+            terminadas, tareas = await asyncio.wait(tareas, return_when=asyncio.FIRST_COMPLETED)
+            for tarea in terminadas:
+                nombre, resultado = tarea.result()
+                resultados[nombre] = resultado
+            # Prioridad fija (la misma respuesta en cada ejecución): la FAQ
+            # primero; con varias intenciones, las funciones. Una etapa solo
+            # gana cuando las de mayor prioridad terminaron sin resultado confiable
+            orden = ("funcion", "faq") if varias_intenciones else ("faq", "funcion")
+            for nombre in orden:
+                if nombre not in resultados:
+                    break
+                if _confiable(nombre, resultados[nombre]):
+                    ganador = nombre
+                    break
+    finally:
+        for tarea in tareas:
+            tarea.cancel()
+            metricas.incrementar("chat_etapas_canceladas")
+    cronometro.registrar("busqueda", inicio_busqueda)
+    cronometro.registrar("total", inicio_total)
+
+    if ganador is None:
+        metricas.incrementar("chat_sin_respuesta")
+        return {"tipo": "ninguno", "funciones": [], "funcion": None,
+                "contexto": contexto, "tiempos": cronometro.tiempos}
+
+    metricas.incrementar(f"chat_respondido_{ganador}")
+    if ganador == "faq":
+        faq = resultados["faq"]
+        return {"tipo": "faq", "respuesta": faq["respuesta"], "faq": faq,
+                "contexto": contexto, "tiempos": cronometro.tiempos}
+    funciones = resultados["funcion"]
+    return {"tipo": "funcion", "funciones": funciones, "funcion": funciones[0],
+            "contexto": contexto, "tiempos": cronometro.tiempos}
@@ -1,23 +1,46 @@
-from fastapi import APIRouter, Body, UploadFile, File, Query, HTTPException
+from fastapi import APIRouter, Body, UploadFile, File, Query, HTTPException, Request, Response
 
 from typing import Any, Dict
-from model.retrain import retrain_from_csv
 from llm.llm import naturalize_response
 from datetime import date , timedelta
-from tts.textToSpeech import tts
 import base64
+import asyncio
+import time
 import os
 import json
-from lipsync.lipsyncgen import generate_lipsync
+from lipsync.fragmentos import audio_avatar_fragmentado, dividir_oraciones, unir_fragmentos
+from lipsync.cache_avatar import audio_avatar, buscar_audio, guardar_audio
 from ai.matcher import FunctionCaller
 from db.functions import generate_csv , generate_excel, top_selling, least_selling
-from llm.agent import check_regex_response
-from model.methods import predict_stock_product_date
+from endpoint.pipeline_chat import clasificar_mensaje
+from endpoint.cache_respuestas import cache_chat, clave_chat
+from ai.contexto import normalizar_mensaje
+from model.methods import predict_stock_product_date, predict_stock_range, predecir_trayectorias, stock_en_fecha
+from model.methods import iterar_trayectorias, version_modelo, marca_datos, matriz_stock
+from model.methods import ventanas_desde_payload, predecir_ventanas, FEATURES, N_STEPS, DIAS_LARGO_PLAZO
+import pandas as pd
 from db.models import listar_productos
+from endpoint.executors import en_ejecutor
+from endpoint.streaming import formato_stream, respuesta_stream
+from endpoint.singleflight import SingleFlight
+from endpoint import metricas
+from endpoint.admision import control_admision
+from endpoint.serializacion import RespuestaJSONRapida, formato_respuesta, matriz_a_respuesta
+from endpoint.columnar import formato_binario, respuesta_binaria, esquema, lote_desde_matriz, lote_errores
+from endpoint.columnar import lote_desde_columnas
+from endpoint.condicional import Condicional
+from jobs.gestor import gestor_trabajos, ColaLlena, TrabajoCancelado
+from jobs.proceso import ejecutar_en_proceso
+from fastapi.responses import FileResponse
+import numpy as np
 
 router = APIRouter()
 caller = FunctionCaller()
 
+# Cómputos de predicción idénticos y concurrentes se ejecutan una sola vez
+vuelo_predicciones = SingleFlight("prediccion")
+vuelo_chat = SingleFlight("chat")
+
 #Funciones auxiliares de transformacion
 # --- Funciones auxiliares ---
 def audio_to_base64(path):
@@ -47,6 +70,29 @@ def file_to_base64(file_path):
 
 
 
+@router.get(
+    "/health",
+    summary="Estado del servicio",
+    description="Ruta liviana para comprobar que el worker responde"
+)
+async def health():
+    """
+    No toca el modelo ni la base de datos: su latencia refleja solo la
+    disponibilidad del event loop.
+    """
+    return {"status": "ok"}
+
+
+@router.get(
+    "/metrics",
+    summary="Métricas del worker",
+    description="Contadores, valores y tiempos del proceso (single-flight, colas, etapas)"
+)
+async def metrics():
+    return metricas.instantanea()
+
+
+
 @router.post(
     "/predict/product-date",
     summary="Predecir stock de producto específico en una fecha específica",
@@ -66,12 +112,18 @@ async def predict_product_fecha(request: Dict[str, Any] = Body(...)):
         
     llm = request.get("llm")
     
-    pred = predict_stock_product_date(
-        product_id=product,
-        date=date)
+    clave = ("product-date", product, str(date), version_modelo(), marca_datos())
+    pred = await vuelo_predicciones.ejecutar(
+        clave,
+        lambda: en_ejecutor(
+            "modelo",
+            predict_stock_product_date,
+            product_id=product,
+            date=date)
+    )
     
     if(llm):
-        pred = naturalize_response("Se envió una solicitud en donde se intenta predecir el stock de un producto específico en una fecha los datos son los siguientes"+str(pred))
+        pred = await en_ejecutor("llm", naturalize_response, "Se envió una solicitud en donde se intenta predecir el stock de un producto específico en una fecha los datos son los siguientes"+str(pred))
     
     return pred
 
@@ -95,31 +147,33 @@ async def predict_product(request: Dict[str, Any] = Body(...)):
     day = date.today()
 
     result = []
-    # Buscar hasta 365 días hacia adelante
-    for i in range (30):
-        day = day+timedelta(days=1)
-        pred = predict_stock_product_date(
+    # Una sola trayectoria de 30 días (directa si el horizonte lo permite)
+    start_date = (day + timedelta(days=1)).strftime("%Y-%m-%d")
+    end_date = (day + timedelta(days=30)).strftime("%Y-%m-%d")
+    clave = ("product", product, start_date, end_date, version_modelo(), marca_datos())
+    rango = await vuelo_predicciones.ejecutar(
+        clave,
+        lambda: en_ejecutor(
+            "modelo",
+            predict_stock_range,
             product_id=product,
-            date=day
+            start_date=start_date,
+            end_date=end_date
         )
+    )
+    if "error" in rango:
+        return rango["error"]
 
+    for i, diario in enumerate(rango["daily_predictions"]):
+        day = day + timedelta(days=1)
         result.append(
             {
-                      
                 "product_name": product,
-                "predicted_stock": int(pred["predicted_stock"]),
+                "predicted_stock": int(diario["predicted_stock"]),
                 "date": day
-                
-        }
+            }
         )
-        print({
-                      
-            "product_name": product,
-            "predicted_stock": int(pred["predicted_stock"]),
-            "date": day
-            
-        })
-        if pred["predicted_stock"] <= 0:
+        if diario["predicted_stock"] <= 0:
             break
     
     
@@ -128,7 +182,7 @@ async def predict_product(request: Dict[str, Any] = Body(...)):
     llm = request.get("llm")
     
     if(llm):
-        pred = naturalize_response("Se envió una solicitud en donde se intenta predecir stock de producto en el tiempo hasta que se agote los datos son los siguientes"+str(pred))
+        pred = await en_ejecutor("llm", naturalize_response, "Se envió una solicitud en donde se intenta predecir stock de producto en el tiempo hasta que se agote los datos son los siguientes"+str(pred))
     return pred
 
 
@@ -137,22 +191,30 @@ async def predict_product(request: Dict[str, Any] = Body(...)):
     summary="Predecir stock de todos los productos hasta que alguno se agote totalmente",
     description="Predice el stock de todos los productos hasta que alguno se agote totalmente"
 )
-async def predict_date(request: Dict[str, Any] = Body(...)):
+async def predict_date(request: Dict[str, Any] = Body(...), http_request: Request = None):
     """
     Predice el stock de todos los productos específico hasta que se acabe
+
+    Con `stream` ("ndjson" | "sse") o la cabecera Accept correspondiente,
+    emite cada producto en cuanto se calcula.
     """
     print("prediccion con fecha")
-    PRODUCTS = listar_productos()
+    PRODUCTS = await en_ejecutor("db", listar_productos)
     date = request.get("date")
 
     if not date:
         return  "Faltan campos obligatorios: date"
         
+    formato = formato_stream(request, http_request.headers.get("accept") if http_request else None)
+    if formato:
+        return respuesta_stream(_stream_predict_date(PRODUCTS, date), formato)
         
     results = []
 
     for product in PRODUCTS:
-        predi = predict_stock_product_date(
+        predi = await en_ejecutor(
+            "modelo",
+            predict_stock_product_date,
             product_id=product,
             date=date
         )
@@ -162,72 +224,548 @@ async def predict_date(request: Dict[str, Any] = Body(...)):
             "predicted_stock": int(predi["predicted_stock"]),
             "date":date
         })
-        print({
-            "product_name": product,
-            "predicted_stock": int(predi["predicted_stock"]),
-            "date":date
-        })
     
     pred = results
     
     llm = request.get("llm")
     
     if(llm):
-        pred = naturalize_response("Se envió una solicitud en donde se intenta predecir stock de todos los productos en cierta fecha los datos son los siguientes"+str(pred))
+        pred = await en_ejecutor("llm", naturalize_response, "Se envió una solicitud en donde se intenta predecir stock de todos los productos en cierta fecha los datos son los siguientes"+str(pred))
         
     return pred
 
+def _deadline_s(request: Dict[str, Any]):
+    """Presupuesto `deadline_ms` del body en segundos (None si no viene); 400 si es inválido."""
+    deadline_ms = request.get("deadline_ms")
+    if deadline_ms is None:
+        return None
+    try:
+        deadline_s = float(deadline_ms) / 1000
+    except (TypeError, ValueError):
+        raise HTTPException(status_code=400, detail=f"deadline_ms inválido: {deadline_ms}")
+    if not deadline_s > 0:
+        raise HTTPException(status_code=400, detail="deadline_ms debe ser positivo")
+    return deadline_s
+
+
 @router.post(
     "/predict/all",
     summary="Predecir stock de todos los productos hasta que alguno se agote",
-    description="Predice el stock de todos los productos hasta que alguno se agote"
+    description="Predice el stock de todos los productos hasta que alguno se agote",
+    response_class=RespuestaJSONRapida
 )
-async def predict_stock(request: Dict[str, Any] = Body(...)):
+async def predict_stock(request: Dict[str, Any] = Body({}), http_request: Request = None):
     """
-    Predice el stock de un producto específico hasta que se acabe
+    Predice el stock de todos los productos hasta que alguno se acabe.
+
+    Acepta `deadline_ms` opcional: presupuesto de cómputo de la solicitud. Los
+    productos se calculan por prioridad (menor stock actual primero) y, si el
+    tiempo se agota, se responde con lo calculado. Con `deadline_ms` la
+    respuesta va envuelta:
+
+        {"resultados": <respuesta sin deadline>, "truncado": bool,
+         "pendientes": [product_id, ...], "tiempo_s": float}
+
+    Las filas salen siempre en el orden del catálogo (listar_productos), no en
+    el de cálculo.
+
+    Con `stream` ("ndjson" | "sse") emite la trayectoria de cada producto en
+    cuanto su lote termina y un evento final con el día de agotamiento.
     """
     print("prediccion sin argumentos")
     
-    PRODUCTS = listar_productos()
+    control = control_admision("prediccion_masiva")
+    formato = formato_stream(request, http_request.headers.get("accept") if http_request else None)
+    if formato:
+        deadline_s = _deadline_s(request)
+        # El cupo se mantiene mientras dura el stream
+        inicio = await control.entrar()
+        try:
+            PRODUCTS = await en_ejecutor("db", listar_productos)
+            eventos = _stream_predict_stock(PRODUCTS, pd.Timestamp(date.today()), deadline_s)
+            return respuesta_stream(control.envolver_stream(eventos, inicio), formato)
+        except BaseException:
+            control.salir(inicio)
+            raise
     
-    pred = "" ## mensaje de respuesta
+    async with control.admitir():
+        return await _predict_stock(request)
+
+
+async def _predict_stock(request: Dict[str, Any]):
+    PRODUCTS = await en_ejecutor("db", listar_productos)
     
-    day = date.today()
-    results = []
+    deadline_s = _deadline_s(request)
     
+    day = pd.Timestamp(date.today())
+    motor = await en_ejecutor("modelo", predecir_trayectorias, PRODUCTS, day + timedelta(days=29), deadline_s=deadline_s)
+    # El motor entrega por prioridad de cálculo; la respuesta, en orden de catálogo
+    trayectorias = {pid: motor["trayectorias"][pid] for pid in PRODUCTS if pid in motor["trayectorias"]}
     
-    for i in range (30):
-        zero = False
-        for product in PRODUCTS:
-            pred = predict_stock_product_date(
-                product_id=product,
-                date=day)
-            day = day+ timedelta(days=1)
-            
-            results.append({
-                    "product_name": product,
-                    "predicted_stock": int(pred["predicted_stock"]),
-                    "current_stock": pred["current_stock"],
-                })
-            print(str({
-                    "product_name": product,
-                    "predicted_stock": int(pred["predicted_stock"]),
-                    "current_stock": pred["current_stock"],
-                }))
-            if(int(pred["predicted_stock"]) <= 0):
-                zero = True
-            
-        if zero == True:
-            break
-        
-    pred = results
+    fechas = pd.date_range(day, periods=30, freq="D")
+    matriz = matriz_stock(trayectorias, fechas)
+    
+    # Se corta en el primer día en que algún producto se agota (incluido)
+    agotados = np.flatnonzero((matriz.astype(np.int64) <= 0).any(axis=0))
+    n_dias = int(agotados[0]) + 1 if len(agotados) else len(fechas)
+    
+    pred = matriz_a_respuesta(
+        list(trayectorias),
+        fechas[:n_dias].strftime("%Y-%m-%d").tolist(),
+        matriz[:, :n_dias],
+        formato=formato_respuesta(request),
+        por_producto={"current_stock": np.round([t["current_stock"] for t in trayectorias.values()], 2)},
+        entero=True
+    )
     
     llm = request.get("llm")
     
     if(llm):
-        pred = naturalize_response("Se envió una solicitud en donde se intenta predecir stock de todos los productos hasta que alguno se agote los datos son los siguientes"+str(pred))
+        pred = await en_ejecutor("llm", naturalize_response, "Se envió una solicitud en donde se intenta predecir stock de todos los productos hasta que alguno se agote los datos son los siguientes"+str(pred))
     
-    return pred
+    if deadline_s is None:
+        return pred
+    
+    return {
+        "resultados": pred,
+        "truncado": motor["truncado"],
+        "pendientes": motor["pendientes"],
+        "tiempo_s": motor["tiempo_s"]
+    }
+
+
+
+# Máximo de pares (producto, fecha) por solicitud de /predict/bulk
+MAX_PARES_BULK = 1000
+
+
+@router.post(
+    "/predict/bulk",
+    summary="Predecir stock para muchos pares producto/fecha",
+    description="Responde cientos de pares (producto, fecha) con una trayectoria por producto",
+    response_class=RespuestaJSONRapida
+)
+async def predict_bulk(request: Dict[str, Any] = Body(...), http_request: Request = None):
+    """
+    Agrupa los pares por producto, calcula una sola trayectoria por producto
+    hasta la fecha más lejana pedida (en lotes, con el motor de trayectorias)
+    y responde cada par desde esa trayectoria, en el orden recibido.
+
+    Body:
+        pairs: [{"name": product_id, "date": "YYYY-MM-DD"}, ...]
+        formato: "filas" (por defecto), "columnar" (arrays paralelos),
+                 "arrow" o "parquet" (también por cabecera Accept)
+    """
+    binario = formato_binario(request, http_request.headers.get("accept") if http_request else None)
+    pares = request.get("pairs")
+    if not pares:
+        return "Faltan campos obligatorios: pairs"
+    if not isinstance(pares, list):
+        raise HTTPException(status_code=400, detail="pairs debe ser una lista de {name, date}")
+    if len(pares) > MAX_PARES_BULK:
+        raise HTTPException(status_code=400, detail=f"Máximo {MAX_PARES_BULK} pares por solicitud")
+
+    fechas_finales = {}
+    for idx, par in enumerate(pares):
+        if (not isinstance(par, dict) or not par.get("name") or not par.get("date")
+                or not isinstance(par["name"], (str, int)) or not isinstance(par["date"], str)):
+            raise HTTPException(status_code=400, detail=f"Par {idx} inválido, se requieren name y date: {par}")
+        try:
+            fecha = pd.to_datetime(par["date"])
+        except (ValueError, TypeError):
+            raise HTTPException(status_code=400, detail=f"Par {idx}: fecha inválida: {par['date']}")
+        producto = par["name"]
+        if producto not in fechas_finales or fecha > fechas_finales[producto]:
+            fechas_finales[producto] = fecha
+
+    async with control_admision("prediccion_masiva").admitir():
+        motor = await en_ejecutor("modelo", predecir_trayectorias, list(fechas_finales), fechas_finales)
+
+    # Una fila de la matriz por producto, solo con las fechas pedidas de ese producto
+    stock = np.full(len(pares), np.nan)
+    actual = np.full(len(pares), np.nan)
+    errores = {}
+    por_producto = {}
+    for idx, par in enumerate(pares):
+        por_producto.setdefault(par["name"], []).append(idx)
+    for producto, indices in por_producto.items():
+        if producto in motor["errores"]:
+            errores[producto] = motor["errores"][producto]
+            continue
+        trayectoria = motor["trayectorias"][producto]
+        fila = matriz_stock({producto: trayectoria}, [pares[i]["date"] for i in indices])[0]
+        stock[indices] = fila
+        actual[indices] = trayectoria["current_stock"]
+
+    stock, actual = np.round(stock, 2), np.round(actual, 2)
+
+    if binario:
+        esquema_lote = esquema(_metadatos_binarios())
+        return respuesta_binaria(
+            _lotes_bulk(pares, stock, actual, motor, errores, esquema_lote),
+            binario,
+            esquema_lote,
+            nombre_archivo="predict_bulk"
+        )
+
+    if formato_respuesta(request) == "columnar":
+        resultados = {
+            "product_name": [par["name"] for par in pares],
+            "date": [par["date"] for par in pares],
+            "predicted_stock": stock.tolist(),
+            "current_stock": actual.tolist(),
+        }
+    else:
+        resultados = []
+        for idx, par in enumerate(pares):
+            if par["name"] in errores:
+                resultados.append({"product_name": par["name"], "date": par["date"], "error": errores[par["name"]]})
+                continue
+            resultados.append({
+                "product_name": par["name"],
+                "date": par["date"],
+                "predicted_stock": stock[idx],
+                "current_stock": actual[idx],
+                "tipo": motor["trayectorias"][par["name"]]["tipo"]
+            })
+
+    return {
+        "resultados": resultados,
+        "productos": len(fechas_finales),
+        "errores": errores,
+        "tiempo_s": motor["tiempo_s"]
+    }
+
+
+
+# Horizonte máximo de /predict/matrix
+MAX_DIAS_MATRIZ = 365
+
+
+@router.post(
+    "/predict/matrix",
+    summary="Matriz de stock productos × días",
+    description="Stock predicho de todo el catálogo (o de una lista de productos) para los próximos N días",
+    response_class=RespuestaJSONRapida
+)
+async def predict_matrix(request: Dict[str, Any] = Body({}), http_request: Request = None):
+    """
+    Matriz completa de stock predicho, pensada para exportaciones analíticas.
+
+    Body:
+        products: Lista de productos (por defecto todo el catálogo)
+        dias: Horizonte en días desde mañana (por defecto 90)
+        deadline_ms: Presupuesto de cómputo opcional
+        formato: "filas", "columnar", "arrow" o "parquet"
+
+    En Arrow / Parquet la respuesta se transmite lote a lote según termina
+    cada lote del motor de trayectorias, sin construir la matriz completa.
+    """
+    binario = formato_binario(request, http_request.headers.get("accept") if http_request else None)
+    try:
+        dias = int(request.get("dias", DIAS_LARGO_PLAZO))
+    except (TypeError, ValueError):
+        raise HTTPException(status_code=400, detail="dias debe ser un entero")
+    if not 1 <= dias <= MAX_DIAS_MATRIZ:
+        raise HTTPException(status_code=400, detail=f"dias debe estar entre 1 y {MAX_DIAS_MATRIZ}")
+
+    deadline_s = _deadline_s(request)
+    fechas = pd.date_range(pd.Timestamp(date.today()) + timedelta(days=1), periods=dias, freq="D")
+
+    control = control_admision("prediccion_masiva")
+    inicio = await control.entrar()
+    try:
+        products = request.get("products") or await en_ejecutor("db", listar_productos)
+
+        if binario:
+            # El cupo se mantiene mientras dura la transmisión
+            esquema_lote = esquema(_metadatos_binarios())
+            lotes = _lotes_matriz(products, fechas, esquema_lote, deadline_s)
+            return respuesta_binaria(
+                control.envolver_stream(lotes, inicio),
+                binario,
+                esquema_lote,
+                nombre_archivo=f"predict_matrix_{dias}d"
+            )
+    except BaseException:
+        control.salir(inicio)
+        raise
+
+    try:
+        motor = await en_ejecutor("modelo", predecir_trayectorias, products, fechas[-1], deadline_s=deadline_s)
+    finally:
+        control.salir(inicio)
+
+    trayectorias = motor["trayectorias"]
+    return {
+        "resultados": matriz_a_respuesta(
+            list(trayectorias),
+            fechas.strftime("%Y-%m-%d").tolist(),
+            matriz_stock(trayectorias, fechas),
+            formato=formato_respuesta(request),
+            por_producto={"current_stock": np.round([t["current_stock"] for t in trayectorias.values()], 2)}
+        ),
+        "errores": motor["errores"],
+        "truncado": motor["truncado"],
+        "pendientes": motor["pendientes"],
+        "tiempo_s": motor["tiempo_s"]
+    }
+
+
+def _metadatos_binarios():
+    """Metadatos del esquema Arrow: qué modelo y qué datos generaron la respuesta."""
+    return {
+        "version_modelo": version_modelo(),
+        "marca_datos": marca_datos(),
+        "generado": pd.Timestamp.now().isoformat(),
+    }
+
+
+async def _lotes_matriz(products, fechas, esquema_lote, deadline_s=None):
+    """Record batches de /predict/matrix, uno por lote del motor de trayectorias."""
+    motor = iterar_trayectorias(products, fechas[-1], deadline_s=deadline_s)
+
+    while True:
+        lote = await en_ejecutor("modelo", next, motor, None)
+        if lote is None:
+            break
+        trayectorias = lote["trayectorias"]
+        if trayectorias:
+            yield lote_desde_matriz(
+                list(trayectorias),
+                fechas.values,
+                matriz_stock(trayectorias, fechas),
+                [t["current_stock"] for t in trayectorias.values()],
+                [t["tipo"] for t in trayectorias.values()],
+                esquema_lote
+            )
+        errores = dict(lote["errores"])
+        errores.update({p: "Pendiente: se agotó el deadline_ms" for p in lote["pendientes"]})
+        if errores:
+            yield lote_errores(errores, esquema_lote)
+
+
+async def _lotes_bulk(pares, stock, actual, motor, errores, esquema_lote):
+    """Un único record batch con los pares de /predict/bulk en el orden recibido."""
+    yield lote_desde_columnas(
+        [par["name"] for par in pares],
+        [par["date"] for par in pares],
+        stock,
+        actual,
+        [None if par["name"] in errores else motor["trayectorias"][par["name"]]["tipo"] for par in pares],
+        [errores.get(par["name"]) for par in pares],
+        esquema_lote
+    )
+
+
+
+# --- GET condicionales ---
+# Mismo cálculo que los POST, pero con ETag / Last-Modified: si el cliente ya
+# tiene la versión actual se responde 304 sin tocar el modelo.
+
+def _hoy():
+    """Medianoche de hoy: las ventanas relativas a hoy cambian cada día."""
+    return pd.Timestamp(date.today()).to_pydatetime()
+
+
+@router.get(
+    "/predict/product-date",
+    summary="Predecir stock de producto en una fecha (GET condicional)",
+    description="Como POST /predict/product-date, con ETag y Last-Modified"
+)
+async def get_predict_product_fecha(
+    http_request: Request,
+    response: Response,
+    name: str = Query(...),
+    date: str = Query(...)
+):
+    condicional = Condicional(http_request, ("product-date", name, date))
+    if condicional.no_modificado():
+        return condicional.respuesta_304()
+    resultado = await predict_product_fecha({"name": name, "date": date})
+    return condicional.aplicar(resultado, response)
+
+
+@router.get(
+    "/predict/product",
+    summary="Predecir stock de producto hasta que se agote (GET condicional)",
+    description="Como POST /predict/product, con ETag y Last-Modified"
+)
+async def get_predict_product(http_request: Request, response: Response, name: str = Query(...)):
+    # La ventana es relativa a hoy: el día forma parte de la clave
+    condicional = Condicional(http_request, ("product", name, date.today()), vigente_desde=_hoy())
+    if condicional.no_modificado():
+        return condicional.respuesta_304()
+    resultado = await predict_product({"name": name})
+    return condicional.aplicar(resultado, response)
+
+
+@router.get(
+    "/predict/all",
+    summary="Predecir stock de todos los productos (GET condicional)",
+    description="Como POST /predict/all, con ETag y Last-Modified",
+    response_class=RespuestaJSONRapida
+)
+async def get_predict_stock(http_request: Request, response: Response, formato: str = Query("filas")):
+    condicional = Condicional(
+        http_request,
+        ("all", date.today(), formato, http_request.headers.get("accept")),
+        vigente_desde=_hoy()
+    )
+    if condicional.no_modificado():
+        return condicional.respuesta_304()
+    resultado = await predict_stock({"formato": formato}, http_request)
+    return condicional.aplicar(resultado, response)
+
+
+@router.get(
+    "/predict/matrix",
+    summary="Matriz de stock productos × días (GET condicional)",
+    description="Como POST /predict/matrix, con ETag y Last-Modified",
+    response_class=RespuestaJSONRapida
+)
+async def get_predict_matrix(
+    http_request: Request,
+    response: Response,
+    dias: int = Query(DIAS_LARGO_PLAZO),
+    formato: str = Query("filas"),
+    products: str = Query(None, description="Productos separados por coma (por defecto todo el catálogo)")
+):
+    productos = [p.strip() for p in products.split(",") if p.strip()] if products else None
+    # La representación depende también del formato negociado por Accept
+    condicional = Condicional(
+        http_request,
+        ("matrix", date.today(), dias, formato, products, http_request.headers.get("accept")),
+        vigente_desde=_hoy()
+    )
+    if condicional.no_modificado():
+        return condicional.respuesta_304()
+    resultado = await predict_matrix({"dias": dias, "formato": formato, "products": productos}, http_request)
+    return condicional.aplicar(resultado, response)
+
+
+
+async def _stream_predict_date(products, fecha):
+    """Eventos de /predict/date: un "producto" por producto y un "fin"."""
+    total = 0
+    for product in products:
+        predi = await en_ejecutor(
+            "modelo",
+            predict_stock_product_date,
+            product_id=product,
+            date=fecha
+        )
+        if "error" in predi:
+            yield "error", {"product_name": product, "message": predi["error"]}
+            continue
+        total += 1
+        yield "producto", {
+            "product_name": product,
+            "predicted_stock": int(predi["predicted_stock"]),
+            "date": fecha
+        }
+    yield "fin", {"total": total}
+
+
+async def _stream_predict_stock(products, dia_inicio, deadline_s=None, dias=30):
+    """
+    Eventos de /predict/all: la trayectoria de cada producto en cuanto termina
+    su lote del motor, y un "fin" con el primer día en que alguno se agota.
+    """
+    fechas = [dia_inicio + timedelta(days=i) for i in range(dias)]
+    motor = iterar_trayectorias(products, fechas[-1], deadline_s=deadline_s)
+    dia_agotamiento = None
+    pendientes = []
+
+    while True:
+        lote = await en_ejecutor("modelo", next, motor, None)
+        if lote is None:
+            break
+        for product, trayectoria in lote["trayectorias"].items():
+            filas = []
+            for fecha in fechas:
+                stock = int(stock_en_fecha(trayectoria, fecha))
+                filas.append({"date": fecha.strftime("%Y-%m-%d"), "predicted_stock": stock})
+                if stock <= 0:
+                    if dia_agotamiento is None or fecha < dia_agotamiento:
+                        dia_agotamiento = fecha
+                    break
+            yield "producto", {
+                "product_name": product,
+                "current_stock": round(trayectoria["current_stock"], 2),
+                "trayectoria": filas
+            }
+        for product, mensaje in lote["errores"].items():
+            yield "error", {"product_name": product, "message": mensaje}
+        pendientes.extend(lote["pendientes"])
+
+    yield "fin", {
+        "dia_agotamiento": dia_agotamiento.strftime("%Y-%m-%d") if dia_agotamiento is not None else None,
+        "truncado": len(pendientes) > 0,
+        "pendientes": pendientes
+    }
+
+
+
+# Límites de /predict/window: acotan el trabajo que una solicitud deja en el pool del modelo
+MAX_VENTANAS = 256
+MAX_HORIZONTE_VENTANA = DIAS_LARGO_PLAZO
+
+
+@router.post(
+    "/predict/window",
+    summary="Predecir a partir de ventanas enviadas por el cliente",
+    description="Ejecuta el modelo sobre una o varias ventanas N_STEPS×features sin consultar la base de datos",
+    response_class=RespuestaJSONRapida
+)
+async def predict_window(request: Dict[str, Any] = Body(...)):
+    """
+    Endpoint de cómputo puro: recibe ventanas explícitas (por ejemplo desde un
+    POS con datos más frescos que la BD) y las predice como un único lote.
+
+    Body:
+        windows: lista de ventanas; cada una con N_STEPS filas (lista de valores
+                 en el orden de FEATURES o diccionario {feature: valor})
+        horizonte: días a predecir por ventana (por defecto 1, máximo MAX_HORIZONTE_VENTANA)
+
+    Se admiten hasta MAX_VENTANAS ventanas por solicitud.
+    """
+    windows = request.get("windows")
+    if windows is None and request.get("window") is not None:
+        windows = [request.get("window")]
+
+    if not windows:
+        return "Faltan campos obligatorios: windows"
+
+    if not isinstance(windows, list):
+        raise HTTPException(status_code=400, detail="windows debe ser una lista de ventanas")
+    if len(windows) > MAX_VENTANAS:
+        raise HTTPException(status_code=400, detail=f"Máximo {MAX_VENTANAS} ventanas por solicitud")
+
+    try:
+        horizonte = int(request.get("horizonte", 1))
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=400, detail=f"Horizonte inválido: {request.get('horizonte')}")
+    if not 1 <= horizonte <= MAX_HORIZONTE_VENTANA:
+        raise HTTPException(
+            status_code=400,
+            detail=f"El horizonte debe estar entre 1 y {MAX_HORIZONTE_VENTANA}"
+        )
+
+    try:
+        ventanas = ventanas_desde_payload(windows)
+    except (ValueError, TypeError) as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    predicciones, tipo = await en_ejecutor("modelo", predecir_ventanas, ventanas, horizonte)
+
+    return {
+        "features": FEATURES,
+        "n_steps": N_STEPS,
+        "horizonte": horizonte,
+        "tipo": tipo,
+        "predicciones": np.round(predicciones, 2).tolist()
+    }
 
 
 
@@ -281,11 +819,218 @@ async def predict_stock(request: Dict[str, Any] = Body(...)):
     summary="Envía mensajes directamente al chat, para que este procese la información, y sean presentadas utilizando un agente avatar con inteligencia artificial",
     description="Envía y procesa imagenes con un avatar e inteligencia artificial"
 )
-async def chat(request: Dict[str, Any] = Body(...)):
+async def chat(request: Dict[str, Any] = Body(...), http_request: Request = None):
     """
     Recibe la información en forma de query, la procesa, y la presenta a los usuarios naturalizados.
+
+    Una pregunta repetida (mismo mensaje normalizado, mismo modelo y datos) se
+    responde desde la caché, con su audio y lipsync, sin pasar por la cola.
+
+    Con `stream` ("ndjson" | "sse") o Accept text/event-stream la respuesta es
+    progresiva: primero el texto ("texto"), luego el audio y los mouthCues de
+    cada oración en cuanto están listos ("audio", en orden) y un evento "fin".
+    El avatar puede empezar a hablar con la primera oración.
+    """
+    query = request.get("message")
+    clave = clave_chat(normalizar_mensaje(query), version_modelo(), marca_datos())
+    cacheada = cache_chat.obtener(clave)
+
+    formato = formato_stream(request, http_request.headers.get("accept") if http_request else None)
+    if formato:
+        if cacheada is not None:
+            return respuesta_stream(_stream_chat_cacheado(cacheada), formato)
+        control = control_admision("chat")
+        # El cupo se mantiene mientras dura el stream
+        inicio = await control.entrar()
+        try:
+            return respuesta_stream(control.envolver_stream(_stream_chat(request, clave), inicio), formato)
+        except BaseException:
+            control.salir(inicio)
+            raise
+
+    if cacheada is not None:
+        return cacheada
+
+    async with control_admision("chat").admitir():
+        return await vuelo_chat.ejecutar(clave, lambda: _procesar_y_guardar_chat(request, clave))
+
+
+async def _procesar_y_guardar_chat(request: Dict[str, Any], clave: str):
+    respuesta, cacheable = await _procesar_chat(request)
+    if cacheable:
+        cache_chat.guardar(clave, respuesta)
+    return respuesta
+
+
+def _evento_audio(indice: int, total: int, inicio_s: float, texto: str, avatar: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        "indice": indice,
+        "total": total,
+        "inicio": round(inicio_s, 2),
+        "text": texto,
+        "audio": avatar["audio_wav"],
+        "lipsync": avatar["lipsync"]
+    }
+
+
+async def _stream_chat_cacheado(respuesta: Dict[str, Any]):
+    """Respuesta cacheada en formato de stream: el audio completo como una sola oración."""
+    mensaje = respuesta["messages"][0]
+    yield "texto", {k: v for k, v in mensaje.items() if k not in ("audio", "lipsync")}
+    yield "audio", _evento_audio(0, 1, 0.0, mensaje["text"], {"audio_wav": mensaje["audio"], "lipsync": mensaje["lipsync"]})
+    yield "fin", {"fragmentos": 1, "cache": True}
+
+
+async def _stream_chat(request: Dict[str, Any], clave: str):
     """
+    Eventos de /chat progresivo.
+
+    Las oraciones se sintetizan en paralelo (ejecutor de audio) pero se emiten
+    en orden: la primera sale en cuanto está lista, sin esperar a las demás.
+    """
+    inicio = time.perf_counter()
+    texto = await _texto_chat(request)
+    mensaje = _mensaje_chat(texto)
+    yield "texto", mensaje
+
+    completo = await en_ejecutor("audio", buscar_audio, texto["text"])
+    fragmentos = [texto["text"]] if completo is not None else (dividir_oraciones(texto["text"]) or [texto["text"]])
+    tareas = [] if completo is not None else [
+        asyncio.ensure_future(en_ejecutor("audio", audio_avatar, fragmento)) for fragmento in fragmentos
+    ]
+    resultados = []
+    desplazamiento = 0.0
+    try:
+        for indice, fragmento in enumerate(fragmentos):
+            avatar = completo if completo is not None else await tareas[indice]
+            if indice == 0:
+                metricas.registrar_tiempo("chat_stream_primer_audio", time.perf_counter() - inicio)
+            resultados.append(avatar)
+            yield "audio", _evento_audio(indice, len(fragmentos), desplazamiento, fragmento, avatar)
+            desplazamiento += avatar["lipsync"].get("metadata", {}).get("duration", 0.0)
+    finally:
+        # Cliente desconectado o error: no sintetizar lo que ya no se enviará
+        for tarea in tareas:
+            tarea.cancel()
+
+    yield "fin", {"fragmentos": len(fragmentos), "duracion": round(desplazamiento, 2),
+                  "total_ms": round((time.perf_counter() - inicio) * 1000, 2)}
+
+    # El audio unido queda en caché bajo el texto completo y, si se puede, la
+    # respuesta completa para /chat normal y repeticiones
+    unido = resultados[0]
+    if len(resultados) > 1:
+        unido = await en_ejecutor("audio", unir_fragmentos, resultados)
+        await en_ejecutor("audio", guardar_audio, texto["text"], unido)
+    if texto["cacheable"]:
+        cache_chat.guardar(clave, {"messages": [_mensaje_chat(texto, unido)]})
+
+
+# Funciones que consultan la BD en cada llamada: su respuesta no entra en la
+# caché de /chat (la clave solo cambia con el modelo y el dataset cargado)
+FUNCIONES_EN_VIVO = {"top_selling", "least_selling"}
+
+
+async def _ejecutar_funcion(resultado: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Ejecuta una función identificada por el matcher y arma su texto de respuesta.
+
+    Returns:
+        {"texto": str, "file_data", "file_name", "file_type"} (archivo solo en reportes)
+    """
+    file_data = None
+    file_name = None
+    file_type = None
+    pred = "La función con mayor probabilidad es " + resultado['funcion'] + " los resultados de la función son: "
+    print("Funcion: " + resultado['funcion'])
+    print("Confianza: " + str(resultado['confianza']))
+    
+    if str(resultado['funcion']) == "predict_stock":
+        # Se pasa un body explícito: llamada directa, sin FastAPI que resuelva Body({})
+        pred += str(await predict_stock({}))
+        
+    elif str(resultado['funcion']) == "predict_product":
+        pred += str(await predict_product({"name": resultado['parametros']['producto']}))
+        
+    elif str(resultado['funcion']) == "predict_date":
+        data = await predict_date({"date": resultado['parametros']['fecha']})
+        print(data)
+        pred += str(data)
+        
+    elif str(resultado['funcion']) == "predict_product_fecha":
+        pred += str(await predict_product_fecha({
+            "name": resultado['parametros']['producto'],
+            "date": resultado['parametros']['fecha']
+        }))
+        
+    elif str(resultado['funcion']) == "top_selling":
+        data = await en_ejecutor("db", top_selling)
+        pred += f"Los 5 productos más vendidos son: {str(data)}"
+
+    elif str(resultado['funcion']) == "least_selling":
+        data = await en_ejecutor("db", least_selling)
+        print(data)
+        pred += f"Los 5 productos menos vendidos son: {str(data)}"
+
+    elif str(resultado['funcion']) == "generate_csv":
+        month = resultado["parametros"].get("mes")
+        file_path = await _reporte_en_trabajo("csv", month)
+        
+        if file_path and os.path.exists(file_path):
+            file_data = await en_ejecutor("reportes", file_to_base64, file_path)
+            file_name = os.path.basename(file_path)
+            file_type = "text/csv"
+            pred = f"Se generó el reporte CSV exitosamente: {file_name}"
+        else:
+            pred = "Error al generar el archivo CSV"
+
+    elif str(resultado['funcion']) == "generate_excel":
+        month = resultado["parametros"].get("mes")
+        file_path = await _reporte_en_trabajo("excel", month)
+        
+        if file_path and os.path.exists(file_path):
+            file_data = await en_ejecutor("reportes", file_to_base64, file_path)
+            file_name = os.path.basename(file_path)
+            file_type = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+            pred = f"Se generó el reporte Excel exitosamente: {file_name}"
+        else:
+            pred = "Error al generar el archivo Excel"
+
+    return {"texto": pred, "file_data": file_data, "file_name": file_name, "file_type": file_type}
+
+
+async def _procesar_chat(request: Dict[str, Any]):
+    texto = await _texto_chat(request)
+    
+    # Audio (gTTS) y lipsync (Rhubarb) por oraciones en paralelo; lo ya sintetizado sale de la caché
+    avatar = await en_ejecutor("audio", audio_avatar_fragmentado, texto["text"])
+    print(f" Audio: {avatar['tiempos']}")
     
+    return {"messages": [_mensaje_chat(texto, avatar)]}, texto["cacheable"]
+
+
+def _mensaje_chat(texto: Dict[str, Any], avatar: Dict[str, Any] = None) -> Dict[str, Any]:
+    """Mensaje del avatar; sin `avatar` solo el texto (primer evento del stream)."""
+    response_data = {"text": texto["text"]}
+    if avatar is not None:
+        response_data["audio"] = avatar["audio_wav"]
+        response_data["lipsync"] = avatar["lipsync"]
+    response_data["facialExpression"] = "smile"
+    response_data["animation"] = "Standing"
+    
+    # Agregar archivo solo si existe
+    if texto["file"]:
+        response_data["file"] = texto["file"]
+    return response_data
+
+
+async def _texto_chat(request: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Texto de la respuesta de /chat (sin audio).
+
+    Returns:
+        {"text": str, "file": {data, name, type} | None, "cacheable": bool}
+    """
     query = request.get("message")
     print("chat request")
 
@@ -293,108 +1038,57 @@ async def chat(request: Dict[str, Any] = Body(...)):
     file_data = None  # Cambiado de 'file' a 'file_data' para mayor claridad
     file_name = None
     file_type = None
+    # Solo se cachean respuestas sin archivo adjunto, sin errores y sin datos en vivo
+    cacheable = True
     
-    # Primer filtro: expresiones regulares
-    regex_resp = check_regex_response(query)
+    # Regex → (embedding único) → FAQ ∥ funciones; gana por prioridad fija
+    clasificacion = await clasificar_mensaje(caller, query)
+    print(f" Pipeline: {clasificacion['tipo']} {clasificacion['tiempos']}")
     
-    if regex_resp:
+    if clasificacion["tipo"] == "regex":
         print(" Respondido por Regex")
-        pred = regex_resp
+        pred = clasificacion["respuesta"]
+    elif clasificacion["tipo"] == "faq":
+        print(f" Respondido por RAG (Confianza: {clasificacion['faq']['confianza']:.2f})")
+        pred = clasificacion["respuesta"]
+    elif clasificacion["tipo"] == "funcion":
+        # Una o varias intenciones: las funciones se ejecutan en paralelo
+        funciones = clasificacion["funciones"]
+        if any(resultado["funcion"] in FUNCIONES_EN_VIVO for resultado in funciones):
+            cacheable = False
+        salidas = await asyncio.gather(
+            *(_ejecutar_funcion(resultado) for resultado in funciones),
+            return_exceptions=True
+        )
+        # Un fallo en una intención no descarta las respuestas de las demás
+        for idx, salida in enumerate(salidas):
+            if isinstance(salida, Exception):
+                print(f"✗ Error ejecutando {funciones[idx]['funcion']}: {salida}")
+                salidas[idx] = {"texto": f"No pude completar {funciones[idx]['funcion']}: {salida}"}
+                cacheable = False
+        pred = "\n".join(salida["texto"] for salida in salidas)
+        con_archivo = next((salida for salida in salidas if salida.get("file_data")), None)
+        if con_archivo:
+            file_data = con_archivo["file_data"]
+            file_name = con_archivo["file_name"]
+            file_type = con_archivo["file_type"]
     else:
-        # Segundo filtro: RAG
-        faq_resp = caller.consultar_faq(query)
+        pred = "Lamentablemente no logré entender la solicitud. Recuerda que puedo hacer predicciones tomando parámetros como producto y fecha, revisar productos más y menos vendidos, además de generar reportes en Excel o CSV."
 
-        if faq_resp:
-            print(f" Respondido por RAG (Confianza: {faq_resp['confianza']:.2f})")
-            pred = faq_resp['respuesta'] 
-        else:
-            # Tercer filtro: function matcher
-            resultado = caller.identificar_funcion(query)
-            
-            if resultado['confianza'] > 0.8:
-                pred = "La función con mayor probabilidad es " + resultado['funcion'] + " los resultados de la función son: "
-                print("Funcion: " + resultado['funcion'])
-                print("Confianza: " + str(resultado['confianza']))
-                
-                if str(resultado['funcion']) == "predict_stock":
-                    pred += str(await predict_stock())
-                    
-                elif str(resultado['funcion']) == "predict_product":
-                    pred += str(await predict_product({"name": resultado['parametros']['producto']}))
-                    
-                elif str(resultado['funcion']) == "predict_date":
-                    data = await predict_date({"date": resultado['parametros']['fecha']})
-                    print(data)
-                    pred += str(data)
-                    
-                elif str(resultado['funcion']) == "predict_product_fecha":
-                    pred += str(await predict_product_fecha({
-                        "name": resultado['parametros']['producto'],
-                        "date": resultado['parametros']['fecha']
-                    }))
-                    
-                elif str(resultado['funcion']) == "top_selling":
-                    data = await top_selling()
-                    pred += f"Los 5 productos más vendidos son: {str(data)}"
-
-                elif str(resultado['funcion']) == "least_selling":
-                    data = await least_selling()
-                    print(data)
-                    pred += f"Los 5 productos menos vendidos son: {str(data)}"
-
-                elif str(resultado['funcion']) == "generate_csv":
-                    month = resultado["parametros"].get("mes")
-                    file_path = generate_csv(month)
-                    
-                    if file_path and os.path.exists(file_path):
-                        file_data = file_to_base64(file_path)
-                        file_name = os.path.basename(file_path)
-                        file_type = "text/csv"
-                        pred = f"Se generó el reporte CSV exitosamente: {file_name}"
-                    else:
-                        pred = "Error al generar el archivo CSV"
-
-                elif str(resultado['funcion']) == "generate_excel":
-                    month = resultado["parametros"].get("mes")
-                    file_path = generate_excel(month)
-                    
-                    if file_path and os.path.exists(file_path):
-                        file_data = file_to_base64(file_path)
-                        file_name = os.path.basename(file_path)
-                        file_type = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
-                        pred = f"Se generó el reporte Excel exitosamente: {file_name}"
-                    else:
-                        pred = "Error al generar el archivo Excel"
-            else:
-                pred = "Lamentablemente no logré entender la solicitud. Recuerda que puedo hacer predicciones tomando parámetros como producto y fecha, revisar productos más y menos vendidos, además de generar reportes en Excel o CSV."
-
-        # Naturalizar respuesta
-        # pred = naturalize_response(pred)
-    
-    # Audio generado por gTTS
-    tts(pred)
-    
-    # Json generado por rhubarb
-    generate_lipsync(pred)
-    
-    # Construir respuesta
-    response_data = {
-        "text": pred,
-        "audio": audio_to_base64("audios/audio.wav"),
-        "lipsync": read_json("audios/audio.json"),
-        "facialExpression": "smile",
-        "animation": "Standing"
-    }
+    # Naturalizar respuesta
+    # pred = naturalize_response(pred)
     
     # Agregar archivo solo si existe
+    archivo = None
     if file_data:
-        response_data["file"] = {
+        archivo = {
             "data": file_data,
             "name": file_name,
             "type": file_type
         }
+        cacheable = False
     
-    return {"messages": [response_data]}
+    return {"text": pred, "file": archivo, "cacheable": cacheable}
 
 
 
@@ -409,10 +1103,16 @@ async def upload_and_retrain(
     batch_size: int = Query(128, description="Tamaño del batch", ge=16, le=512),
     umbral_degradacion: float = Query(0.1, description="Porcentaje de degradación aceptable", ge=0.0, le=1.0),
     modo: str = Query("manual", description="Modo de reentrenamiento: 'automatico' o 'manual'"),
-    cargar_a_bd: bool = Query(False, description="Si cargar el CSV a PostgreSQL antes de reentrenar")
+    cargar_a_bd: bool = Query(False, description="Si cargar el CSV a PostgreSQL antes de reentrenar"),
+    horizonte_directo: int = Query(0, description="Días del modelo directo multi-horizonte (0 = no entrenarlo)", ge=0, le=90),
+    entrenar_semanal: bool = Query(False, description="Si entrenar también el modelo semanal de largo plazo"),
+    esperar: bool = Query(True, description="Si esperar el resultado o responder de inmediato con el trabajo (GET /jobs/{id})")
 ) -> Dict[str, Any]:
     """
     Recibe un archivo CSV, lo procesa y reentrena el modelo.
+
+    El reentrenamiento corre como trabajo en segundo plano. Con `esperar=false`
+    se responde al instante con el id del trabajo para consultar su progreso.
     """
 
     # Validar tipo de archivo
@@ -422,6 +1122,24 @@ async def upload_and_retrain(
             detail="El archivo debe ser un CSV (.csv)"
         )
 
+    if not esperar:
+        contents = await file.read()
+        if not contents:
+            raise HTTPException(status_code=400, detail="El archivo CSV está vacío")
+        return _trabajo_reentrenamiento(
+            contents, file.filename, epochs, batch_size, umbral_degradacion, modo,
+            cargar_a_bd, horizonte_directo, entrenar_semanal
+        )
+
+    async with control_admision("entrenamiento").admitir():
+        return await _upload_and_retrain(
+            file, epochs, batch_size, umbral_degradacion, modo,
+            cargar_a_bd, horizonte_directo, entrenar_semanal
+        )
+
+
+async def _upload_and_retrain(file, epochs, batch_size, umbral_degradacion, modo,
+                              cargar_a_bd, horizonte_directo, entrenar_semanal) -> Dict[str, Any]:
     try:
         # Leer contenido
         contents = await file.read()
@@ -433,16 +1151,15 @@ async def upload_and_retrain(
             )
 
         
-        # # Llamada a la función del modelo
-        resultado = retrain_from_csv(
-            csv_content=contents,
-            filename=file.filename,
-            epochs=epochs,
-            batch_size=batch_size,
-            umbral_degradacion=umbral_degradacion,
-            modo=modo,  
-            cargar_a_bd=cargar_a_bd
+        # # Llamada a la función del modelo (como trabajo: progreso y cancelación)
+        trabajo = _trabajo_reentrenamiento(
+            contents, file.filename, epochs, batch_size, umbral_degradacion, modo,
+            cargar_a_bd, horizonte_directo, entrenar_semanal
         )
+        try:
+            resultado = await gestor_trabajos().esperar(trabajo["id"])
+        except TrabajoCancelado:
+            raise HTTPException(status_code=409, detail=f"Reentrenamiento cancelado (trabajo {trabajo['id']})")
         
         
 
@@ -485,7 +1202,7 @@ async def approve_candidate_model(
     try:
         from model.retrain import retrain_manual_approve
         
-        resultado = retrain_manual_approve(version)
+        resultado = await en_ejecutor("entrenamiento", retrain_manual_approve, version)
         
         if not resultado.get("success"):
             raise HTTPException(
@@ -520,7 +1237,7 @@ async def reject_candidate_model(
     try:
         from model.retrain import retrain_manual_reject
         
-        resultado = retrain_manual_reject(version)
+        resultado = await en_ejecutor("entrenamiento", retrain_manual_reject, version)
         
         if not resultado.get("success"):
             raise HTTPException(
@@ -536,4 +1253,184 @@ async def reject_candidate_model(
         raise HTTPException(
             status_code=500,
             detail=f"Error al rechazar modelo: {str(e)}"
-        )
\ No newline at end of file
+        )
+
+
+
+# --- Trabajos en segundo plano ---
+# Reentrenamiento, reevaluación de candidatos y reportes se encolan en el
+# gestor de trabajos; el estado se consulta con GET /jobs/{id}.
+
+FORMATOS_REPORTE = {
+    "csv": (generate_csv, "text/csv"),
+    "excel": (generate_excel, "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"),
+}
+
+
+def _enviar_trabajo(tipo, fn, *args, parametros=None, **kwargs) -> Dict[str, Any]:
+    """Encola un trabajo; con la cola llena responde 429."""
+    try:
+        trabajo = gestor_trabajos().enviar(tipo, fn, *args, parametros=parametros, **kwargs)
+    except ColaLlena as e:
+        raise HTTPException(status_code=429, detail=str(e), headers={"Retry-After": "30"})
+    metricas.incrementar(f"trabajos_{tipo}_enviados")
+    trabajo["url"] = f"/api/jobs/{trabajo['id']}"
+    return trabajo
+
+
+def _trabajo_reentrenamiento(contents, filename, epochs, batch_size, umbral_degradacion, modo,
+                             cargar_a_bd, horizonte_directo, entrenar_semanal) -> Dict[str, Any]:
+    # Se entrena en un proceso hijo con el perfil de hilos "entrenamiento":
+    # este proceso tiene fijado el de inferencia (ver jobs/proceso.py)
+    parametros = {
+        "filename": filename, "epochs": epochs, "batch_size": batch_size, "modo": modo,
+        "cargar_a_bd": cargar_a_bd, "horizonte_directo": horizonte_directo,
+        "entrenar_semanal": entrenar_semanal
+    }
+    if contents is None:
+        return _enviar_trabajo(
+            "reentrenamiento", ejecutar_en_proceso, "model.retrain:retrain_from_database",
+            parametros=parametros,
+            epochs=epochs, batch_size=batch_size,
+            horizonte_directo=horizonte_directo, entrenar_semanal=entrenar_semanal
+        )
+    return _enviar_trabajo(
+        "reentrenamiento", ejecutar_en_proceso, "model.retrain:retrain_from_csv",
+        parametros=parametros,
+        csv_content=contents, filename=filename, epochs=epochs, batch_size=batch_size,
+        umbral_degradacion=umbral_degradacion, modo=modo, cargar_a_bd=cargar_a_bd,
+        horizonte_directo=horizonte_directo, entrenar_semanal=entrenar_semanal
+    )
+
+
+def _generar_reporte(formato: str, month=None, progreso=None) -> Dict[str, Any]:
+    """Cuerpo del trabajo de reporte: genera el archivo o falla con el motivo."""
+    generar, media_type = FORMATOS_REPORTE[formato]
+    file_path = generar(month, progreso=progreso)
+    if not file_path or not os.path.exists(file_path):
+        raise RuntimeError(f"Error al generar el archivo {formato.upper()}")
+    return {"file_path": file_path, "file_name": os.path.basename(file_path), "type": media_type}
+
+
+async def _reporte_en_trabajo(formato: str, month=None):
+    """Genera un reporte a través del gestor de trabajos y devuelve su ruta (o None)."""
+    try:
+        trabajo = gestor_trabajos().enviar("reporte", _generar_reporte, formato, month,
+                                           parametros={"formato": formato, "month": month})
+        resultado = await gestor_trabajos().esperar(trabajo["id"])
+    except (ColaLlena, TrabajoCancelado, RuntimeError) as e:
+        print(f"✗ Reporte {formato} no generado: {e}")
+        return None
+    return resultado["file_path"]
+
+
+@router.post(
+    "/jobs/retrain",
+    summary="Encolar reentrenamiento",
+    description="Reentrena en segundo plano desde un CSV (opcional) o desde PostgreSQL",
+    status_code=202
+)
+async def job_retrain(
+    file: UploadFile = File(None, description="CSV con datos nuevos (opcional: sin archivo se usa la BD)"),
+    epochs: int = Query(5, ge=1, le=100),
+    batch_size: int = Query(128, ge=16, le=512),
+    cargar_a_bd: bool = Query(False),
+    horizonte_directo: int = Query(0, ge=0, le=90),
+    entrenar_semanal: bool = Query(False)
+) -> Dict[str, Any]:
+    contents, filename = None, None
+    if file is not None:
+        if not file.filename.lower().endswith(".csv"):
+            raise HTTPException(status_code=400, detail="El archivo debe ser un CSV (.csv)")
+        contents, filename = await file.read(), file.filename
+        if not contents:
+            raise HTTPException(status_code=400, detail="El archivo CSV está vacío")
+
+    return _trabajo_reentrenamiento(
+        contents, filename, epochs, batch_size, 0.1, "manual",
+        cargar_a_bd, horizonte_directo, entrenar_semanal
+    )
+
+
+@router.post(
+    "/jobs/evaluate/{version}",
+    summary="Encolar reevaluación de un candidato",
+    description="Compara un candidato pendiente con el modelo en producción usando los datos actuales",
+    status_code=202
+)
+async def job_evaluate_candidate(version: str) -> Dict[str, Any]:
+    return _enviar_trabajo(
+        "evaluacion_candidato", ejecutar_en_proceso,
+        "model.retrain:retrain_manual_evaluate_candidate", version,
+        parametros={"version": version}
+    )
+
+
+@router.post(
+    "/jobs/report",
+    summary="Encolar generación de reporte",
+    description="Genera un reporte CSV o Excel en segundo plano",
+    status_code=202
+)
+async def job_report(request: Dict[str, Any] = Body({})) -> Dict[str, Any]:
+    """
+    Body:
+        formato: "csv" (por defecto) o "excel"
+        month: "YYYY-MM" (por defecto, últimos 30 días)
+    """
+    formato = request.get("formato", "csv")
+    if formato not in FORMATOS_REPORTE:
+        raise HTTPException(status_code=400, detail=f"formato debe ser uno de {list(FORMATOS_REPORTE)}")
+    month = request.get("month")
+    return _enviar_trabajo("reporte", _generar_reporte, formato, month,
+                           parametros={"formato": formato, "month": month})
+
+
+@router.get(
+    "/jobs",
+    summary="Listar trabajos",
+    description="Trabajos recientes, opcionalmente filtrados por tipo y estado"
+)
+async def list_jobs(tipo: str = Query(None), estado: str = Query(None)):
+    return gestor_trabajos().listar(tipo=tipo, estado=estado)
+
+
+@router.get(
+    "/jobs/{job_id}",
+    summary="Estado de un trabajo",
+    description="Estado, progreso, resultado o error de un trabajo"
+)
+async def get_job(job_id: str) -> Dict[str, Any]:
+    trabajo = gestor_trabajos().obtener(job_id)
+    if trabajo is None:
+        raise HTTPException(status_code=404, detail=f"Trabajo {job_id} no encontrado")
+    return trabajo
+
+
+@router.post(
+    "/jobs/{job_id}/cancel",
+    summary="Cancelar un trabajo",
+    description="Cancela un trabajo pendiente o detiene uno en curso en su siguiente paso"
+)
+async def cancel_job(job_id: str) -> Dict[str, Any]:
+    trabajo = gestor_trabajos().cancelar(job_id)
+    if trabajo is None:
+        raise HTTPException(status_code=404, detail=f"Trabajo {job_id} no encontrado")
+    return trabajo
+
+
+@router.get(
+    "/jobs/{job_id}/file",
+    summary="Descargar el archivo de un trabajo de reporte",
+    description="Devuelve el CSV / Excel generado por un trabajo completado"
+)
+async def get_job_file(job_id: str):
+    trabajo = gestor_trabajos().obtener(job_id)
+    if trabajo is None:
+        raise HTTPException(status_code=404, detail=f"Trabajo {job_id} no encontrado")
+    resultado = trabajo.get("resultado") or {}
+    if trabajo["estado"] != "completado" or not resultado.get("file_path"):
+        raise HTTPException(status_code=409, detail=f"El trabajo no tiene archivo (estado: {trabajo['estado']})")
+    if not os.path.exists(resultado["file_path"]):
+        raise HTTPException(status_code=410, detail="El archivo ya no existe")
+    return FileResponse(resultado["file_path"], media_type=resultado["type"], filename=resultado["file_name"])
@@ -0,0 +1,123 @@
+"""
+Serialización rápida de respuestas
+==================================
+Las respuestas de predicción son matrices productos × días. En lugar de
+convertir cada valor NumPy con int()/float() y dejar que FastAPI pase todo por
+su encoder genérico, se serializa directamente desde los arrays:
+
+    - RespuestaJSONRapida usa orjson (serializa ndarray y escalares NumPy de
+      forma nativa) y, si no está instalado, json estándar con un `default`
+      que entiende NumPy y fechas.
+    - matriz_a_respuesta arma la respuesta por filas (lista de dicts, formato
+      histórico) o columnar (arrays paralelos), que reduce CPU y tamaño.
+
+USO:
+    @router.post("/predict/bulk", response_class=RespuestaJSONRapida)
+"""
+
+import json
+from datetime import date, datetime
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+from fastapi.responses import JSONResponse
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+FORMATOS = ("filas", "columnar")
+
+
+def _por_defecto(obj):
+    """Convierte tipos que el encoder JSON no conoce."""
+    if isinstance(obj, np.ndarray):
+        if obj.dtype.kind == "f":
+            # NaN no es JSON válido: se envía como null
+            return np.where(np.isnan(obj), None, obj).tolist()
+        return obj.tolist()
+    if isinstance(obj, np.generic):
+        return obj.item()
+    if isinstance(obj, (pd.Timestamp, datetime, date)):
+        return obj.isoformat()
+    if isinstance(obj, pd.Series):
+        return obj.tolist()
+    return str(obj)
+
+
+def serializar(contenido: Any) -> bytes:
+    """JSON en bytes, con arrays NumPy serializados sin pasar por listas Python si hay orjson."""
+    if orjson is not None:
+        return orjson.dumps(
+            contenido,
+            default=_por_defecto,
+            option=orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+        )
+    return json.dumps(
+        contenido, default=_por_defecto, ensure_ascii=False, separators=(",", ":")
+    ).encode("utf-8")
+
+
+class RespuestaJSONRapida(JSONResponse):
+    """JSONResponse que serializa con `serializar` (NumPy-aware)."""
+
+    def render(self, content: Any) -> bytes:
+        return serializar(content)
+
+
+def formato_respuesta(request: Dict[str, Any]) -> str:
+    """Formato pedido en el body ("filas" por defecto)."""
+    formato = request.get("formato", "filas")
+    return formato if formato in FORMATOS else "filas"
+
+
+def matriz_a_respuesta(
+    productos: List[str],
+    fechas: List[str],
+    matriz: np.ndarray,
+    formato: str = "filas",
+    por_producto: Optional[Dict[str, np.ndarray]] = None,
+    entero: bool = False
+):
+    """
+    Convierte una matriz productos × fechas en la respuesta de la API.
+
+    El orden de las filas es el histórico de /predict/all: por fecha y, dentro
+    de cada fecha, por producto.
+
+    Args:
+        productos: Nombres de las filas de la matriz
+        fechas: Fechas (texto) de las columnas
+        matriz: Array (P, D) con el stock predicho
+        formato: "filas" (lista de dicts) o "columnar" (arrays paralelos)
+        por_producto: Columnas adicionales con un valor por producto (ej. current_stock)
+        entero: Si truncar el stock a entero como las respuestas históricas
+    """
+    por_producto = por_producto or {}
+    valores = matriz.T.astype(np.int64) if entero else np.round(matriz.T, 2)
+    n_productos, n_fechas = len(productos), len(fechas)
+
+    if formato == "columnar":
+        columnas = {
+            "product_name": np.tile(np.asarray(productos, dtype=object), n_fechas).tolist(),
+            "date": np.repeat(np.asarray(fechas, dtype=object), n_productos).tolist(),
+            "predicted_stock": valores.ravel().tolist(),
+        }
+        for nombre, columna in por_producto.items():
+            columnas[nombre] = np.tile(np.asarray(columna), n_fechas).tolist()
+        # Listas nativas: FastAPI pasa el contenido por jsonable_encoder, que no admite ndarrays
+        return columnas
+
+    filas = []
+    valores = valores.tolist()
+    extras = {nombre: np.asarray(columna).tolist() for nombre, columna in por_producto.items()}
+    for j, fecha in enumerate(fechas):
+        for i, producto in enumerate(productos):
+            fila = {"product_name": producto, "predicted_stock": valores[j][i]}
+            for nombre, columna in extras.items():
+                fila[nombre] = columna[i]
+            fila["date"] = fecha
+            filas.append(fila)
+    return filas
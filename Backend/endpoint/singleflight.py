@@ -0,0 +1,53 @@
+"""
+Single-flight de cómputos idénticos
+===================================
+Cuando varias solicitudes concurrentes piden exactamente lo mismo (por ejemplo
+un dashboard que refresca /predict/product para el mismo producto), solo la
+primera lanza el cómputo; las demás esperan ese mismo resultado.
+
+La clave debe incluir todo lo que determina el resultado: producto, horizonte,
+versión del modelo y marca de agua de los datos.
+
+Métricas (GET /api/metrics):
+    singleflight_<nombre>_ejecuciones   cómputos realmente lanzados
+    singleflight_<nombre>_compartidas   solicitudes que reutilizaron uno en vuelo
+    singleflight_<nombre>_en_vuelo      cómputos en curso
+"""
+
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Hashable
+
+from endpoint import metricas
+
+
+class SingleFlight:
+    """Agrupa solicitudes concurrentes con la misma clave en un solo cómputo."""
+
+    def __init__(self, nombre: str):
+        self.nombre = nombre
+        self._en_vuelo: Dict[Hashable, asyncio.Task] = {}
+
+    async def ejecutar(self, clave: Hashable, fabrica: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        Devuelve el resultado de `fabrica()` para la clave, compartiéndolo con
+        las solicitudes concurrentes que usen la misma clave.
+
+        El cómputo corre en su propia tarea: si la solicitud que lo lanzó se
+        cancela (cliente desconectado), las demás siguen recibiendo el resultado.
+        """
+        tarea = self._en_vuelo.get(clave)
+        if tarea is not None:
+            metricas.incrementar(f"singleflight_{self.nombre}_compartidas")
+            return await asyncio.shield(tarea)
+
+        tarea = asyncio.ensure_future(fabrica())
+        self._en_vuelo[clave] = tarea
+        metricas.incrementar(f"singleflight_{self.nombre}_ejecuciones")
+        metricas.fijar(f"singleflight_{self.nombre}_en_vuelo", len(self._en_vuelo))
+
+        def _liberar(_):
+            self._en_vuelo.pop(clave, None)
+            metricas.fijar(f"singleflight_{self.nombre}_en_vuelo", len(self._en_vuelo))
+
+        tarea.add_done_callback(_liberar)
+        return await asyncio.shield(tarea)
@@ -0,0 +1,67 @@
+"""
+Respuestas en streaming (NDJSON / Server-Sent Events)
+=====================================================
+Permite emitir cada resultado en cuanto se calcula en lugar de construir la
+lista completa en memoria, de modo que el primer byte no depende del tamaño
+del catálogo.
+
+El formato se elige con el campo `stream` del body ("ndjson" o "sse") o con la
+cabecera Accept (application/x-ndjson, text/event-stream).
+
+    NDJSON: una línea JSON por evento: {"event": "producto", "data": {...}}
+    SSE:    event: producto\\ndata: {...}\\n\\n
+"""
+
+import json
+from typing import Any, AsyncIterator, Dict, Optional, Tuple
+
+from fastapi.responses import StreamingResponse
+
+MEDIA_TYPES = {
+    "ndjson": "application/x-ndjson",
+    "sse": "text/event-stream",
+}
+
+
+def formato_stream(request: Dict[str, Any], accept: Optional[str] = None) -> Optional[str]:
+    """Devuelve "ndjson", "sse" o None (respuesta JSON normal)."""
+    formato = request.get("stream")
+    if formato in MEDIA_TYPES:
+        return formato
+    if formato is True:
+        return "ndjson"
+
+    accept = (accept or "").lower()
+    if MEDIA_TYPES["sse"] in accept:
+        return "sse"
+    if MEDIA_TYPES["ndjson"] in accept:
+        return "ndjson"
+    return None
+
+
+def _codificar(evento: str, datos: Any, formato: str) -> bytes:
+    cuerpo = json.dumps(datos, default=str, ensure_ascii=False)
+    if formato == "sse":
+        return f"event: {evento}\ndata: {cuerpo}\n\n".encode("utf-8")
+    return (json.dumps({"event": evento, "data": datos}, default=str, ensure_ascii=False) + "\n").encode("utf-8")
+
+
+def respuesta_stream(eventos: AsyncIterator[Tuple[str, Any]], formato: str) -> StreamingResponse:
+    """
+    Envuelve un generador asíncrono de (evento, datos) en una StreamingResponse.
+
+    Si el generador falla a mitad de camino se emite un evento "error", ya que
+    el código de estado HTTP se envió con el primer byte.
+    """
+    async def cuerpo():
+        try:
+            async for evento, datos in eventos:
+                yield _codificar(evento, datos, formato)
+        except Exception as e:
+            yield _codificar("error", {"message": str(e)}, formato)
+
+    headers = {"Cache-Control": "no-cache"}
+    if formato == "sse":
+        # Evita que proxies como nginx acumulen el stream
+        headers["X-Accel-Buffering"] = "no"
+    return StreamingResponse(cuerpo(), media_type=MEDIA_TYPES[formato], headers=headers)
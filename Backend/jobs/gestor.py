@@ -0,0 +1,358 @@
+"""
+Trabajos en segundo plano
+=========================
+El reentrenamiento (cargar el dataset, entrenar el LSTM y evaluar dos veces),
+la reevaluación de candidatos y la generación de reportes CSV / Excel tardan
+de segundos a minutos. En lugar de mantener la conexión abierta, se encolan
+como trabajos:
+
+    - Pool acotado de hilos (JOBS_TRABAJADORES) y cola acotada (JOBS_COLA):
+      con la cola llena, `enviar` lanza ColaLlena (la API responde 429).
+    - Los tipos de TIPOS_EXCLUSIVOS (reentrenamiento, evaluación de
+      candidatos) corren de uno en uno en su propio hilo: dos reentrenamientos
+      a la vez competirían por los núcleos y por files/model_versions (la
+      versión del candidato tiene resolución de segundos). Sus trabajos
+      esperan como "pendiente" sin ocupar el pool general.
+    - El estado de cada trabajo se guarda en files/jobs/<id>.json, de modo que
+      GET /jobs/{id} sigue respondiendo tras reiniciar el servidor. Los
+      trabajos que estaban en curso al reiniciar quedan como "interrumpido".
+    - La función del trabajo recibe `progreso(fraccion, mensaje)`; se llama en
+      cada época de entrenamiento o bloque de reporte y es también el punto de
+      cancelación: si se pidió cancelar, lanza TrabajoCancelado.
+
+Estados: pendiente → en_curso → completado | fallido | cancelado | interrumpido
+
+USO:
+    gestor = gestor_trabajos()
+    trabajo = gestor.enviar("reporte_csv", generate_csv, month, parametros={"month": month})
+    gestor.obtener(trabajo["id"])
+    gestor.cancelar(trabajo["id"])
+"""
+
+import os
+import json
+import time
+import uuid
+import asyncio
+import threading
+from datetime import datetime
+from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+JOBS_DIR = BASE_DIR / "files" / "jobs"
+
+TRABAJADORES_POR_DEFECTO = 2
+COLA_POR_DEFECTO = 8
+# Trabajos terminados que se conservan (en memoria y en disco)
+HISTORIAL_POR_DEFECTO = 200
+# Intervalo mínimo entre escrituras a disco por actualizaciones de progreso
+INTERVALO_PERSISTENCIA_S = 1.0
+
+# Tipos de trabajo que nunca corren en paralelo consigo mismos
+TIPOS_EXCLUSIVOS = ("reentrenamiento", "evaluacion_candidato")
+
+ESTADOS_FINALES = ("completado", "fallido", "cancelado", "interrumpido")
+
+
+class TrabajoCancelado(BaseException):
+    """
+    Se lanza desde `progreso()` cuando se pidió cancelar el trabajo.
+
+    Hereda de BaseException, como asyncio.CancelledError, para que los
+    `except Exception` del código de entrenamiento y reportes no la oculten.
+    """
+
+
+class ColaLlena(Exception):
+    """No hay hueco en la cola de trabajos."""
+
+
+class _Trabajo:
+    """Estado de un trabajo y su control de cancelación."""
+
+    def __init__(self, tipo: str, parametros: Dict[str, Any], id_trabajo: str = None):
+        self.id = id_trabajo or uuid.uuid4().hex
+        self.tipo = tipo
+        self.parametros = parametros
+        self.estado = "pendiente"
+        self.progreso = 0.0
+        self.mensaje = "En cola"
+        self.creado = datetime.now().isoformat()
+        self.iniciado = None
+        self.terminado = None
+        self.resultado = None
+        self.error = None
+        self.cancelar = threading.Event()
+        self.futuro = None
+        self._ultima_escritura = 0.0
+
+    def a_dict(self) -> Dict[str, Any]:
+        return {
+            "id": self.id,
+            "tipo": self.tipo,
+            "estado": self.estado,
+            "progreso": round(self.progreso, 4),
+            "mensaje": self.mensaje,
+            "parametros": self.parametros,
+            "creado": self.creado,
+            "iniciado": self.iniciado,
+            "terminado": self.terminado,
+            "resultado": self.resultado,
+            "error": self.error,
+        }
+
+    @classmethod
+    def desde_dict(cls, datos: Dict[str, Any]) -> "_Trabajo":
+        trabajo = cls(datos["tipo"], datos.get("parametros") or {}, datos["id"])
+        for campo in ("estado", "progreso", "mensaje", "creado", "iniciado", "terminado", "resultado", "error"):
+            setattr(trabajo, campo, datos.get(campo))
+        return trabajo
+
+
+class GestorTrabajos:
+    """Pool acotado de trabajos con estado persistido, progreso y cancelación."""
+
+    def __init__(
+        self,
+        trabajadores: int = TRABAJADORES_POR_DEFECTO,
+        cola: int = COLA_POR_DEFECTO,
+        historial: int = HISTORIAL_POR_DEFECTO,
+        directorio: Path = JOBS_DIR
+    ):
+        self.trabajadores = trabajadores
+        self.cola = cola
+        self.historial = historial
+        self.directorio = Path(directorio)
+        self.directorio.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._trabajos: Dict[str, _Trabajo] = {}
+        self._ejecutor = ThreadPoolExecutor(max_workers=trabajadores, thread_name_prefix="trabajo")
+        self._exclusivos = {
+            tipo: ThreadPoolExecutor(max_workers=1, thread_name_prefix=f"trabajo-{tipo}")
+            for tipo in TIPOS_EXCLUSIVOS
+        }
+        self._cargar()
+
+    # ------------------------------------------------------------------
+    # Persistencia
+    # ------------------------------------------------------------------
+    def _ruta(self, id_trabajo: str) -> Path:
+        return self.directorio / f"{id_trabajo}.json"
+
+    def _persistir(self, trabajo: _Trabajo, forzar: bool = True):
+        ahora = time.monotonic()
+        if not forzar and ahora - trabajo._ultima_escritura < INTERVALO_PERSISTENCIA_S:
+            return
+        trabajo._ultima_escritura = ahora
+        ruta = self._ruta(trabajo.id)
+        temporal = ruta.with_suffix(".json.tmp")
+        try:
+            with open(temporal, "w", encoding="utf-8") as f:
+                json.dump(trabajo.a_dict(), f, ensure_ascii=False, default=str)
+            # Escritura atómica: nunca queda un JSON a medias
+            os.replace(temporal, ruta)
+        except OSError as e:
+            print(f"⚠ No se pudo guardar el estado del trabajo {trabajo.id}: {e}")
+
+    def _cargar(self):
+        """Recupera los trabajos guardados; los que no terminaron quedan interrumpidos."""
+        rutas = sorted(self.directorio.glob("*.json"), key=lambda r: r.stat().st_mtime)
+        for ruta in rutas[-self.historial:]:
+            try:
+                with open(ruta, encoding="utf-8") as f:
+                    trabajo = _Trabajo.desde_dict(json.load(f))
+            except (OSError, ValueError, KeyError) as e:
+                print(f"⚠ Estado de trabajo ilegible {ruta.name}: {e}")
+                continue
+            if trabajo.estado not in ESTADOS_FINALES:
+                trabajo.estado = "interrumpido"
+                trabajo.mensaje = "El servidor se reinició antes de terminar"
+                trabajo.terminado = datetime.now().isoformat()
+                self._persistir(trabajo)
+            self._trabajos[trabajo.id] = trabajo
+
+    def _recortar_historial(self):
+        terminados = [t for t in self._trabajos.values() if t.estado in ESTADOS_FINALES]
+        sobrantes = len(terminados) - self.historial
+        if sobrantes <= 0:
+            return
+        for trabajo in sorted(terminados, key=lambda t: t.terminado or "")[:sobrantes]:
+            self._trabajos.pop(trabajo.id, None)
+            try:
+                self._ruta(trabajo.id).unlink()
+            except OSError:
+                pass
+
+    # ------------------------------------------------------------------
+    # Ejecución
+    # ------------------------------------------------------------------
+    def _activos(self) -> int:
+        return sum(1 for t in self._trabajos.values() if t.estado in ("pendiente", "en_curso"))
+
+    def enviar(
+        self,
+        tipo: str,
+        fn: Callable,
+        *args,
+        parametros: Optional[Dict[str, Any]] = None,
+        **kwargs
+    ) -> Dict[str, Any]:
+        """
+        Encola `fn(*args, progreso=..., **kwargs)` como trabajo.
+
+        Args:
+            tipo: Nombre del tipo de trabajo (reentrenamiento, reporte_csv, ...)
+            fn: Función bloqueante; debe aceptar el argumento `progreso`
+            parametros: Parámetros visibles en el estado del trabajo
+
+        Returns:
+            Estado inicial del trabajo
+
+        Raises:
+            ColaLlena: si ya hay `trabajadores + cola` trabajos activos
+        """
+        with self._lock:
+            if self._activos() >= self.trabajadores + self.cola:
+                raise ColaLlena(f"Hay {self._activos()} trabajos activos, intenta más tarde")
+            trabajo = _Trabajo(tipo, parametros or {})
+            self._trabajos[trabajo.id] = trabajo
+            self._persistir(trabajo)
+            ejecutor = self._exclusivos.get(tipo, self._ejecutor)
+            trabajo.futuro = ejecutor.submit(self._ejecutar, trabajo, fn, args, kwargs)
+            return trabajo.a_dict()
+
+    def _ejecutar(self, trabajo: _Trabajo, fn: Callable, args, kwargs):
+        with self._lock:
+            if trabajo.cancelar.is_set():
+                return None
+            trabajo.estado = "en_curso"
+            trabajo.mensaje = "Iniciado"
+            trabajo.iniciado = datetime.now().isoformat()
+            self._persistir(trabajo)
+
+        def progreso(fraccion: float, mensaje: str = None):
+            if trabajo.cancelar.is_set():
+                raise TrabajoCancelado()
+            trabajo.progreso = min(max(float(fraccion), 0.0), 1.0)
+            if mensaje:
+                trabajo.mensaje = mensaje
+            self._persistir(trabajo, forzar=False)
+
+        try:
+            resultado = fn(*args, progreso=progreso, **kwargs)
+        except TrabajoCancelado:
+            self._terminar(trabajo, "cancelado", mensaje="Cancelado por el usuario")
+            raise
+        except Exception as e:
+            self._terminar(trabajo, "fallido", error=str(e), mensaje="Error")
+            raise
+
+        # Las funciones del backend informan errores como {"success": False, ...}
+        if isinstance(resultado, dict) and resultado.get("success") is False:
+            self._terminar(trabajo, "fallido", resultado=resultado,
+                           error=resultado.get("message"), mensaje="Error")
+        else:
+            self._terminar(trabajo, "completado", resultado=resultado, mensaje="Completado")
+        return resultado
+
+    def _terminar(self, trabajo: _Trabajo, estado: str, resultado=None, error=None, mensaje=None):
+        with self._lock:
+            trabajo.estado = estado
+            trabajo.resultado = resultado
+            trabajo.error = error
+            if mensaje:
+                trabajo.mensaje = mensaje
+            if estado == "completado":
+                trabajo.progreso = 1.0
+            trabajo.terminado = datetime.now().isoformat()
+            self._persistir(trabajo)
+            self._recortar_historial()
+
+    # ------------------------------------------------------------------
+    # Consulta y control
+    # ------------------------------------------------------------------
+    def obtener(self, id_trabajo: str) -> Optional[Dict[str, Any]]:
+        trabajo = self._trabajos.get(id_trabajo)
+        return trabajo.a_dict() if trabajo else None
+
+    def listar(self, tipo: str = None, estado: str = None) -> List[Dict[str, Any]]:
+        trabajos = [
+            t.a_dict() for t in list(self._trabajos.values())
+            if (tipo is None or t.tipo == tipo) and (estado is None or t.estado == estado)
+        ]
+        return sorted(trabajos, key=lambda t: t["creado"], reverse=True)
+
+    def cancelar(self, id_trabajo: str) -> Optional[Dict[str, Any]]:
+        """
+        Pide la cancelación. Un trabajo pendiente se cancela de inmediato; uno en
+        curso se detiene en su siguiente llamada a `progreso()`.
+        """
+        with self._lock:
+            trabajo = self._trabajos.get(id_trabajo)
+            if trabajo is None:
+                return None
+            if trabajo.estado in ESTADOS_FINALES:
+                return trabajo.a_dict()
+            trabajo.cancelar.set()
+            pendiente = trabajo.estado == "pendiente"
+            if not pendiente:
+                trabajo.mensaje = "Cancelación solicitada"
+                self._persistir(trabajo)
+
+        if pendiente:
+            if trabajo.futuro is not None:
+                trabajo.futuro.cancel()
+            self._terminar(trabajo, "cancelado", mensaje="Cancelado antes de iniciar")
+        return trabajo.a_dict()
+
+    async def esperar(self, id_trabajo: str) -> Any:
+        """
+        Espera el resultado de un trabajo desde el event loop.
+
+        Propaga la excepción del trabajo (TrabajoCancelado si se canceló).
+        """
+        trabajo = self._trabajos[id_trabajo]
+        if trabajo.futuro is None:
+            raise TrabajoCancelado() if trabajo.estado == "cancelado" else RuntimeError(trabajo.error or trabajo.mensaje)
+        try:
+            resultado = await asyncio.wrap_future(trabajo.futuro)
+        except asyncio.CancelledError:
+            if trabajo.estado == "cancelado":
+                raise TrabajoCancelado()
+            raise
+        if trabajo.estado == "cancelado":
+            raise TrabajoCancelado()
+        return resultado
+
+    def apagar(self):
+        """Cancela los trabajos activos y libera el pool (al cerrar la aplicación)."""
+        for trabajo in list(self._trabajos.values()):
+            if trabajo.estado in ("pendiente", "en_curso"):
+                trabajo.cancelar.set()
+        for ejecutor in (self._ejecutor, *self._exclusivos.values()):
+            ejecutor.shutdown(wait=False, cancel_futures=True)
+
+
+_gestor = None
+_gestor_lock = threading.Lock()
+
+
+def gestor_trabajos() -> GestorTrabajos:
+    """Gestor de trabajos (único por proceso)."""
+    global _gestor
+    if _gestor is None:
+        with _gestor_lock:
+            if _gestor is None:
+                _gestor = GestorTrabajos(
+                    trabajadores=int(os.getenv("JOBS_TRABAJADORES", TRABAJADORES_POR_DEFECTO)),
+                    cola=int(os.getenv("JOBS_COLA", COLA_POR_DEFECTO)),
+                    historial=int(os.getenv("JOBS_HISTORIAL", HISTORIAL_POR_DEFECTO)),
+                )
+    return _gestor
+
+
+def apagar_gestor():
+    if _gestor is not None:
+        _gestor.apagar()
@@ -0,0 +1,171 @@
+"""
+Trabajos en un proceso aparte
+=============================
+El servidor importa model.methods, que fija el perfil de hilos "inferencia"
+(pools de TensorFlow y afinidad de CPU) para todo el proceso. Un
+reentrenamiento ejecutado en un hilo del gestor de trabajos heredaría esos
+pools pequeños y los CPUS de inferencia, y TF_ENTRENAMIENTO_* no tendría efecto.
+
+Aquí la función del trabajo corre en un intérprete nuevo
+(`python -m jobs.proceso`) que aplica su perfil antes de importar TensorFlow:
+
+    - Los argumentos viajan por stdin (pickle).
+    - El hijo escribe en su stdout original una línea JSON por evento:
+      {"tipo": "progreso", ...}, {"tipo": "resultado", ...} o {"tipo": "error", ...}.
+      Sus prints (y los logs de TensorFlow) se redirigen a stderr, que se
+      hereda del servidor.
+    - El padre reenvía el progreso a `progreso(fraccion, mensaje)` y lo llama
+      también cada TIEMPO_SONDEO_S, de modo que cancelar el trabajo termina el
+      proceso hijo aunque la época en curso no haya acabado.
+
+Se usa un subproceso explícito y no multiprocessing "spawn" porque este
+vuelve a importar el módulo principal (main.py → rutas → model.methods), que
+aplicaría el perfil de inferencia antes que el de entrenamiento.
+
+USO:
+    resultado = ejecutar_en_proceso("model.retrain:retrain_from_database",
+                                    epochs=5, progreso=progreso)
+"""
+
+import os
+import sys
+import json
+import pickle
+import queue
+import importlib
+import threading
+import subprocess
+from pathlib import Path
+from typing import Any, Callable, Optional
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+
+# Cada cuánto se comprueba la cancelación mientras el hijo no informa progreso
+TIEMPO_SONDEO_S = 0.5
+# Espera tras terminate() antes de matar el proceso
+TIEMPO_TERMINAR_S = 10
+
+
+def _nativo(valor):
+    """
+    `default` de json.dumps para los resultados: arrays y escalares de numpy
+    (métricas, conteos) pasan a listas y números nativos; lo demás, a texto.
+    """
+    if hasattr(valor, "tolist"):
+        return valor.tolist()
+    return str(valor)
+
+
+def _leer_eventos(flujo, cola: queue.Queue):
+    for linea in flujo:
+        try:
+            cola.put(json.loads(linea))
+        except ValueError:
+            print(f"⚠ Salida no reconocida del proceso de trabajo: {linea[:200]!r}")
+    cola.put(None)
+
+
+def _lineas(flujo):
+    for linea in flujo:
+        yield linea.decode("utf-8", errors="replace")
+
+
+def _terminar(proceso: subprocess.Popen):
+    if proceso.poll() is not None:
+        return
+    proceso.terminate()
+    try:
+        proceso.wait(timeout=TIEMPO_TERMINAR_S)
+    except subprocess.TimeoutExpired:
+        proceso.kill()
+        proceso.wait()
+
+
+def ejecutar_en_proceso(
+    funcion: str,
+    *args,
+    progreso: Optional[Callable] = None,
+    perfil: str = "entrenamiento",
+    **kwargs
+) -> Any:
+    """
+    Ejecuta `funcion` ("modulo:nombre") en un proceso nuevo con el perfil de hilos dado.
+
+    La función recibe `progreso` como keyword, igual que en el gestor de
+    trabajos. Su resultado debe ser serializable a JSON.
+
+    Raises:
+        RuntimeError: Si la función lanza una excepción o el proceso termina sin resultado
+        TrabajoCancelado: Propagada desde `progreso`; el proceso hijo se termina
+    """
+    entrada = pickle.dumps({"funcion": funcion, "perfil": perfil, "args": args, "kwargs": kwargs})
+    proceso = subprocess.Popen(
+        [sys.executable, "-m", "jobs.proceso"],
+        cwd=str(BASE_DIR), stdin=subprocess.PIPE, stdout=subprocess.PIPE,
+        text=False
+    )
+    eventos = queue.Queue()
+    lector = threading.Thread(
+        target=_leer_eventos,
+        args=(_lineas(proceso.stdout), eventos),
+        name="trabajo-proceso", daemon=True
+    )
+    lector.start()
+
+    fraccion, mensaje = 0.0, None
+    try:
+        proceso.stdin.write(entrada)
+        proceso.stdin.close()
+        while True:
+            try:
+                evento = eventos.get(timeout=TIEMPO_SONDEO_S)
+            except queue.Empty:
+                if progreso is not None:
+                    progreso(fraccion)   # punto de cancelación
+                continue
+
+            if evento is None:
+                proceso.wait()
+                raise RuntimeError(f"El proceso de trabajo terminó sin resultado (código {proceso.returncode})")
+            if evento["tipo"] == "progreso":
+                fraccion, mensaje = evento["fraccion"], evento.get("mensaje")
+                if progreso is not None:
+                    progreso(fraccion, mensaje)
+            elif evento["tipo"] == "resultado":
+                proceso.wait()
+                return evento["resultado"]
+            else:
+                raise RuntimeError(evento.get("mensaje") or "Error en el proceso de trabajo")
+    finally:
+        _terminar(proceso)
+
+
+def _principal():
+    # El stdout original queda para los eventos; todo lo demás va a stderr
+    canal = os.fdopen(os.dup(sys.stdout.fileno()), "w", encoding="utf-8", buffering=1)
+    os.dup2(sys.stderr.fileno(), sys.stdout.fileno())
+
+    def emitir(evento: dict):
+        canal.write(json.dumps(evento, default=_nativo) + "\n")
+
+    try:
+        entrada = pickle.load(sys.stdin.buffer)
+
+        from model.cpu_config import configurar_hilos
+        configurar_hilos(entrada["perfil"])
+
+        modulo, nombre = entrada["funcion"].split(":")
+        fn = getattr(importlib.import_module(modulo), nombre)
+
+        def progreso(fraccion: float, mensaje: str = None):
+            emitir({"tipo": "progreso", "fraccion": float(fraccion), "mensaje": mensaje})
+
+        resultado = fn(*entrada["args"], progreso=progreso, **entrada["kwargs"])
+    except Exception as e:
+        emitir({"tipo": "error", "mensaje": f"{type(e).__name__}: {e}"})
+        sys.exit(1)
+    emitir({"tipo": "resultado", "resultado": resultado})
+
+
+if __name__ == "__main__":
+    _principal()
@@ -0,0 +1,251 @@
+"""
+Caché de audio y lipsync por contenido
+======================================
+Las mismas frases se repiten constantemente: respuestas regex, FAQs y
+mensajes como "Lamentablemente no logré entender la solicitud". El audio
+procesado (WAV en base64) y los mouthCues de Rhubarb dependen solo del
+texto y de los parámetros de síntesis, así que se guardan con la clave
+
+    sha256(versión del pipeline, texto, idioma, velocidad, voz)
+
+en dos niveles (más las respuestas fijas pre-renderizadas, que se consultan
+antes que el disco y nunca se expulsan, ver lipsync/prerender.py):
+
+    memoria   LRU por proceso acotado en bytes y entradas
+              (AUDIO_CACHE_MEMORIA_MB, AUDIO_CACHE_MEMORIA_ENTRADAS)
+    disco     files/cache_audio/<ab>/<clave>.json, compartido entre workers y
+              reinicios, LRU por fecha de uso acotado en bytes
+              (AUDIO_CACHE_DISCO_MB; directorio en AUDIO_CACHE_DIRECTORIO)
+
+Las escrituras a disco son atómicas (archivo temporal + os.replace): un
+lector nunca ve una entrada a medias. gTTS, el cambio de velocidad y Rhubarb
+solo se ejecutan en un fallo de ambos niveles.
+
+VERSION_PIPELINE cambia cuando cambia el procesado (p. ej. el algoritmo de
+velocidad) para no servir audio generado de otra forma.
+
+Métricas (GET /api/metrics):
+    cache_audio_aciertos/fallos/... (memoria, ver endpoint/cache_respuestas.py)
+    cache_audio_disco_aciertos, cache_audio_disco_fallos,
+    cache_audio_disco_expulsiones, cache_audio_disco_bytes
+    cache_audio_prerender_aciertos, cache_audio_prerender_fallos, cache_audio_prerender_bytes
+
+USO:
+    from lipsync.cache_avatar import audio_avatar
+    avatar = audio_avatar(texto)       # {"audio_wav", "lipsync", "tiempos"}
+"""
+
+import os
+import json
+import time
+import hashlib
+import tempfile
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+from endpoint import metricas
+from endpoint.cache_respuestas import CacheRespuestas
+from lipsync.lipsyncgen import generar_audio_avatar
+
+VERSION_PIPELINE = "pcm-wsola-rhubarb16k-1"
+
+DIRECTORIO_POR_DEFECTO = "files/cache_audio"
+DIRECTORIO_PRERENDER_POR_DEFECTO = "files/prerender_audio"
+DISCO_MB_POR_DEFECTO = 512
+MEMORIA_MB_POR_DEFECTO = 64
+
+
+def clave_audio(texto: str, idioma: str = "es", velocidad: float = 1.4, voz: str = "com") -> str:
+    """Clave por contenido: mismo texto y parámetros → mismo audio y lipsync."""
+    partes = [VERSION_PIPELINE, texto.strip(), idioma, f"{float(velocidad):g}", voz]
+    return hashlib.sha256("\x1f".join(partes).encode("utf-8")).hexdigest()
+
+
+class CacheDiscoAudio:
+    """
+    Entradas JSON en disco con límite de bytes; se expulsan las usadas hace
+    más tiempo (fecha de modificación, que se actualiza en cada acierto).
+    """
+
+    def __init__(self, directorio: str, max_bytes: float, nombre: str = "audio_disco"):
+        self.directorio = Path(directorio)
+        self.max_bytes = max_bytes
+        self.nombre = nombre
+        self._indice: "OrderedDict[str, int]" = OrderedDict()  # clave → bytes, de menos a más reciente
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._cargar()
+
+    def _ruta(self, clave: str) -> Path:
+        return self.directorio / clave[:2] / f"{clave}.json"
+
+    def _cargar(self):
+        """Reconstruye el índice con las entradas existentes (las temporales huérfanas se borran)."""
+        if not self.directorio.exists():
+            return
+        entradas = []
+        for ruta in self.directorio.glob("*/*"):
+            try:
+                if ruta.suffix == ".tmp":
+                    ruta.unlink()
+                    continue
+                estado = ruta.stat()
+            except OSError:
+                continue
+            entradas.append((estado.st_mtime, ruta.stem, estado.st_size))
+        for _, clave, tamano in sorted(entradas):
+            self._indice[clave] = tamano
+            self._bytes += tamano
+        metricas.fijar(f"cache_{self.nombre}_bytes", self._bytes)
+        print(f"✓ Caché {self.nombre}: {len(self._indice)} entradas ({self._bytes / 1024 / 1024:.1f} MB)")
+
+    def _olvidar(self, clave: str):
+        tamano = self._indice.pop(clave, None)
+        if tamano is not None:
+            self._bytes -= tamano
+
+    def obtener(self, clave: str) -> Optional[Dict[str, Any]]:
+        ruta = self._ruta(clave)
+        try:
+            with open(ruta, encoding="utf-8") as f:
+                valor = json.load(f)
+            os.utime(ruta)
+        except FileNotFoundError:
+            # Puede haberla expulsado otro worker
+            with self._lock:
+                self._olvidar(clave)
+            metricas.incrementar(f"cache_{self.nombre}_fallos")
+            return None
+        except (OSError, ValueError) as e:
+            print(f"⚠ Entrada de caché de audio ilegible {ruta.name}: {e}")
+            with self._lock:
+                self._olvidar(clave)
+            ruta.unlink(missing_ok=True)
+            metricas.incrementar(f"cache_{self.nombre}_fallos")
+            return None
+
+        with self._lock:
+            if clave in self._indice:
+                self._indice.move_to_end(clave)
+            else:
+                # Escrita por otro worker
+                self._indice[clave] = ruta.stat().st_size
+                self._bytes += self._indice[clave]
+        metricas.incrementar(f"cache_{self.nombre}_aciertos")
+        return valor
+
+    def guardar(self, clave: str, valor: Dict[str, Any]):
+        ruta = self._ruta(clave)
+        datos = json.dumps(valor, ensure_ascii=False).encode("utf-8")
+        if len(datos) > self.max_bytes:
+            return
+        try:
+            ruta.parent.mkdir(parents=True, exist_ok=True)
+            descriptor, temporal = tempfile.mkstemp(dir=ruta.parent, suffix=".tmp")
+            try:
+                with os.fdopen(descriptor, "wb") as f:
+                    f.write(datos)
+                # Escritura atómica: nunca queda una entrada a medias
+                os.replace(temporal, ruta)
+            except BaseException:
+                Path(temporal).unlink(missing_ok=True)
+                raise
+        except OSError as e:
+            print(f"⚠ No se pudo guardar el audio en caché: {e}")
+            return
+
+        expulsadas = []
+        with self._lock:
+            self._olvidar(clave)
+            self._indice[clave] = len(datos)
+            self._bytes += len(datos)
+            while self._bytes > self.max_bytes and len(self._indice) > 1:
+                vieja = next(iter(self._indice))
+                self._olvidar(vieja)
+                expulsadas.append(vieja)
+            metricas.fijar(f"cache_{self.nombre}_bytes", self._bytes)
+        for vieja in expulsadas:
+            self._ruta(vieja).unlink(missing_ok=True)
+        if expulsadas:
+            metricas.incrementar(f"cache_{self.nombre}_expulsiones", len(expulsadas))
+
+    def claves(self):
+        with self._lock:
+            return list(self._indice)
+
+    def eliminar(self, clave: str):
+        with self._lock:
+            self._olvidar(clave)
+            metricas.fijar(f"cache_{self.nombre}_bytes", self._bytes)
+        self._ruta(clave).unlink(missing_ok=True)
+
+
+cache_audio_memoria = CacheRespuestas(
+    "audio",
+    ttl_s=float("inf"),
+    max_entradas=int(os.getenv("AUDIO_CACHE_MEMORIA_ENTRADAS", 1024)),
+    max_bytes=int(float(os.getenv("AUDIO_CACHE_MEMORIA_MB", MEMORIA_MB_POR_DEFECTO)) * 1024 * 1024),
+)
+
+cache_audio_disco = CacheDiscoAudio(
+    os.getenv("AUDIO_CACHE_DIRECTORIO", DIRECTORIO_POR_DEFECTO),
+    int(float(os.getenv("AUDIO_CACHE_DISCO_MB", DISCO_MB_POR_DEFECTO)) * 1024 * 1024),
+)
+
+# Respuestas fijas pre-renderizadas (lipsync/prerender.py): sin límite de tamaño
+prerender_disco = CacheDiscoAudio(
+    os.getenv("AUDIO_PRERENDER_DIRECTORIO", DIRECTORIO_PRERENDER_POR_DEFECTO),
+    float("inf"),
+    nombre="audio_prerender",
+)
+
+
+def buscar_audio(texto: str, idioma: str = "es", velocidad: float = 1.4, voz: str = "com") -> Optional[Dict[str, Any]]:
+    """
+    Audio y lipsync ya generados de un texto, sin sintetizar nada.
+
+    Returns:
+        {"audio_wav", "lipsync", "tiempos": {"cache": nivel, "total": ms}} o None
+    """
+    inicio = time.perf_counter()
+    clave = clave_audio(texto, idioma, velocidad, voz)
+
+    valor, nivel = cache_audio_memoria.obtener(clave), "memoria"
+    if valor is None:
+        for nivel, cache in (("prerender", prerender_disco), ("disco", cache_audio_disco)):
+            valor = cache.obtener(clave)
+            if valor is not None:
+                cache_audio_memoria.guardar(clave, valor)
+                break
+
+    if valor is None:
+        return None
+    tiempos = {"cache": nivel, "total": round((time.perf_counter() - inicio) * 1000, 2)}
+    return dict(valor, tiempos=tiempos)
+
+
+def guardar_audio(texto: str, valor: Dict[str, Any], idioma: str = "es", velocidad: float = 1.4, voz: str = "com"):
+    """Guarda audio y lipsync ya generados de un texto en memoria y en disco."""
+    valor = {"audio_wav": valor["audio_wav"], "lipsync": valor["lipsync"]}
+    clave = clave_audio(texto, idioma, velocidad, voz)
+    cache_audio_disco.guardar(clave, valor)
+    cache_audio_memoria.guardar(clave, valor)
+
+
+def audio_avatar(texto: str, idioma: str = "es", velocidad: float = 1.4, voz: str = "com") -> Dict[str, Any]:
+    """
+    Audio (WAV en base64) y lipsync de un texto, desde la caché si existe.
+
+    Returns:
+        {"audio_wav": str, "lipsync": dict, "tiempos": {etapa: ms}}
+        En un acierto, tiempos = {"cache": "memoria" | "prerender" | "disco", "total": ms}
+    """
+    cacheado = buscar_audio(texto, idioma, velocidad, voz)
+    if cacheado is not None:
+        return cacheado
+
+    generado = generar_audio_avatar(texto, idioma=idioma, velocidad=velocidad, voz=voz)
+    guardar_audio(texto, generado, idioma, velocidad, voz)
+    return {"audio_wav": generado["audio_wav"], "lipsync": generado["lipsync"], "tiempos": generado["tiempos"]}
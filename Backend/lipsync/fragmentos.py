@@ -0,0 +1,186 @@
+"""
+Audio del avatar por oraciones, en paralelo
+===========================================
+Las respuestas largas (p. ej. una predicción de 30 días ya naturalizada) se
+enviaban a gTTS y Rhubarb en un solo bloque: la latencia crecía con la
+longitud del texto y todo corría en un solo hilo.
+
+Aquí el texto se divide en oraciones (dividir_oraciones), cada fragmento se
+sintetiza y se sincroniza en paralelo (audio_avatar, con su caché por
+fragmento) y el resultado se une (unir_fragmentos):
+
+    - el PCM de los fragmentos se concatena y se codifica una sola vez
+    - los mouthCues de cada fragmento se desplazan por la duración acumulada
+      y se fusionan en una sola línea de tiempo; los silencios consecutivos
+      ("X") en las uniones se juntan en uno
+
+El resultado tiene el mismo formato que Rhubarb ({"metadata", "mouthCues"}),
+así que el frontend no cambia. Se guarda en la caché de audio bajo el texto
+completo, de modo que una respuesta larga repetida no se vuelve a dividir.
+
+Los hilos (AUDIO_FRAGMENTOS_HILOS) pasan la mayor parte del tiempo esperando
+a gTTS (red) y a Rhubarb (subproceso), sin retener el GIL.
+
+USO:
+    from lipsync.fragmentos import audio_avatar_fragmentado
+    avatar = audio_avatar_fragmentado(texto)   # {"audio_wav", "lipsync", "tiempos"}
+"""
+
+import io
+import os
+import re
+import time
+import base64
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List
+
+from pydub import AudioSegment
+
+from endpoint import metricas
+from lipsync.cache_avatar import audio_avatar, buscar_audio, guardar_audio
+from tts.textToSpeech import wav_bytes
+
+HILOS_POR_DEFECTO = 4
+
+# Fin de oración (signo + espacio) o salto de línea (una línea por intención en /chat)
+SEPARADOR_ORACIONES = re.compile(r"(?<=[.!?…])\s+|\s*\n+\s*")
+
+# Fragmentos más cortos se unen al siguiente: cada fragmento cuesta una
+# llamada a gTTS y un Rhubarb, y las frases sueltas suenan entrecortadas
+MIN_CARACTERES_FRAGMENTO = 40
+
+# Los cues de Rhubarb tienen precisión de centésimas
+DECIMALES_CUES = 2
+
+_pool = None
+_lock = threading.Lock()
+
+
+def _pool_fragmentos() -> ThreadPoolExecutor:
+    global _pool
+    if _pool is None:
+        with _lock:
+            if _pool is None:
+                _pool = ThreadPoolExecutor(
+                    max_workers=int(os.getenv("AUDIO_FRAGMENTOS_HILOS", HILOS_POR_DEFECTO)),
+                    thread_name_prefix="audio-fragmento"
+                )
+    return _pool
+
+
+def dividir_oraciones(texto: str, min_caracteres: int = MIN_CARACTERES_FRAGMENTO) -> List[str]:
+    """
+    Divide el texto en fragmentos de una o más oraciones.
+
+    Las oraciones de menos de `min_caracteres` se unen a la siguiente (y la
+    última, si es corta, a la anterior).
+    """
+    oraciones = [o.strip() for o in SEPARADOR_ORACIONES.split(texto or "") if o and o.strip()]
+    fragmentos = []
+    actual = ""
+    for oracion in oraciones:
+        actual = f"{actual} {oracion}" if actual else oracion
+        if len(actual) >= min_caracteres:
+            fragmentos.append(actual)
+            actual = ""
+    if actual:
+        if fragmentos and len(actual) < min_caracteres:
+            fragmentos[-1] = f"{fragmentos[-1]} {actual}"
+        else:
+            fragmentos.append(actual)
+    return fragmentos
+
+
+def _decodificar_wav(audio_b64: str) -> AudioSegment:
+    return AudioSegment.from_file(io.BytesIO(base64.b64decode(audio_b64)), format="wav")
+
+
+def unir_cues(lipsyncs: List[Dict[str, Any]], duraciones: List[float]) -> Dict[str, Any]:
+    """
+    Une los mouthCues de varios fragmentos en una línea de tiempo.
+
+    Args:
+        lipsyncs: Salida de Rhubarb de cada fragmento, en orden
+        duraciones: Duración en segundos del audio de cada fragmento
+    """
+    cues = []
+    desplazamiento = 0.0
+    for lipsync, duracion in zip(lipsyncs, duraciones):
+        for cue in lipsync.get("mouthCues", []):
+            inicio = round(cue["start"] + desplazamiento, DECIMALES_CUES)
+            fin = round(min(cue["end"], duracion) + desplazamiento, DECIMALES_CUES)
+            if fin <= inicio:
+                continue
+            if cues and cues[-1]["value"] == cue["value"] and abs(cues[-1]["end"] - inicio) < 0.01:
+                # Mismo gesto a ambos lados de la unión (normalmente silencio "X")
+                cues[-1]["end"] = fin
+                continue
+            cues.append({"start": inicio, "end": fin, "value": cue["value"]})
+        desplazamiento += duracion
+
+    metadatos = dict(lipsyncs[0].get("metadata", {})) if lipsyncs else {}
+    metadatos["duration"] = round(desplazamiento, DECIMALES_CUES)
+    return {"metadata": metadatos, "mouthCues": cues}
+
+
+def unir_fragmentos(resultados: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    Concatena el audio y el lipsync de varios fragmentos.
+
+    Args:
+        resultados: [{"audio_wav": str (base64), "lipsync": dict}] en orden
+
+    Returns:
+        {"audio_wav": str (base64), "lipsync": dict}
+    """
+    segmentos = [_decodificar_wav(r["audio_wav"]) for r in resultados]
+    duraciones = [s.frame_count() / s.frame_rate for s in segmentos]
+    audio = segmentos[0]
+    for segmento in segmentos[1:]:
+        audio += segmento
+    return {
+        "audio_wav": base64.b64encode(wav_bytes(audio)).decode("utf-8"),
+        "lipsync": unir_cues([r["lipsync"] for r in resultados], duraciones)
+    }
+
+
+def audio_avatar_fragmentado(texto: str, idioma: str = "es", velocidad: float = 1.4, voz: str = "com") -> Dict[str, Any]:
+    """
+    Audio y lipsync de un texto, sintetizando sus oraciones en paralelo.
+
+    Si el texto completo ya está en caché o pre-renderizado se usa tal cual;
+    si tiene un solo fragmento equivale a audio_avatar. El resultado unido se
+    guarda en la caché bajo el texto completo, así que una respuesta larga
+    repetida no se vuelve a dividir ni a unir.
+
+    Returns:
+        {"audio_wav", "lipsync", "tiempos": {"fragmentos": n, "total": ms, ...}}
+    """
+    cacheado = buscar_audio(texto, idioma, velocidad, voz)
+    if cacheado is not None:
+        return cacheado
+
+    fragmentos = dividir_oraciones(texto)
+    if len(fragmentos) <= 1:
+        return audio_avatar(texto, idioma, velocidad, voz)
+
+    inicio = time.perf_counter()
+    resultados = list(_pool_fragmentos().map(
+        lambda fragmento: audio_avatar(fragmento, idioma, velocidad, voz), fragmentos
+    ))
+    inicio_union = time.perf_counter()
+    unido = unir_fragmentos(resultados)
+    guardar_audio(texto, unido, idioma, velocidad, voz)
+    fin = time.perf_counter()
+
+    metricas.incrementar("audio_fragmentos", len(fragmentos))
+    metricas.registrar_tiempo("audio_etapa_union", fin - inicio_union)
+    metricas.registrar_tiempo("audio_etapa_fragmentado_total", fin - inicio)
+    unido["tiempos"] = {
+        "fragmentos": len(fragmentos),
+        "sintesis_paralela": round((inicio_union - inicio) * 1000, 2),
+        "union": round((fin - inicio_union) * 1000, 2),
+        "total": round((fin - inicio) * 1000, 2),
+    }
+    return unido
@@ -1,14 +1,45 @@
 import subprocess
 import json
+import time
 import base64
 from pathlib import Path
 from pydub import AudioSegment
 import os
+import tempfile
 
-def generate_lipsync(text, output_name="output"):
-    mp3_path = Path(f"audios/audio.mp3")
-    wav_path = Path(f"audios/audio.wav")
-    json_path = Path(f"audios/audio.json")
+from endpoint import metricas
+from tts.textToSpeech import sintetizar, cambiar_velocidad, wav_bytes
+
+# Directorio base de los espacios de trabajo por solicitud (por defecto el temporal del sistema)
+DIRECTORIO_TEMPORAL_AUDIO = os.getenv("AUDIO_DIRECTORIO_TEMPORAL") or None
+
+# Rhubarb analiza voz: un WAV mono de 16 kHz basta y es más rápido de procesar
+FRECUENCIA_RHUBARB = 16000
+
+
+def _ejecutar_rhubarb(wav_path, json_path=None):
+    """Ejecuta Rhubarb sobre un WAV; sin `json_path` la salida se lee de stdout."""
+    comando = ["./lipsync/bin/rhubarb", "-f", "json"]
+    if json_path is not None:
+        comando += ["-o", str(json_path)]
+    comando += [str(wav_path), "-r", "phonetic"]
+
+    result = subprocess.run(comando, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+
+    if result.returncode != 0:
+        print("Error Rhubarb:", result.stderr.decode())
+        raise RuntimeError("Error al ejecutar Rhubarb.")
+
+    if json_path is None:
+        return json.loads(result.stdout.decode("utf-8"))
+    with open(json_path, "r") as f:
+        return json.load(f)
+
+
+def generate_lipsync(text, output_name="output", directorio="audios"):
+    mp3_path = Path(directorio) / "audio.mp3"
+    wav_path = Path(directorio) / "audio.wav"
+    json_path = Path(directorio) / "audio.json"
     
     # Convertir MP3 a WAV solo si el MP3 existe
     if mp3_path.exists():
@@ -22,21 +53,7 @@ def generate_lipsync(text, output_name="output"):
             raise FileNotFoundError(f"No existe ni MP3 ni WAV en {mp3_path.parent}")
 
     # 3. LIPSYNC con Rhubarb
-    result = subprocess.run([
-        "./lipsync/bin/rhubarb",
-        "-f", "json",
-        "-o", json_path,
-        wav_path,
-        "-r", "phonetic"
-    ], stdout=subprocess.PIPE, stderr=subprocess.PIPE)
-
-    if result.returncode != 0:
-        print("Error Rhubarb:", result.stderr.decode())
-        raise RuntimeError("Error al ejecutar Rhubarb.")
-
-    # 4. Cargar lipsync
-    with open(json_path, "r") as f:
-        lipsync_data = json.load(f)
+    lipsync_data = _ejecutar_rhubarb(wav_path, json_path)
 
     # 5. Retornar WAV en base64
     with open(wav_path, "rb") as f:
@@ -45,4 +62,69 @@ def generate_lipsync(text, output_name="output"):
     return {
         "audio_wav": audio_b64,
         "lipsync": lipsync_data
-    }
\ No newline at end of file
+    }
+
+
+def lipsync_pcm(audio, directorio):
+    """
+    Lipsync de un audio en memoria.
+
+    Escribe solo el WAV mono de 16 kHz que necesita Rhubarb (único archivo
+    del pipeline) y lee el JSON de stdout.
+    """
+    wav_path = Path(directorio) / "rhubarb.wav"
+    with open(wav_path, "wb") as f:
+        f.write(wav_bytes(audio, frecuencia=FRECUENCIA_RHUBARB, canales=1))
+    return _ejecutar_rhubarb(wav_path)
+
+
+def generar_audio_avatar(texto, idioma='es', velocidad=1.4, voz='com'):
+    """
+    Audio (WAV en base64) y lipsync de un texto, en un directorio propio.
+
+    Cada llamada trabaja en un directorio temporal único que se borra al
+    terminar, así que varias solicitudes de /chat pueden generar audio en
+    paralelo sin pisarse los archivos (antes todas usaban audios/audio.*).
+
+    El MP3 de gTTS se decodifica una sola vez; el cambio de velocidad, el WAV
+    para Rhubarb y el WAV del cliente salen del mismo PCM en memoria. Cada
+    etapa registra su tiempo (audio_etapa_<nombre> en GET /api/metrics).
+
+    Returns:
+        {"audio_wav": str (base64), "lipsync": dict (salida de Rhubarb),
+         "tiempos": {etapa: ms}}
+    """
+    tiempos = {}
+
+    def _registrar(etapa, inicio):
+        duracion = time.perf_counter() - inicio
+        tiempos[etapa] = round(duracion * 1000, 2)
+        metricas.registrar_tiempo(f"audio_etapa_{etapa}", duracion)
+
+    inicio_total = time.perf_counter()
+
+    inicio = time.perf_counter()
+    audio = sintetizar(texto, idioma, voz)
+    _registrar("sintesis", inicio)
+
+    inicio = time.perf_counter()
+    audio = cambiar_velocidad(audio, velocidad)
+    _registrar("velocidad", inicio)
+
+    if DIRECTORIO_TEMPORAL_AUDIO:
+        os.makedirs(DIRECTORIO_TEMPORAL_AUDIO, exist_ok=True)
+    with tempfile.TemporaryDirectory(prefix="chat_audio_", dir=DIRECTORIO_TEMPORAL_AUDIO) as directorio:
+        inicio = time.perf_counter()
+        lipsync_data = lipsync_pcm(audio, directorio)
+        _registrar("lipsync", inicio)
+
+    inicio = time.perf_counter()
+    audio_b64 = base64.b64encode(wav_bytes(audio)).decode("utf-8")
+    _registrar("codificacion", inicio)
+
+    _registrar("total", inicio_total)
+    return {
+        "audio_wav": audio_b64,
+        "lipsync": lipsync_data,
+        "tiempos": tiempos
+    }
@@ -0,0 +1,197 @@
+"""
+Pre-render de respuestas fijas
+==============================
+Las respuestas regex (llm/agent.py, RESPUESTAS_REGEX) y las de las FAQs
+(FAQ_DATA en ai/functionMatcher/Initializer.py y files/faqs.json) son textos
+fijos. Su audio y lipsync se generan una vez, fuera de las solicitudes, y se
+guardan en el almacén de pre-render (files/prerender_audio, sin expulsión).
+audio_avatar() lo consulta antes de la caché en disco, así que estas
+respuestas se sirven sin gTTS ni Rhubarb.
+
+Índice (files/prerender_audio/indice.json), por id de respuesta:
+
+    {"regex:saludo:0":    {"texto": "...", "clave": "<sha256>"},
+     "faq_knowledge:2":   {...},
+     "faq_manual:7":      {...}}
+
+El audio se guarda por contenido (clave_audio), así que respuestas repetidas
+se renderizan una sola vez, y se busca igual: audio_avatar calcula la clave
+del texto que va a sintetizar, sin pasar por el índice. El índice solo sirve
+para saber qué audio sigue en uso; las respuestas que desaparecen de su
+origen se quitan de él y su audio se borra.
+
+Se ejecuta al final de initialize_chatbot_db (FAQ_DATA) y de ingest_faqs
+(files/faqs.json); las respuestas regex se incluyen siempre. Los fallos (sin
+red para gTTS, sin Rhubarb) se avisan pero no interrumpen la inicialización:
+esas respuestas se generarán en la primera solicitud, como antes.
+
+USO (desde Backend/):
+    python -m lipsync.prerender                 # regex + FAQ_DATA + files/faqs.json
+    python -m lipsync.prerender --forzar        # vuelve a generar todo
+"""
+
+import os
+import json
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional
+
+from llm.agent import RESPUESTAS_REGEX
+from lipsync.cache_avatar import clave_audio, prerender_disco
+from lipsync.lipsyncgen import generar_audio_avatar
+
+HILOS_POR_DEFECTO = 4
+
+_lock_indice = threading.Lock()
+
+
+def _ruta_indice() -> Path:
+    return prerender_disco.directorio / "indice.json"
+
+
+def respuestas_regex() -> Dict[str, str]:
+    """Respuestas regex por id: regex:<grupo>:<posición>."""
+    return {
+        f"regex:{grupo}:{i}": texto
+        for grupo, textos in RESPUESTAS_REGEX.items()
+        for i, texto in enumerate(textos)
+    }
+
+
+def respuestas_faq(faqs: List[Dict[str, Any]], origen: str) -> Dict[str, str]:
+    """Respuestas de una lista de FAQs por id: <origen>:<posición>."""
+    return {f"{origen}:{i}": faq["respuesta"] for i, faq in enumerate(faqs) if faq.get("respuesta")}
+
+
+def cargar_indice() -> Dict[str, Dict[str, str]]:
+    try:
+        with open(_ruta_indice(), encoding="utf-8") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+    except (OSError, ValueError) as e:
+        print(f"⚠ Índice de pre-render ilegible: {e}")
+        return {}
+
+
+def _guardar_indice(indice: Dict[str, Dict[str, str]]):
+    ruta = _ruta_indice()
+    ruta.parent.mkdir(parents=True, exist_ok=True)
+    descriptor, temporal = tempfile.mkstemp(dir=ruta.parent, suffix=".tmp")
+    with os.fdopen(descriptor, "w", encoding="utf-8") as f:
+        json.dump(indice, f, ensure_ascii=False, indent=2)
+    # Escritura atómica: nunca queda un índice a medias
+    os.replace(temporal, ruta)
+
+
+def prerenderizar(
+    respuestas: Dict[str, str],
+    origenes: Iterable[str],
+    forzar: bool = False,
+    hilos: Optional[int] = None
+) -> Dict[str, int]:
+    """
+    Genera el audio y lipsync de respuestas fijas y actualiza el índice.
+
+    Args:
+        respuestas: id de respuesta → texto
+        origenes: Prefijos de id que `respuestas` reemplaza por completo en el
+            índice (p. ej. {"regex", "faq_manual"}); los demás se conservan
+        forzar: Si regenerar también las que ya existen
+        hilos: Síntesis en paralelo (gTTS espera a la red); PRERENDER_HILOS por defecto
+
+    Returns:
+        {"renderizadas", "reutilizadas", "fallidas", "eliminadas"}
+    """
+    origenes = set(origenes)
+    hilos = hilos or int(os.getenv("PRERENDER_HILOS", HILOS_POR_DEFECTO))
+    claves = {id_respuesta: clave_audio(texto) for id_respuesta, texto in respuestas.items()}
+
+    existentes = set(prerender_disco.claves())
+    pendientes = {}
+    for id_respuesta, clave in claves.items():
+        if forzar or clave not in existentes:
+            pendientes.setdefault(clave, respuestas[id_respuesta])
+
+    print(f"\n🔄 Pre-render de respuestas fijas: {len(respuestas)} respuestas, {len(pendientes)} por generar...")
+
+    fallidas = set()
+    if pendientes:
+        with ThreadPoolExecutor(max_workers=hilos) as pool:
+            futuros = {pool.submit(generar_audio_avatar, texto): clave for clave, texto in pendientes.items()}
+            for futuro in as_completed(futuros):
+                clave = futuros[futuro]
+                try:
+                    avatar = futuro.result()
+                except Exception as e:
+                    print(f"⚠ No se pudo pre-renderizar \"{pendientes[clave][:50]}\": {e}")
+                    fallidas.add(clave)
+                    continue
+                prerender_disco.guardar(clave, {"audio_wav": avatar["audio_wav"], "lipsync": avatar["lipsync"]})
+
+    with _lock_indice:
+        indice = {
+            id_respuesta: entrada for id_respuesta, entrada in cargar_indice().items()
+            if id_respuesta.split(":", 1)[0] not in origenes
+        }
+        for id_respuesta, clave in claves.items():
+            if clave not in fallidas:
+                indice[id_respuesta] = {"texto": respuestas[id_respuesta], "clave": clave}
+        _guardar_indice(indice)
+
+        # Audio de respuestas que ya no existen en ningún origen
+        referenciadas = {entrada["clave"] for entrada in indice.values()}
+        huerfanas = [clave for clave in prerender_disco.claves() if clave not in referenciadas]
+        for clave in huerfanas:
+            prerender_disco.eliminar(clave)
+
+    resumen = {
+        "renderizadas": len(pendientes) - len(fallidas),
+        "reutilizadas": len(set(claves.values())) - len(pendientes),
+        "fallidas": len(fallidas),
+        "eliminadas": len(huerfanas),
+    }
+    marca = "✓" if not fallidas else "⚠"
+    print(f"{marca} Pre-render: {resumen['renderizadas']} generadas, {resumen['reutilizadas']} reutilizadas, "
+          f"{resumen['fallidas']} fallidas, {resumen['eliminadas']} eliminadas")
+    return resumen
+
+
+def prerenderizar_respuestas_fijas(
+    faqs: Optional[List[Dict[str, Any]]] = None,
+    origen: Optional[str] = None,
+    forzar: bool = False
+) -> Dict[str, int]:
+    """
+    Pre-renderiza las respuestas regex y, si se indican, las FAQs de un origen.
+
+    Es el punto de entrada de initialize_chatbot_db ("faq_knowledge") e
+    ingest_faqs ("faq_manual").
+    """
+    respuestas = respuestas_regex()
+    origenes = {"regex"}
+    if faqs is not None and origen:
+        respuestas.update(respuestas_faq(faqs, origen))
+        origenes.add(origen)
+    return prerenderizar(respuestas, origenes, forzar=forzar)
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Pre-render de audio y lipsync de respuestas fijas")
+    parser.add_argument("--forzar", action="store_true", help="Regenerar también las existentes")
+    args = parser.parse_args()
+
+    from ai.functionMatcher.Initializer import FAQ_DATA
+    from rag.ingestor import FILE_PATH
+
+    respuestas = respuestas_regex()
+    respuestas.update(respuestas_faq(FAQ_DATA, "faq_knowledge"))
+    if os.path.exists(FILE_PATH):
+        with open(FILE_PATH, encoding="utf-8") as f:
+            respuestas.update(respuestas_faq(json.load(f), "faq_manual"))
+
+    prerenderizar(respuestas, {"regex", "faq_knowledge", "faq_manual"}, forzar=args.forzar)
@@ -0,0 +1,129 @@
+"""
+Prueba de concurrencia del audio del avatar
+===========================================
+Genera el audio y el lipsync de varios textos distintos a la vez y comprueba
+que cada respuesta corresponde a su propio audio:
+
+    - la duración del WAV coincide con la duración que reporta Rhubarb
+    - cada resultado usó un directorio de trabajo distinto (solo sobre la
+      función: la API sirve textos repetidos desde la caché de audio)
+    - contra la API, textos de respuesta distintos nunca comparten audio
+    - no quedan directorios temporales al terminar
+
+Con audios/audio.* fijos, dos solicitudes simultáneas se pisaban los archivos
+y una devolvía el audio (o el lipsync) de la otra.
+
+USO:
+    # Directamente sobre generar_audio_avatar (requiere gTTS, ffmpeg y Rhubarb)
+    python -m lipsync.prueba_concurrencia --hilos 6
+
+    # Contra la API levantada en otra terminal
+    python -m lipsync.prueba_concurrencia --url http://localhost:8000 --hilos 6
+"""
+
+import io
+import os
+import glob
+import json
+import wave
+import base64
+import hashlib
+import tempfile
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+# Textos de longitudes distintas: audios de duración distinta delatan un cruce
+TEXTOS = [
+    "Hola.",
+    "Los cinco productos más vendidos son laptops y monitores.",
+    "Puedo predecir el stock de un producto para una fecha concreta.",
+    "Recuerda que puedo generar reportes en Excel o CSV de cualquier mes del año.",
+    "Gracias.",
+    "El inventario de la Laptop HP se agotará aproximadamente en tres semanas si la demanda se mantiene.",
+]
+
+# Diferencia admitida entre la duración del WAV y la de Rhubarb (segundos)
+TOLERANCIA_S = 0.1
+
+
+def _duracion_wav(audio_b64):
+    with wave.open(io.BytesIO(base64.b64decode(audio_b64)), "rb") as wav:
+        return wav.getnframes() / wav.getframerate()
+
+
+def _por_funcion(texto):
+    from lipsync.lipsyncgen import generar_audio_avatar
+    resultado = generar_audio_avatar(texto)
+    return texto, resultado["audio_wav"], resultado["lipsync"]
+
+
+def _por_api(base_url, texto):
+    # Se añade un sufijo para no recibir respuestas de la caché de /chat
+    cuerpo = json.dumps({"message": f"{texto} #{os.urandom(4).hex()}"}).encode("utf-8")
+    req = urllib.request.Request(
+        f"{base_url}/api/chat", data=cuerpo, headers={"Content-Type": "application/json"}
+    )
+    with urllib.request.urlopen(req, timeout=300) as resp:
+        mensaje = json.loads(resp.read())["messages"][0]
+    # El texto de la respuesta puede repetirse entre solicitudes (y venir de la caché)
+    return mensaje["text"], mensaje["audio"], mensaje["lipsync"]
+
+
+def _directorios_temporales():
+    from lipsync.lipsyncgen import DIRECTORIO_TEMPORAL_AUDIO
+    return set(glob.glob(os.path.join(DIRECTORIO_TEMPORAL_AUDIO or tempfile.gettempdir(), "chat_audio_*")))
+
+
+def prueba(hilos=6, base_url=None):
+    print(f"\n🔬 Prueba de concurrencia del audio ({hilos} en paralelo, "
+          f"{'API ' + base_url if base_url else 'generar_audio_avatar'})\n")
+
+    textos = [TEXTOS[i % len(TEXTOS)] for i in range(hilos)]
+    previos = set() if base_url else _directorios_temporales()
+    generar = (lambda texto: _por_api(base_url, texto)) if base_url else _por_funcion
+
+    with ThreadPoolExecutor(max_workers=hilos) as pool:
+        resultados = list(pool.map(generar, textos))
+
+    fallos = 0
+    archivos = set()
+    textos_por_audio = {}
+    for texto, audio_b64, lipsync in resultados:
+        duracion_wav = _duracion_wav(audio_b64)
+        duracion_lipsync = lipsync.get("metadata", {}).get("duration", 0.0)
+        archivos.add(lipsync.get("metadata", {}).get("soundFile"))
+        textos_por_audio.setdefault(hashlib.sha256(audio_b64.encode("ascii")).hexdigest(), set()).add(texto)
+        correcto = abs(duracion_wav - duracion_lipsync) <= TOLERANCIA_S
+        fallos += not correcto
+        print(f"   {'✓' if correcto else '✗'} wav={duracion_wav:6.2f}s  lipsync={duracion_lipsync:6.2f}s  {texto[:50]}")
+
+    if not base_url and len(archivos) != len(textos):
+        print(f"✗ Solo {len(archivos)} archivos de audio distintos para {len(textos)} solicitudes")
+        fallos += 1
+
+    for textos_audio in textos_por_audio.values():
+        if len(textos_audio) > 1:
+            print(f"✗ El mismo audio para textos distintos: {sorted(t[:30] for t in textos_audio)}")
+            fallos += 1
+
+    if not base_url:
+        restantes = _directorios_temporales() - previos
+        if restantes:
+            print(f"✗ Quedaron directorios temporales: {sorted(restantes)}")
+            fallos += 1
+
+    print("=" * 70)
+    print("✓ Sin cruces entre solicitudes" if not fallos else f"✗ {fallos} comprobaciones fallidas")
+    return fallos == 0
+
+
+if __name__ == "__main__":
+    import sys
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Prueba de concurrencia del audio del avatar")
+    parser.add_argument("--url", default=None, help="URL de la API; sin ella se llama a la función directamente")
+    parser.add_argument("--hilos", type=int, default=6)
+    args = parser.parse_args()
+
+    sys.exit(0 if prueba(args.hilos, args.url) else 1)
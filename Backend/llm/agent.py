@@ -2,6 +2,26 @@ import re
 import random
 
 
+# Respuestas fijas por grupo (también se pre-renderizan con audio y lipsync,
+# ver lipsync/prerender.py)
+RESPUESTAS_REGEX = {
+    "saludo": [
+        "¡Hola! Bienvenido a ARC, tu tienda de electronicos avanzada. ¿En qué puedo ayudarte hoy?",
+        "¡Buenas! Soy tu asistente virtual. ¿Buscas stock o información?",
+        "¡Hola! Estoy listo para ayudarte con el inventario."
+    ],
+    "despedida": [
+        "¡Hasta luego! Gracias por visitar ARC.",
+        "¡Chao! Vuelve pronto.",
+        "Nos vemos. Espero haberte ayudado."
+    ],
+    "agradecimiento": [
+        "¡De nada! Es un placer ayudarte.",
+        "¡Para eso estamos!",
+        "Con gusto. ¿Necesitas algo más?"
+    ],
+}
+
 
 def check_regex_response(user_text: str) -> str | None:
     """
@@ -15,33 +35,21 @@ def check_regex_response(user_text: str) -> str | None:
     patron_saludos = r"\b(hola|oli|buenos d[íi]as|buenas tardes|buenas noches|que tal|hello)\b"
     
     if re.search(patron_saludos, text):
-        respuestas = [
-            "¡Hola! Bienvenido a ARC, tu tienda de electronicos avanzada. ¿En qué puedo ayudarte hoy?",
-            "¡Buenas! Soy tu asistente virtual. ¿Buscas stock o información?",
-            "¡Hola! Estoy listo para ayudarte con el inventario."
-        ]
+        respuestas = RESPUESTAS_REGEX["saludo"]
         return random.choice(respuestas)
 
     # --- GRUPO B: DESPEDIDAS ---
     patron_despedidas = r"\b(chao|chau|adi[óo]s|hasta luego|nos vemos|bye|cu[íi]date)\b"
     
     if re.search(patron_despedidas, text):
-        respuestas = [
-            "¡Hasta luego! Gracias por visitar ARC.",
-            "¡Chao! Vuelve pronto.",
-            "Nos vemos. Espero haberte ayudado."
-        ]
+        respuestas = RESPUESTAS_REGEX["despedida"]
         return random.choice(respuestas)
 
     # --- GRUPO C: AGRADECIMIENTOS ---
     patron_agradecimientos = r"\b(gracias|te agradezco|muy amable|thx)\b"
     
     if re.search(patron_agradecimientos, text):
-        respuestas = [
-            "¡De nada! Es un placer ayudarte.",
-            "¡Para eso estamos!",
-            "Con gusto. ¿Necesitas algo más?"
-        ]
+        respuestas = RESPUESTAS_REGEX["agradecimiento"]
         r = random.choice(respuestas)
         print(f"Respuesta regex agradecimiento: {r}")
         return r
@@ -2,6 +2,8 @@ import uvicorn
 from fastapi import FastAPI
 # from endpoint.routes import router as http_router
 from endpoint.routes import router as http_router
+from endpoint.executors import cerrar_ejecutores
+from jobs.gestor import apagar_gestor
 from datetime import date
 from fastapi.middleware.cors import CORSMiddleware
 
@@ -26,6 +28,12 @@ app.add_middleware(
 app.include_router(http_router, prefix="/api", tags=["predicciones"])
 
 
+@app.on_event("shutdown")
+def apagar_ejecutores():
+    apagar_gestor()
+    cerrar_ejecutores()
+
+
 if __name__ == "__main__":
     uvicorn.run("main:app", host="0.0.0.0", port=8000, reload=True)
     
\ No newline at end of file
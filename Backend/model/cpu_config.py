@@ -0,0 +1,228 @@
+"""
+Configuración de hilos de TensorFlow y afinidad de CPU
+======================================================
+Evita que TensorFlow reserve pools de hilos que compitan por los mismos núcleos
+que los workers de uvicorn y el encoder de SentenceTransformer.
+
+Hay dos perfiles independientes, configurables por variables de entorno:
+
+    Perfil         Variables
+    inferencia     TF_INFERENCIA_INTRA_HILOS, TF_INFERENCIA_INTER_HILOS, TF_INFERENCIA_CPUS
+    entrenamiento  TF_ENTRENAMIENTO_INTRA_HILOS, TF_ENTRENAMIENTO_INTER_HILOS, TF_ENTRENAMIENTO_CPUS
+
+Los *_CPUS aceptan listas y rangos ("0-3", "0,2,4-5"); vacío = sin afinidad.
+Los pools de TensorFlow son por proceso y solo se pueden fijar antes de la
+primera operación, y el primer perfil aplicado en un proceso se conserva. Por
+eso el servidor (inferencia) nunca entrena en su propio proceso: los trabajos
+de reentrenamiento corren en un proceso hijo (jobs/proceso.py) que aplica el
+perfil de entrenamiento, igual que el script de reentrenamiento.
+
+USO:
+    from model.cpu_config import configurar_hilos
+    configurar_hilos("inferencia")
+
+BENCHMARK (cada combinación corre en un proceso nuevo):
+    python -m model.cpu_config --benchmark --perfil inferencia --lote 32
+"""
+
+import os
+import sys
+import json
+import time
+import subprocess
+
+PERFILES = {
+    # Lotes pequeños y latencia: pocos hilos, el resto de núcleos para la API
+    "inferencia": {"intra": 2, "inter": 1},
+    # Entrenamiento: todos los núcleos disponibles
+    "entrenamiento": {"intra": os.cpu_count() or 1, "inter": 2},
+}
+
+_perfil_aplicado = None
+
+
+def _parsear_cpus(valor: str) -> set:
+    """Convierte "0-3,6" en {0, 1, 2, 3, 6}."""
+    cpus = set()
+    for parte in valor.split(","):
+        parte = parte.strip()
+        if not parte:
+            continue
+        if "-" in parte:
+            inicio, fin = parte.split("-")
+            cpus.update(range(int(inicio), int(fin) + 1))
+        else:
+            cpus.add(int(parte))
+    return cpus
+
+
+def obtener_configuracion(perfil: str = "inferencia") -> dict:
+    """Configuración efectiva del perfil (valores por defecto + variables de entorno)."""
+    if perfil not in PERFILES:
+        raise ValueError(f"Perfil desconocido: {perfil}. Opciones: {list(PERFILES)}")
+
+    prefijo = f"TF_{perfil.upper()}"
+    cpus = os.getenv(f"{prefijo}_CPUS", "")
+    return {
+        "perfil": perfil,
+        "intra": int(os.getenv(f"{prefijo}_INTRA_HILOS", PERFILES[perfil]["intra"])),
+        "inter": int(os.getenv(f"{prefijo}_INTER_HILOS", PERFILES[perfil]["inter"])),
+        "cpus": sorted(_parsear_cpus(cpus)) if cpus else None,
+    }
+
+
+def configurar_hilos(perfil: str = "inferencia", intra: int = None, inter: int = None, cpus=None) -> dict:
+    """
+    Aplica el perfil de hilos a TensorFlow y, opcionalmente, la afinidad de CPU.
+
+    Debe llamarse antes de la primera operación de TensorFlow del proceso; si
+    el runtime ya está inicializado se conserva la configuración existente.
+
+    Returns:
+        Configuración aplicada
+    """
+    global _perfil_aplicado
+    import tensorflow as tf
+
+    if _perfil_aplicado is not None and _perfil_aplicado["perfil"] != perfil:
+        # El primer perfil del proceso manda: el proceso de entrenamiento
+        # importa model.methods, que pediría el de inferencia
+        print(f"⚠ Perfil {_perfil_aplicado['perfil']} ya aplicado en este proceso, se ignora {perfil}")
+        return _perfil_aplicado
+
+    config = obtener_configuracion(perfil)
+    if intra is not None:
+        config["intra"] = intra
+    if inter is not None:
+        config["inter"] = inter
+    if cpus is not None:
+        config["cpus"] = sorted(cpus)
+
+    if config["cpus"] and hasattr(os, "sched_setaffinity"):
+        try:
+            os.sched_setaffinity(0, config["cpus"])
+        except OSError as e:
+            print(f"⚠ No se pudo fijar la afinidad de CPU {config['cpus']}: {e}")
+
+    try:
+        tf.config.threading.set_intra_op_parallelism_threads(config["intra"])
+        tf.config.threading.set_inter_op_parallelism_threads(config["inter"])
+        _perfil_aplicado = config
+        print(f"✓ Hilos TensorFlow ({perfil}): intra={config['intra']}, inter={config['inter']}, cpus={config['cpus'] or 'todas'}")
+    except RuntimeError:
+        # El runtime ya arrancó en este proceso: los pools no se pueden cambiar
+        print(f"⚠ TensorFlow ya inicializado, se mantiene la configuración de hilos: {_perfil_aplicado}")
+
+    return config
+
+
+# ==================== BENCHMARK ====================
+
+def _construir_modelo_benchmark():
+    """Modelo de producción si existe; si no, la misma arquitectura con pesos aleatorios."""
+    import tensorflow as tf
+    from pathlib import Path
+
+    ruta = Path(__file__).resolve().parent.parent / "files" / "modelo.h5"
+    if ruta.exists():
+        try:
+            return tf.keras.models.load_model(str(ruta), compile=False)
+        except Exception:
+            pass
+
+    from model.reentrenamiento import construir_modelo
+    return construir_modelo()
+
+
+def _medir(perfil: str, intra: int, inter: int, lote: int, segundos: float) -> dict:
+    """Mide el throughput (muestras/s) de una combinación en el proceso actual."""
+    import numpy as np
+
+    configurar_hilos(perfil, intra=intra, inter=inter)
+    modelo = _construir_modelo_benchmark()
+    _, n_steps, n_features = modelo.input_shape
+    X = np.random.rand(lote, n_steps, n_features).astype("float32")
+
+    if perfil == "entrenamiento":
+        y = np.random.rand(lote, modelo.output_shape[-1]).astype("float32")
+        modelo.compile(optimizer="adam", loss="mse")
+        paso = lambda: modelo.train_on_batch(X, y)
+    else:
+        paso = lambda: modelo.predict_on_batch(X)
+
+    paso()  # calentamiento
+    muestras = 0
+    inicio = time.perf_counter()
+    while time.perf_counter() - inicio < segundos:
+        paso()
+        muestras += lote
+    duracion = time.perf_counter() - inicio
+
+    return {
+        "perfil": perfil,
+        "intra": intra,
+        "inter": inter,
+        "lote": lote,
+        "muestras_por_s": round(muestras / duracion, 1),
+        "ms_por_lote": round(duracion * 1000 / (muestras / lote), 3),
+    }
+
+
+def benchmark(perfil: str = "inferencia", lote: int = 32, segundos: float = 3.0) -> list:
+    """
+    Recorre combinaciones de hilos intra/inter y reporta el throughput de cada una.
+
+    Cada combinación se mide en un proceso nuevo porque TensorFlow no permite
+    cambiar los pools una vez inicializado.
+    """
+    n_cpus = os.cpu_count() or 1
+    intras = sorted({1, 2, 4, n_cpus // 2, n_cpus} - {0})
+    inters = [1, 2]
+    backend_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+    resultados = []
+    for intra in intras:
+        for inter in inters:
+            proc = subprocess.run(
+                [sys.executable, "-m", "model.cpu_config", "--medir",
+                 "--perfil", perfil, "--intra", str(intra), "--inter", str(inter),
+                 "--lote", str(lote), "--segundos", str(segundos)],
+                cwd=backend_dir, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True
+            )
+            linea = proc.stdout.strip().splitlines()[-1] if proc.stdout.strip() else ""
+            try:
+                resultado = json.loads(linea)
+            except json.JSONDecodeError:
+                print(f"✗ intra={intra} inter={inter} falló: {proc.stderr[-300:]}")
+                continue
+            resultados.append(resultado)
+            print(f"   intra={intra:<3} inter={inter:<3} {resultado['muestras_por_s']:>10.1f} muestras/s  "
+                  f"{resultado['ms_por_lote']:>8.3f} ms/lote")
+
+    if resultados:
+        mejor = max(resultados, key=lambda r: r["muestras_por_s"])
+        print(f"\n✓ Mejor configuración ({perfil}): intra={mejor['intra']}, inter={mejor['inter']} "
+              f"→ TF_{perfil.upper()}_INTRA_HILOS={mejor['intra']} TF_{perfil.upper()}_INTER_HILOS={mejor['inter']}")
+    return resultados
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Configuración de hilos de TensorFlow")
+    parser.add_argument("--benchmark", action="store_true", help="Recorre combinaciones y reporta throughput")
+    parser.add_argument("--medir", action="store_true", help=argparse.SUPPRESS)
+    parser.add_argument("--perfil", default="inferencia", choices=list(PERFILES))
+    parser.add_argument("--intra", type=int, default=None)
+    parser.add_argument("--inter", type=int, default=None)
+    parser.add_argument("--lote", type=int, default=32)
+    parser.add_argument("--segundos", type=float, default=3.0)
+    args = parser.parse_args()
+
+    if args.medir:
+        print(json.dumps(_medir(args.perfil, args.intra, args.inter, args.lote, args.segundos)))
+    elif args.benchmark:
+        print(f"\n🔬 Benchmark de hilos TensorFlow - perfil {args.perfil}, lote {args.lote}\n")
+        benchmark(args.perfil, args.lote, args.segundos)
+    else:
+        print(json.dumps(obtener_configuracion(args.perfil), indent=2))
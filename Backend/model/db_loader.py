@@ -63,3 +63,39 @@ def load_inventory_dataset():
     cols_existentes = [col for col in cols_necesarias if col in df.columns]
     
     return df[cols_existentes]
+
+
+# Agregación por columna al pasar de resolución diaria a semanal
+AGREGACION_SEMANAL = {
+    "quantity_on_hand": "last",
+    "quantity_available": "last",
+    "quantity_reserved": "mean",
+    "reorder_point": "last",
+    "optimal_stock_level": "last",
+    "average_daily_usage": "mean",
+    "stock_status": "last",
+    "category": "last",
+}
+
+
+def agregar_semanal(df):
+    """
+    Agrega el histórico diario de registros_inventario a resolución semanal.
+
+    Cada fila representa la semana que termina en domingo (created_at = domingo).
+    Las cantidades toman el último valor de la semana y los consumos el promedio.
+    """
+    agg = {col: func for col, func in AGREGACION_SEMANAL.items() if col in df.columns}
+
+    semanal = (
+        df.set_index("created_at")
+        .groupby("product_id")
+        .resample("W-SUN")
+        .agg(agg)
+        .reset_index()
+    )
+    # Semanas sin registros quedan como NaN tras el resample
+    semanal = semanal.dropna(subset=["quantity_on_hand"])
+    semanal["semana_anio"] = semanal["created_at"].dt.isocalendar().week.astype(int)
+
+    return semanal.sort_values(["product_id", "created_at"])
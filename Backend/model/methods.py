@@ -8,11 +8,16 @@ from pathlib import Path
 import keras
 from db.predictions_saved import *
 import threading
+import time
+import hashlib
 
 # Cargar data from database
-from model.db_loader import load_inventory_dataset
+from model.db_loader import load_inventory_dataset, agregar_semanal
+from model.cpu_config import configurar_hilos
 
 os.environ["CUDA_VISIBLE_DEVICES"] = "-1"
+# Pools de hilos acotados para servir (ver model/cpu_config.py)
+configurar_hilos("inferencia")
 
 # Obtener el directorio base (BackendBD)
 FILES_DIR ="files/"
@@ -21,17 +26,39 @@ FILES_DIR ="files/"
 DATASET_PATH = FILES_DIR + "dataset_preparado.csv"
 MODEL_PATH = FILES_DIR + "modelo.h5"
 SCALER_PATH = FILES_DIR + "scaler.pkl"
+# Modelo directo multi-horizonte (opcional, se genera en el reentrenamiento)
+DIRECT_MODEL_PATH = FILES_DIR + "modelo_directo.h5"
+# Modelo semanal de largo plazo (opcional, se versiona junto al diario)
+WEEKLY_MODEL_PATH = FILES_DIR + "modelo_semanal.h5"
+WEEKLY_SCALER_PATH = FILES_DIR + "scaler_semanal.pkl"
 
 
 # Cargar datos y modelo al inicio
 df = load_inventory_dataset()
 df = df.sort_values(["product_id", "created_at"])
 
+
+def _calcular_marca_datos(datos: pd.DataFrame) -> Dict[str, Any]:
+    """Marca de agua del dataset en memoria: cambia cuando llegan registros nuevos."""
+    ultima = datos["created_at"].max() if len(datos) else None
+    return {
+        "marca": f"{len(datos)}-{ultima:%Y%m%d%H%M%S}" if ultima is not None else "vacio",
+        "ultima_fecha": ultima,
+    }
+
+
+_marca_datos = _calcular_marca_datos(df)
+
 # Variables globales y lock para recarga segura
 _model_lock = threading.Lock()
 _model_loaded = False
+_version_modelo = None
 model = None
 scaler = None
+modelo_directo = None
+HORIZONTE_DIRECTO = 0  # 0 = sin modelo directo, solo recursivo
+modelo_semanal = None
+scaler_semanal = None
 
 # Cargar modelo y scaler con rutas centralizadas
 def _load_model_and_scaler(model_path=MODEL_PATH, scaler_path=SCALER_PATH):
@@ -69,28 +96,133 @@ def _load_model_and_scaler(model_path=MODEL_PATH, scaler_path=SCALER_PATH):
             pass
         raise
 
+def _load_direct_model(direct_model_path=DIRECT_MODEL_PATH):
+    """
+    Carga el modelo directo multi-horizonte si existe.
+
+    Returns:
+        (modelo, horizonte) o (None, 0) si no hay modelo directo
+    """
+    if not os.path.exists(str(direct_model_path)):
+        return None, 0
+    try:
+        m = keras.models.load_model(str(direct_model_path), compile=False)
+        horizonte = int(m.output_shape[-1])
+        print(f"✓ Modelo directo cargado (horizonte {horizonte} días)")
+        return m, horizonte
+    except Exception as e:
+        # El modelo directo es opcional: si falla se usa el recursivo
+        print(f"⚠ No se pudo cargar el modelo directo: {e}")
+        return None, 0
+
+
+def _load_weekly_model(weekly_model_path=WEEKLY_MODEL_PATH, weekly_scaler_path=WEEKLY_SCALER_PATH):
+    """
+    Carga el modelo semanal de largo plazo y su scaler si existen.
+
+    Returns:
+        (modelo, scaler) o (None, None) si no hay modelo semanal
+    """
+    if not (os.path.exists(str(weekly_model_path)) and os.path.exists(str(weekly_scaler_path))):
+        return None, None
+    try:
+        m = keras.models.load_model(str(weekly_model_path), compile=False)
+        s = joblib.load(str(weekly_scaler_path))
+        print("✓ Modelo semanal cargado")
+        return m, s
+    except Exception as e:
+        # El modelo semanal es opcional: si falla se usa el diario
+        print(f"⚠ No se pudo cargar el modelo semanal: {e}")
+        return None, None
+
+
+def _firma_archivos(*rutas) -> str:
+    """Identificador corto de un conjunto de ficheros (fecha de modificación y tamaño)."""
+    partes = []
+    for ruta in rutas:
+        try:
+            st = os.stat(str(ruta))
+            partes.append(f"{st.st_mtime_ns}-{st.st_size}")
+        except OSError:
+            partes.append("-")
+    return hashlib.sha1("|".join(partes).encode("utf-8")).hexdigest()[:12]
+
+
 def _ensure_model_loaded():
     """Asegura que el modelo esté cargado (lazy loading)."""
-    global model, scaler, _model_loaded
+    global model, scaler, _model_loaded, modelo_directo, HORIZONTE_DIRECTO
+    global modelo_semanal, scaler_semanal, _version_modelo
     if not _model_loaded or model is None or scaler is None:
         with _model_lock:
             # Double-check pattern para evitar cargas múltiples
             if not _model_loaded or model is None or scaler is None:
                 model, scaler = _load_model_and_scaler()
+                modelo_directo, HORIZONTE_DIRECTO = _load_direct_model()
+                modelo_semanal, scaler_semanal = _load_weekly_model()
+                _version_modelo = _firma_archivos(
+                    MODEL_PATH, SCALER_PATH, DIRECT_MODEL_PATH, WEEKLY_MODEL_PATH, WEEKLY_SCALER_PATH
+                )
                 _model_loaded = True
 
 # NO cargar al importar - solo cuando se necesite
 # model, scaler = _load_model_and_scaler()  # ← COMENTADO
 
-def reload_model(model_path: Path = MODEL_PATH, scaler_path: Path = SCALER_PATH) -> bool:
-    """Recarga el modelo y el scaler en memoria desde los ficheros dados."""
-    global model, scaler, _model_loaded
+
+def version_modelo() -> str:
+    """
+    Versión de los modelos que sirven las predicciones.
+
+    No carga el modelo: si aún no está en memoria se calcula a partir de los
+    ficheros que se cargarán.
+    """
+    if _version_modelo is not None:
+        return _version_modelo
+    return _firma_archivos(MODEL_PATH, SCALER_PATH, DIRECT_MODEL_PATH, WEEKLY_MODEL_PATH, WEEKLY_SCALER_PATH)
+
+
+def marca_datos() -> str:
+    """Marca de agua del dataset en memoria (filas y último registro)."""
+    return _marca_datos["marca"]
+
+
+def fecha_modificacion() -> Optional[datetime]:
+    """
+    Último cambio de lo que determina una predicción: la modificación más
+    reciente de los ficheros del modelo o el último registro del dataset.
+
+    Como version_modelo(), no carga el modelo.
+    """
+    fechas = []
+    for ruta in (MODEL_PATH, SCALER_PATH, DIRECT_MODEL_PATH, WEEKLY_MODEL_PATH, WEEKLY_SCALER_PATH):
+        try:
+            fechas.append(datetime.fromtimestamp(os.stat(str(ruta)).st_mtime))
+        except OSError:
+            continue
+    if _marca_datos["ultima_fecha"] is not None:
+        fechas.append(pd.Timestamp(_marca_datos["ultima_fecha"]).to_pydatetime().replace(tzinfo=None))
+    return max(fechas) if fechas else None
+
+def reload_model(
+    model_path: Path = MODEL_PATH,
+    scaler_path: Path = SCALER_PATH,
+    direct_model_path: Path = DIRECT_MODEL_PATH,
+    weekly_model_path: Path = WEEKLY_MODEL_PATH,
+    weekly_scaler_path: Path = WEEKLY_SCALER_PATH
+) -> bool:
+    """Recarga el modelo, el scaler y los modelos opcionales (directo, semanal) desde los ficheros dados."""
+    global model, scaler, _model_loaded, modelo_directo, HORIZONTE_DIRECTO
+    global modelo_semanal, scaler_semanal, _version_modelo
     try:
         with _model_lock:
             print(f"→ Recargando modelo desde {model_path} y scaler desde {scaler_path}")
             m, s = _load_model_and_scaler(model_path, scaler_path)
             model = m
             scaler = s
+            modelo_directo, HORIZONTE_DIRECTO = _load_direct_model(direct_model_path)
+            modelo_semanal, scaler_semanal = _load_weekly_model(weekly_model_path, weekly_scaler_path)
+            _version_modelo = _firma_archivos(
+                model_path, scaler_path, direct_model_path, weekly_model_path, weekly_scaler_path
+            )
             _model_loaded = True
         print("✓ Modelo recargado en memoria")
         return True
@@ -115,6 +247,23 @@ FEATURES = [
 TARGET = "quantity_available"
 N_STEPS = 7
 
+# Modelo semanal: mismas variables salvo el calendario, que pasa a semana del año
+FEATURES_SEMANALES = [
+    "quantity_on_hand",
+    "quantity_reserved",
+    "reorder_point",
+    "optimal_stock_level",
+    "average_daily_usage",
+    "stock_status",
+    "semana_anio",
+    "category"
+]
+N_SEMANAS = 8
+# A partir de este horizonte (en días) se usa el modelo semanal si está disponible
+DIAS_LARGO_PLAZO = 90
+# Productos por lote en el motor de trayectorias (también es la granularidad del deadline)
+TAMANO_LOTE = 32
+
 
 
 def build_sequence(product_id, target_date):
@@ -211,6 +360,77 @@ def prepare_sequence(df_window: pd.DataFrame) -> np.ndarray:
     return np.expand_dims(seq, axis=0)
 
 
+def ventanas_desde_payload(ventanas: list) -> np.ndarray:
+    """
+    Convierte ventanas enviadas por el cliente a un array listo para el modelo.
+
+    Cada ventana tiene N_STEPS filas; cada fila es una lista con los valores de
+    FEATURES en orden o un diccionario {feature: valor}. No consulta el dataset
+    ni la base de datos.
+
+    Returns:
+        Array (B, N_STEPS, len(COLS_SCALER)) en espacio original; la columna
+        TARGET se rellena con 0 porque el modelo no la usa como entrada.
+
+    Raises:
+        ValueError: Si alguna ventana no tiene la forma esperada
+    """
+    if not ventanas:
+        raise ValueError("Se requiere al menos una ventana")
+
+    lote = np.zeros((len(ventanas), N_STEPS, len(COLS_SCALER)))
+    for i, ventana in enumerate(ventanas):
+        if len(ventana) != N_STEPS:
+            raise ValueError(f"La ventana {i} tiene {len(ventana)} filas, se requieren {N_STEPS}")
+        for j, fila in enumerate(ventana):
+            if isinstance(fila, dict):
+                faltantes = [f for f in FEATURES if f not in fila]
+                if faltantes:
+                    raise ValueError(f"Ventana {i}, fila {j}: faltan {faltantes}")
+                valores = [fila[f] for f in FEATURES]
+            else:
+                if len(fila) != len(FEATURES):
+                    raise ValueError(
+                        f"Ventana {i}, fila {j}: {len(fila)} valores, se requieren {len(FEATURES)} ({FEATURES})"
+                    )
+                valores = fila
+            lote[i, j, :len(FEATURES)] = np.asarray(valores, dtype=float)
+    return lote
+
+
+def prepare_sequences(ventanas: np.ndarray) -> np.ndarray:
+    """
+    Versión por lotes de prepare_sequence sobre arrays.
+
+    Args:
+        ventanas: Array (B, N_STEPS, len(COLS_SCALER)) en espacio original
+
+    Returns:
+        Array con forma (B, N_STEPS, n_features)
+    """
+    _ensure_model_loaded()
+    return _escalar(ventanas)[:, :, :len(FEATURES)]
+
+
+def predecir_ventanas(ventanas: np.ndarray, horizonte: int = 1):
+    """
+    Predice a partir de ventanas ya construidas, sin consultar el dataset.
+
+    Con horizonte 1 es una única inferencia por lotes; con horizonte > 1 se usa
+    el modelo directo o el rollout recursivo igual que en el resto del servicio.
+
+    Returns:
+        (predicciones (B, horizonte) en espacio original, tipo de predicción)
+    """
+    _ensure_model_loaded()
+    if horizonte == 1:
+        pred_scaled = np.asarray(model.predict_on_batch(prepare_sequences(ventanas)))[:, :1]
+        return inverse_scale_prediction(pred_scaled), "prediccion_ventana"
+    # El día siguiente a la última fila de cada ventana
+    dias_semana = (ventanas[:, -1, IDX_DIA].astype(int) + 1) % 7
+    return _predecir_trayectoria(ventanas, dias_semana, horizonte)
+
+
 def inverse_scale_prediction(pred_scaled: float) -> float:
     _ensure_model_loaded()  # ← Añadir esto
     """
@@ -228,13 +448,214 @@ def inverse_scale_prediction(pred_scaled: float) -> float:
     return pred_scaled * std + mean
 
 
+# ==================== MOTOR DE TRAYECTORIAS ====================
+
+# Índices de las columnas dentro de FEATURES + [TARGET] (orden del scaler)
+COLS_SCALER = FEATURES + [TARGET]
+IDX_QOH = COLS_SCALER.index("quantity_on_hand")
+IDX_DIA = COLS_SCALER.index("dia_semana")
+IDX_FIN = COLS_SCALER.index("fin_de_semana")
+IDX_TARGET = COLS_SCALER.index(TARGET)
+
+
+def _escalar(valores: np.ndarray) -> np.ndarray:
+    """
+    Escala un array (..., len(COLS_SCALER)) con el StandardScaler cargado.
+
+    Equivale a scaler.transform pero opera sobre arrays de cualquier forma,
+    lo que permite escalar lotes de ventanas sin construir DataFrames.
+    """
+    return (valores - scaler.mean_) / scaler.scale_
+
+
+def _rollout_recursivo(
+    ventanas: np.ndarray,
+    dias_semana_inicio: np.ndarray,
+    n_dias: int,
+    limite: Optional[float] = None
+) -> Optional[np.ndarray]:
+    """
+    Predicción recursiva día a día para un lote de productos.
+
+    Cada paso predice quantity_available del día siguiente, lo usa como
+    quantity_on_hand del nuevo registro sintético y desplaza la ventana.
+
+    Args:
+        ventanas: Array (P, N_STEPS, len(COLS_SCALER)) en espacio original
+        dias_semana_inicio: Día de la semana (0-6) del primer día a predecir, por producto
+        n_dias: Número de días a predecir
+        limite: Instante (time.monotonic) a partir del cual se abandona el rollout
+
+    Returns:
+        Array (P, n_dias) con el stock predicho en espacio original, o None si
+        se alcanzó `limite` antes de terminar
+    """
+    ventanas = ventanas.astype(float).copy()
+    # Los features estáticos se copian del último registro real
+    plantillas = ventanas[:, -1, :].copy()
+    salida = np.empty((len(ventanas), n_dias))
+
+    for paso in range(n_dias):
+        if limite is not None and time.monotonic() >= limite:
+            return None
+        X_input = _escalar(ventanas)[:, :, :len(FEATURES)]
+        pred_scaled = np.asarray(model.predict_on_batch(X_input))[:, 0]
+        cantidades = inverse_scale_prediction(pred_scaled)
+        salida[:, paso] = cantidades
+
+        dia_semana = (dias_semana_inicio + paso) % 7
+        nuevos = plantillas.copy()
+        nuevos[:, IDX_QOH] = cantidades
+        nuevos[:, IDX_TARGET] = cantidades
+        nuevos[:, IDX_DIA] = dia_semana
+        nuevos[:, IDX_FIN] = (dia_semana >= 5).astype(float)
+
+        ventanas = np.concatenate([ventanas[:, 1:, :], nuevos[:, None, :]], axis=1)
+
+    return salida
+
+
+def _prediccion_directa(ventanas: np.ndarray, n_dias: int) -> np.ndarray:
+    """
+    Predice los próximos n_dias en una sola pasada con el modelo directo.
+
+    Args:
+        ventanas: Array (P, N_STEPS, len(COLS_SCALER)) en espacio original
+        n_dias: Número de días (debe ser <= HORIZONTE_DIRECTO)
+
+    Returns:
+        Array (P, n_dias) con el stock predicho en espacio original
+    """
+    X_input = _escalar(ventanas.astype(float))[:, :, :len(FEATURES)]
+    pred_scaled = np.asarray(modelo_directo.predict_on_batch(X_input))[:, :n_dias]
+    return inverse_scale_prediction(pred_scaled)
+
+
+def _predecir_trayectoria(
+    ventanas: np.ndarray,
+    dias_semana_inicio: np.ndarray,
+    n_dias: int,
+    limite: Optional[float] = None
+):
+    """
+    Elige el método de predicción según el horizonte solicitado.
+
+    Si existe un modelo directo y n_dias <= HORIZONTE_DIRECTO se usa una sola
+    pasada; en otro caso se recurre al rollout recursivo, que se abandona si
+    se alcanza `limite` (ver _rollout_recursivo).
+
+    Returns:
+        (trayectorias (P, n_dias) o None si se abandonó, tipo de predicción)
+    """
+    if modelo_directo is not None and 0 < n_dias <= HORIZONTE_DIRECTO:
+        return _prediccion_directa(ventanas, n_dias), "prediccion_directa"
+    return _rollout_recursivo(ventanas, dias_semana_inicio, n_dias, limite), "prediccion_recursiva"
+
+
+def _rollout_semanal(
+    ventanas: np.ndarray,
+    fechas_inicio: list,
+    n_semanas: int,
+    limite: Optional[float] = None
+) -> Optional[np.ndarray]:
+    """
+    Predicción recursiva semana a semana con el modelo semanal, para un lote de productos.
+
+    Args:
+        ventanas: Array (P, N_SEMANAS, len(FEATURES_SEMANALES) + 1) en espacio original
+        fechas_inicio: Fecha de la primera semana a predecir de cada producto
+            (de ella sale la semana ISO, 1-53)
+        n_semanas: Número de semanas a predecir
+        limite: Instante (time.monotonic) a partir del cual se abandona el rollout
+
+    Returns:
+        Array (P, n_semanas) con el stock predicho al cierre de cada semana, o
+        None si se alcanzó `limite` antes de terminar
+    """
+    cols = FEATURES_SEMANALES + [TARGET]
+    idx_qoh, idx_semana, idx_target = cols.index("quantity_on_hand"), cols.index("semana_anio"), cols.index(TARGET)
 
+    ventanas = ventanas.astype(float).copy()
+    plantillas = ventanas[:, -1, :].copy()
+    salida = np.empty((len(ventanas), n_semanas))
 
+    for paso in range(n_semanas):
+        if limite is not None and time.monotonic() >= limite:
+            return None
+        X_input = ((ventanas - scaler_semanal.mean_) / scaler_semanal.scale_)[:, :, :len(FEATURES_SEMANALES)]
+        pred_scaled = np.asarray(modelo_semanal.predict_on_batch(X_input))[:, 0]
+        cantidades = pred_scaled * scaler_semanal.scale_[idx_target] + scaler_semanal.mean_[idx_target]
+        salida[:, paso] = cantidades
 
+        nuevos = plantillas.copy()
+        nuevos[:, idx_qoh] = cantidades
+        nuevos[:, idx_target] = cantidades
+        nuevos[:, idx_semana] = [int((fecha + timedelta(weeks=paso)).isocalendar()[1]) for fecha in fechas_inicio]
+        ventanas = np.concatenate([ventanas[:, 1:, :], nuevos[:, None, :]], axis=1)
 
+    return salida
+
+
+def _prediccion_semanal(df_p: pd.DataFrame, target_date: pd.Timestamp):
+    """
+    Predice el stock de largo plazo agregando el histórico del producto por semanas.
+
+    Returns:
+        (stock predicho, semanas predichas) o None si no hay histórico semanal suficiente
+    """
+    semanal = agregar_semanal(df_p)
+    if len(semanal) < N_SEMANAS:
+        return None
+
+    ultima_semana = semanal["created_at"].max()
+    n_semanas = max(int(np.ceil((target_date - ultima_semana) / pd.Timedelta(weeks=1))), 1)
+    fecha_inicio = ultima_semana + timedelta(weeks=1)
+
+    ventana = semanal.tail(N_SEMANAS)[FEATURES_SEMANALES + [TARGET]].to_numpy()
+    trayectoria = _rollout_semanal(ventana[None, :, :], [fecha_inicio], n_semanas)[0]
+    return float(trayectoria[-1]), n_semanas
+
+
+def _extender_semanal(productos: list, limite: Optional[float] = None) -> bool:
+    """
+    Completa con el modelo semanal los días posteriores a DIAS_LARGO_PLAZO.
+
+    Cada producto trae ya su trayectoria diaria hasta DIAS_LARGO_PLAZO
+    ("predicciones") y su histórico semanal ("semanal"). Se hace un rollout
+    semanal por lote y el stock de cada día posterior se interpola entre el
+    último día diario y los cierres semanales.
+
+    Returns:
+        False si se alcanzó `limite` (las trayectorias quedan sin extender)
+    """
+    ultimas = [p["semanal"]["created_at"].max() for p in productos]
+    n_semanas = max(
+        max(int(np.ceil((p["ultima_fecha_real"] + pd.Timedelta(days=p["dias"]) - ultima) / pd.Timedelta(weeks=1))), 1)
+        for p, ultima in zip(productos, ultimas)
+    )
+    ventanas = np.stack([p["semanal"].tail(N_SEMANAS)[FEATURES_SEMANALES + [TARGET]].to_numpy() for p in productos])
+    semanas = _rollout_semanal(ventanas, [ultima + timedelta(weeks=1) for ultima in ultimas], n_semanas, limite)
+    if semanas is None:
+        return False
 
+    for p, ultima, fila in zip(productos, ultimas, semanas):
+        # Día (contado desde la última fecha real) de cada cierre semanal
+        dias_cierre = (ultima - p["ultima_fecha_real"]) / pd.Timedelta(days=1) + 7 * np.arange(1, n_semanas + 1)
+        posteriores = dias_cierre > DIAS_LARGO_PLAZO
+        dias = np.arange(DIAS_LARGO_PLAZO + 1, p["dias"] + 1)
+        p["predicciones"] = np.concatenate([p["predicciones"], np.interp(
+            dias,
+            np.concatenate([[DIAS_LARGO_PLAZO], dias_cierre[posteriores]]),
+            np.concatenate([[p["predicciones"][-1]], fila[posteriores]])
+        )])
+        p["tipo"] = "prediccion_semanal"
+    return True
 
 
+def _dias_hasta(desde: pd.Timestamp, hasta: pd.Timestamp) -> int:
+    """Número de días completos a predecir desde `desde` (exclusivo) hasta `hasta`."""
+    return max(int((hasta - desde) / pd.Timedelta(days=1)), 0)
+
 
 def create_features_dict(
     current_stock: float,
@@ -274,11 +695,12 @@ def predict_stock_product_date(
 ) -> Dict[str, Any]:
     _ensure_model_loaded()  # ← Añadir esto
     """
-    Predice el stock de un producto de forma recursiva, día a día,
-    usando siempre ventanas de longitud N_STEPS.
+    Predice el stock de un producto usando ventanas de longitud N_STEPS.
 
     - Si la fecha objetivo está dentro de los datos reales -> devuelve dato real.
-    - Si es futura -> parte de los últimos N_STEPS días reales y
+    - Si es futura y cabe en el horizonte del modelo directo -> una sola pasada.
+    - Si supera DIAS_LARGO_PLAZO y hay modelo semanal -> rollout semana a semana.
+    - En otro caso -> parte de los últimos N_STEPS días reales y
       va generando días sintéticos usando el modelo, actualizando la ventana.
     """
     # Convertir fecha objetivo a datetime
@@ -315,9 +737,9 @@ def predict_stock_product_date(
                 "tipo": "datos_reales"
             }
     
-    # CASO 2: Predicción futura recursiva 
+    # CASO 2: Predicción futura
     # Tomamos los últimos N_STEPS días reales como ventana inicial
-    df_hist = df_p[df_p["created_at"] <= ultima_fecha_real].tail(N_STEPS).copy()
+    df_hist = df_p[df_p["created_at"] <= ultima_fecha_real].tail(N_STEPS)
     if len(df_hist) < N_STEPS:
         return {
             "error": f"No hay suficientes datos para {product_id}. "
@@ -325,64 +747,261 @@ def predict_stock_product_date(
             "product_name": product_id
         }
     
-    # Vamos a ir generando días sintéticos desde el día siguiente al último real
-    fecha_actual = ultima_fecha_real + timedelta(days=1)
-    dias_predichos = 0
-    predicted_stock = current_stock_real  # valor que iremos actualizando
+    # Días sintéticos desde el día siguiente al último real hasta la fecha objetivo
+    dias_predichos = _dias_hasta(ultima_fecha_real, target_date)
+    predicted_stock = current_stock_real
+    tipo = "prediccion_recursiva"
+    pasos = dias_predichos
     
-    # Para copiar features estáticos del último registro real
-    ultimo_real = df_hist.iloc[-1]
+    semanal = None
+    if dias_predichos > DIAS_LARGO_PLAZO and modelo_semanal is not None:
+        semanal = _prediccion_semanal(df_p, target_date)
     
-    while fecha_actual <= target_date:
-        # Construir ventana escalada a partir de df_hist (últimos N_STEPS registros, reales + sintéticos)
-        cols_scaler = FEATURES + [TARGET]
-        window_scaled = scaler.transform(df_hist[cols_scaler])
-        X_input = np.expand_dims(window_scaled[:, :len(FEATURES)], axis=0)  # (1, N_STEPS, n_features)
-        
-        # Predecir quantity_available del nuevo día (en espacio original)
-        pred_scaled = model.predict(X_input, verbose=0)[0][0]
-        predicted_quantity = inverse_scale_prediction(pred_scaled)
-        
-        # Crear un nuevo registro sintético para fecha_actual
-        new_row = {
-            "product_id": product_id,
-            "created_at": fecha_actual,
-            "quantity_available": float(predicted_quantity),
-            # Para simplificar, tomamos quantity_on_hand como quantity_available predicho
-            "quantity_on_hand": float(predicted_quantity),
-            "quantity_reserved": float(ultimo_real["quantity_reserved"]),
-            "reorder_point": float(ultimo_real["reorder_point"]),
-            "optimal_stock_level": float(ultimo_real["optimal_stock_level"]),
-            "average_daily_usage": float(ultimo_real["average_daily_usage"]),
-            "stock_status": int(ultimo_real["stock_status"]),
-            "anio": fecha_actual.year,
-            "mes": fecha_actual.month,
-            "dia_semana": fecha_actual.dayofweek,
-            "fin_de_semana": 1 if fecha_actual.dayofweek >= 5 else 0,
-            "category": int(ultimo_real.get("category", 0)),
-        }
-        
-        # Añadir este nuevo día a la ventana y quedarnos con los últimos N_STEPS
-        df_hist = pd.concat([df_hist, pd.DataFrame([new_row])], ignore_index=True)
-        df_hist = df_hist.sort_values("created_at").tail(N_STEPS).copy()
-        
-        predicted_stock = float(predicted_quantity)
-        dias_predichos += 1
-        fecha_actual += timedelta(days=1)
+    if semanal is not None:
+        # Largo plazo: ~52 pasos semanales en lugar de 365 diarios
+        predicted_stock, pasos = semanal
+        tipo = "prediccion_semanal"
+    elif dias_predichos > 0:
+        fecha_inicio = ultima_fecha_real + timedelta(days=1)
+        trayectoria, tipo = _predecir_trayectoria(
+            df_hist[COLS_SCALER].to_numpy()[None, :, :],
+            np.array([fecha_inicio.dayofweek]),
+            dias_predichos
+        )
+        predicted_stock = float(trayectoria[0, -1])
     
     return {
         "product_name": product_id,
         "predicted_stock": round(predicted_stock, 2),
         "current_stock": round(current_stock_real, 2),
         "dias_predichos": dias_predichos,
-        "predicciones_generadas": dias_predichos,
+        "predicciones_generadas": pasos,
         "predicciones_desde_cache": 0,
         "fecha_inicial": ultima_fecha_real.strftime("%Y-%m-%d"),
         "fecha_objetivo": target_date.strftime("%Y-%m-%d"),
-        "tipo": "prediccion_recursiva"
+        "tipo": tipo
     }
 
 
+def _limpiar_trayectoria(p: Dict[str, Any]):
+    """Quita los datos de trabajo del motor antes de entregar la trayectoria."""
+    for clave in ("historial", "grupo", "semanal"):
+        p.pop(clave, None)
+
+
+def iterar_trayectorias(
+    product_ids: list,
+    fecha_final,
+    deadline_s: Optional[float] = None,
+    tamano_lote: int = TAMANO_LOTE
+):
+    """
+    Motor de predicción por lotes: calcula la trayectoria diaria de varios
+    productos hasta `fecha_final` con una llamada al modelo por día y lote.
+
+    Es un generador que produce un resultado por lote, de modo que quien lo
+    consume puede emitir cada lote en cuanto está listo (streaming).
+
+    `fecha_final` puede ser una fecha común o un diccionario {product_id: fecha}
+    para que cada producto se prediga solo hasta la fecha que necesita.
+
+    Los productos cuyo horizonte supera DIAS_LARGO_PLAZO usan el modelo
+    semanal para el tramo posterior (si está cargado y hay N_SEMANAS semanas
+    de histórico): el rollout diario del lote se detiene en DIAS_LARGO_PLAZO.
+
+    Los productos se procesan por prioridad (menor stock actual primero). Si se
+    indica `deadline_s`, el tiempo consumido se comprueba antes de cada lote y
+    en cada paso del rollout recursivo; si se agota, el lote en curso se
+    descarta y se produce un último resultado con los productos pendientes
+    (así también un catálogo de un solo lote puede quedar truncado).
+
+    Yields:
+        {"trayectorias": {product_id: trayectoria}, "errores": {product_id: mensaje},
+         "pendientes": [product_id, ...]}
+    """
+    _ensure_model_loaded()
+    inicio = time.monotonic()
+    limite = inicio + deadline_s if deadline_s is not None else None
+    if isinstance(fecha_final, dict):
+        fechas_finales = {pid: pd.to_datetime(f) for pid, f in fecha_final.items()}
+    else:
+        fechas_finales = dict.fromkeys(product_ids, pd.to_datetime(fecha_final))
+
+    grupos = {pid: g for pid, g in df[df["product_id"].isin(product_ids)].groupby("product_id", sort=False)}
+
+    errores = {}
+    productos = []
+    for pid in product_ids:
+        if pid not in grupos:
+            errores[pid] = f"No se encontraron datos para el producto {pid}"
+            continue
+        g = grupos[pid].sort_values("created_at")
+        productos.append({
+            "product_id": pid,
+            "ultima_fecha_real": g["created_at"].max(),
+            "current_stock": float(g["quantity_on_hand"].iloc[-1]),
+            "reales": g.drop_duplicates("created_at").set_index("created_at")["quantity_on_hand"],
+            "historial": g.tail(N_STEPS),
+            "grupo": g,
+        })
+
+    # Prioridad: los productos más cerca de agotarse primero
+    productos.sort(key=lambda p: p["current_stock"])
+
+    for i in range(0, len(productos), tamano_lote):
+        if limite is not None and time.monotonic() >= limite:
+            yield {
+                "trayectorias": {},
+                "errores": errores,
+                "pendientes": [p["product_id"] for p in productos[i:]]
+            }
+            return
+
+        trayectorias = {}
+        lote = []
+        for p in productos[i:i + tamano_lote]:
+            p["dias"] = _dias_hasta(p["ultima_fecha_real"], fechas_finales[p["product_id"]])
+            p["predicciones"] = np.empty(0)
+            p["tipo"] = "datos_reales"
+            if p["dias"] > 0 and len(p["historial"]) < N_STEPS:
+                errores[p["product_id"]] = (
+                    f"No hay suficientes datos para {p['product_id']}. "
+                    f"Se requieren {N_STEPS} días, solo hay {len(p['historial'])}."
+                )
+                continue
+            if p["dias"] > 0:
+                lote.append(p)
+            trayectorias[p["product_id"]] = p
+
+        if lote:
+            largos = []
+            if modelo_semanal is not None:
+                for p in lote:
+                    if p["dias"] > DIAS_LARGO_PLAZO:
+                        p["semanal"] = agregar_semanal(p["grupo"])
+                        if len(p["semanal"]) >= N_SEMANAS:
+                            largos.append(p)
+            ids_largos = {p["product_id"] for p in largos}
+            dias_diarios = [DIAS_LARGO_PLAZO if p["product_id"] in ids_largos else p["dias"] for p in lote]
+
+            ventanas = np.stack([p["historial"][COLS_SCALER].to_numpy() for p in lote])
+            dias_semana = np.array([(p["ultima_fecha_real"] + timedelta(days=1)).dayofweek for p in lote])
+            predicciones, tipo = _predecir_trayectoria(ventanas, dias_semana, max(dias_diarios), limite)
+            if predicciones is not None:
+                for p, fila, dias in zip(lote, predicciones, dias_diarios):
+                    p["predicciones"] = fila[:dias]
+                    p["tipo"] = tipo
+                if largos and not _extender_semanal(largos, limite):
+                    predicciones = None
+            if predicciones is None:
+                # Deadline agotado a mitad del rollout: el lote queda pendiente
+                for p in lote:
+                    del trayectorias[p["product_id"]]
+                for p in trayectorias.values():
+                    _limpiar_trayectoria(p)
+                yield {
+                    "trayectorias": trayectorias,
+                    "errores": errores,
+                    "pendientes": [p["product_id"] for p in lote + productos[i + tamano_lote:]]
+                }
+                return
+
+        for p in trayectorias.values():
+            _limpiar_trayectoria(p)
+
+        yield {"trayectorias": trayectorias, "errores": errores, "pendientes": []}
+        errores = {}
+
+    if errores:
+        yield {"trayectorias": {}, "errores": errores, "pendientes": []}
+
+
+def predecir_trayectorias(
+    product_ids: list,
+    fecha_final,
+    deadline_s: Optional[float] = None,
+    tamano_lote: int = TAMANO_LOTE
+) -> Dict[str, Any]:
+    """
+    Calcula todas las trayectorias de iterar_trayectorias y las reúne.
+
+    Args:
+        product_ids: IDs de los productos a predecir
+        fecha_final: Última fecha de la trayectoria (o {product_id: fecha})
+        deadline_s: Presupuesto de cómputo en segundos (None = sin límite)
+        tamano_lote: Productos por lote
+
+    Returns:
+        Diccionario con:
+            trayectorias: {product_id: trayectoria} en orden de prioridad
+            errores: {product_id: mensaje}
+            truncado: True si el deadline dejó productos sin calcular
+            pendientes: IDs no calculados por el deadline
+            tiempo_s: Tiempo de cómputo consumido
+    """
+    inicio = time.monotonic()
+    trayectorias, errores, pendientes = {}, {}, []
+
+    for lote in iterar_trayectorias(product_ids, fecha_final, deadline_s, tamano_lote):
+        trayectorias.update(lote["trayectorias"])
+        errores.update(lote["errores"])
+        pendientes.extend(lote["pendientes"])
+
+    return {
+        "trayectorias": trayectorias,
+        "errores": errores,
+        "truncado": len(pendientes) > 0,
+        "pendientes": pendientes,
+        "tiempo_s": round(time.monotonic() - inicio, 4)
+    }
+
+
+def stock_en_fecha(trayectoria: Dict[str, Any], fecha) -> float:
+    """
+    Stock de una trayectoria calculada por predecir_trayectorias en una fecha.
+
+    Fechas hasta el último dato real devuelven el dato real (o el stock actual
+    si no hay registro ese día); fechas futuras devuelven la predicción.
+    """
+    fecha = pd.to_datetime(fecha)
+    dias = _dias_hasta(trayectoria["ultima_fecha_real"], fecha)
+    if dias > 0:
+        return float(trayectoria["predicciones"][dias - 1])
+    if fecha in trayectoria["reales"].index:
+        return float(trayectoria["reales"].loc[fecha])
+    return trayectoria["current_stock"]
+
+
+def matriz_stock(trayectorias: Dict[str, Dict[str, Any]], fechas) -> np.ndarray:
+    """
+    Versión vectorizada de stock_en_fecha para varias trayectorias y fechas.
+
+    Args:
+        trayectorias: {product_id: trayectoria} de predecir_trayectorias
+        fechas: Fechas de las columnas
+
+    Returns:
+        Array (len(trayectorias), len(fechas)) con el stock en cada fecha,
+        en el orden de iteración de `trayectorias`
+    """
+    fechas = pd.DatetimeIndex(pd.to_datetime(list(fechas)))
+    matriz = np.empty((len(trayectorias), len(fechas)))
+
+    for i, trayectoria in enumerate(trayectorias.values()):
+        dias = np.maximum(((fechas - trayectoria["ultima_fecha_real"]) / pd.Timedelta(days=1)).astype(int), 0)
+        fila = np.full(len(fechas), trayectoria["current_stock"], dtype=float)
+
+        futuro = dias > 0
+        if futuro.any():
+            fila[futuro] = trayectoria["predicciones"][dias[futuro] - 1]
+        if (~futuro).any():
+            reales = trayectoria["reales"].reindex(fechas[~futuro])
+            fila[~futuro] = reales.fillna(trayectoria["current_stock"]).to_numpy(dtype=float)
+
+        matriz[i] = fila
+    return matriz
+
+
 def predict_stock_range(
     product_id: str,
     start_date: str,
@@ -407,41 +1026,38 @@ def predict_stock_range(
     start = pd.to_datetime(start_date)
     end = pd.to_datetime(end_date)
 
-    # Calcular predicciones día a día 
+    if start > end:
+        return {
+            "error": "Rango de fechas vacío",
+            "product_name": product_id
+        }
+
+    # Una sola trayectoria hasta la fecha final en lugar de un rollout por día
+    motor = predecir_trayectorias([product_id], end)
+    if product_id in motor["errores"]:
+        return {
+            "error": motor["errores"][product_id],
+            "product_name": product_id
+        }
+    trayectoria = motor["trayectorias"][product_id]
+
     daily_predictions = []
     current = start
-    final_result = None
-
     while current <= end:
-        res = predict_stock_product_date(
-            product_id=product_id,
-            date=current.strftime("%Y-%m-%d"),
-            use_cache=False
-        )
-        if "error" in res:
-            return res
-
         daily_predictions.append({
             "date": current.strftime("%Y-%m-%d"),
-            "predicted_stock": res["predicted_stock"],
+            "predicted_stock": round(stock_en_fecha(trayectoria, current), 2),
         })
-        final_result = res
         current += timedelta(days=1)
 
-    if final_result is None:
-        return {
-            "error": "Rango de fechas vacío",
-            "product_name": product_id
-        }
-
     return {
         "product_name": product_id,
         "start_date": start_date,
         "end_date": end_date,
         "total_days": len(daily_predictions),
         "daily_predictions": daily_predictions,
-        "final_stock": final_result["predicted_stock"],
-        "current_stock": final_result["current_stock"],
+        "final_stock": daily_predictions[-1]["predicted_stock"],
+        "current_stock": round(trayectoria["current_stock"], 2),
     }
 
 
@@ -459,9 +1075,10 @@ def clean_numpy(value):
 
 def reload_dataset(dataset_path: Path = DATASET_PATH) -> bool:
     """Recarga el dataset de inventario en memoria"""
-    global df
+    global df, _marca_datos
     try:
         df = load_inventory_dataset()
+        _marca_datos = _calcular_marca_datos(df)
         print(f"✓ Dataset recargado en memoria")
         return True
     except Exception as e:
@@ -5,6 +5,8 @@ Reentrena el modelo y retorna métricas MAE y RMSE para aprobación.
 
 USO:
     reporte = reentrenar_y_evaluar(epochs=10)
+    reporte = reentrenar_y_evaluar(epochs=10, horizonte_directo=30)  # + modelo directo
+    reporte = reentrenar_y_evaluar(epochs=10, entrenar_semanal=True)  # + modelo semanal
     if reporte['recomendacion']['decision'] == 'APROBAR':
         aplicar_modelo_candidato(reporte['version'])
 """
@@ -14,11 +16,13 @@ import numpy as np
 import tensorflow as tf
 from datetime import datetime
 from sklearn.metrics import mean_squared_error, mean_absolute_error
+from sklearn.preprocessing import StandardScaler
 import joblib
 from pathlib import Path
 import logging
 import json
 import shutil
+import time
 
 # Configuración
 BASE_DIR = Path(__file__).resolve().parent.parent
@@ -39,8 +43,19 @@ FEATURES = [
 TARGET = "quantity_available"
 N_STEPS = 7
 
+# Modelo semanal de largo plazo
+FEATURES_SEMANALES = [
+    "quantity_on_hand", "quantity_reserved", "reorder_point",
+    "optimal_stock_level", "average_daily_usage", "stock_status",
+    "semana_anio", "category"
+]
+N_SEMANAS = 8
+
 MODEL_FILE = FILES_DIR / "modelo.h5"
 SCALER_FILE = FILES_DIR / "scaler.pkl"
+DIRECT_MODEL_FILE = FILES_DIR / "modelo_directo.h5"
+WEEKLY_MODEL_FILE = FILES_DIR / "modelo_semanal.h5"
+WEEKLY_SCALER_FILE = FILES_DIR / "scaler_semanal.pkl"
 
 # Logging simple
 logging.basicConfig(
@@ -51,6 +66,38 @@ logging.basicConfig(
 logger = logging.getLogger(__name__)
 
 
+def _avisar(progreso, fraccion, mensaje):
+    """Informa el avance a quien lanzó el reentrenamiento (p. ej. el gestor de trabajos)."""
+    if progreso is not None:
+        progreso(fraccion, mensaje)
+
+
+class ProgresoEpocas(tf.keras.callbacks.Callback):
+    """
+    Informa el avance al terminar cada época, repartiendo el tramo [inicio, fin]
+    entre las épocas. Si `progreso` lanza una excepción (cancelación), el
+    entrenamiento se interrumpe.
+    """
+
+    def __init__(self, progreso, inicio, fin, epochs, etiqueta):
+        super().__init__()
+        self.progreso = progreso
+        self.inicio = inicio
+        self.fin = fin
+        self.epochs = max(int(epochs), 1)
+        self.etiqueta = etiqueta
+
+    def on_epoch_end(self, epoch, logs=None):
+        logs = logs or {}
+        fraccion = self.inicio + (self.fin - self.inicio) * (epoch + 1) / self.epochs
+        detalle = f", val_loss={logs['val_loss']:.4f}" if 'val_loss' in logs else ""
+        _avisar(self.progreso, fraccion, f"{self.etiqueta}: época {epoch + 1}/{self.epochs}{detalle}")
+
+
+def _callbacks_progreso(progreso, inicio, fin, epochs, etiqueta):
+    return [ProgresoEpocas(progreso, inicio, fin, epochs, etiqueta)] if progreso is not None else []
+
+
 def make_sequences(df, feat_cols, target_col, n_steps=N_STEPS):
     """Crea secuencias temporales LSTM."""
     X, y = [], []
@@ -63,6 +110,168 @@ def make_sequences(df, feat_cols, target_col, n_steps=N_STEPS):
     return np.array(X), np.array(y)
 
 
+def make_sequences_multi(df, feat_cols, target_col, n_steps=N_STEPS, horizonte=30):
+    """Crea secuencias con objetivo multi-horizonte (los próximos `horizonte` días)."""
+    X, Y = [], []
+    for pid, g in df.groupby("product_id"):
+        g = g.sort_values("created_at")
+        vals = g[feat_cols + [target_col]].values
+        for i in range(n_steps, len(g) - horizonte + 1):
+            X.append(vals[i-n_steps:i, :-1])
+            Y.append(vals[i:i+horizonte, -1])
+    return np.array(X), np.array(Y)
+
+
+def construir_modelo(salidas=1, n_steps=N_STEPS, n_features=len(FEATURES)):
+    """Arquitectura LSTM del forecaster; `salidas` > 1 genera la cabeza multi-horizonte."""
+    return tf.keras.Sequential([
+        tf.keras.layers.Input(shape=(n_steps, n_features)),
+        tf.keras.layers.LSTM(64, return_sequences=True),
+        tf.keras.layers.Dropout(0.3),
+        tf.keras.layers.LSTM(32),
+        tf.keras.layers.Dropout(0.3),
+        tf.keras.layers.Dense(32, activation='relu'),
+        tf.keras.layers.Dense(salidas)
+    ])
+
+
+def rollout_recursivo_escalado(modelo, X, horizonte, scaler):
+    """
+    Predicción recursiva por lotes en espacio escalado (baseline del modelo directo).
+
+    Cada predicción de TARGET se reescala como quantity_on_hand del nuevo día.
+    Como N_STEPS = 7, el día de la semana del nuevo registro coincide con el
+    del primer registro de la ventana.
+    """
+    cols = list(scaler.feature_names_in_)
+    idx_t, idx_q = cols.index(TARGET), cols.index("quantity_on_hand")
+    idx_dia, idx_fin = FEATURES.index("dia_semana"), FEATURES.index("fin_de_semana")
+    
+    ventanas = X.astype(float).copy()
+    salida = np.empty((len(X), horizonte))
+    for paso in range(horizonte):
+        pred = np.asarray(modelo.predict_on_batch(ventanas))[:, 0]
+        salida[:, paso] = pred
+        
+        original = pred * scaler.scale_[idx_t] + scaler.mean_[idx_t]
+        nuevo = ventanas[:, -1, :].copy()
+        nuevo[:, FEATURES.index("quantity_on_hand")] = (original - scaler.mean_[idx_q]) / scaler.scale_[idx_q]
+        nuevo[:, idx_dia] = ventanas[:, 0, idx_dia]
+        nuevo[:, idx_fin] = ventanas[:, 0, idx_fin]
+        ventanas = np.concatenate([ventanas[:, 1:, :], nuevo[:, None, :]], axis=1)
+    return salida
+
+
+def _metricas_horizonte(Y_real, Y_pred):
+    """MAE y RMSE global y al último día del horizonte."""
+    mask = (~np.isnan(Y_real)) & (~np.isnan(Y_pred))
+    ultimo = mask[:, -1]
+    return {
+        'rmse': float(np.sqrt(mean_squared_error(Y_real[mask], Y_pred[mask]))),
+        'mae': float(mean_absolute_error(Y_real[mask], Y_pred[mask])),
+        'mae_ultimo_dia': float(mean_absolute_error(Y_real[ultimo, -1], Y_pred[ultimo, -1]))
+    }
+
+
+def evaluar_directo_vs_recursivo(modelo_directo, modelo_recursivo, X_test, Y_test, scaler):
+    """Compara precisión y latencia del modelo directo contra el rollout recursivo."""
+    horizonte = Y_test.shape[1]
+    
+    inicio = time.perf_counter()
+    Y_directo = np.asarray(modelo_directo.predict(X_test, verbose=0))
+    t_directo = time.perf_counter() - inicio
+    
+    inicio = time.perf_counter()
+    Y_recursivo = rollout_recursivo_escalado(modelo_recursivo, X_test, horizonte, scaler)
+    t_recursivo = time.perf_counter() - inicio
+    
+    return {
+        'horizonte': horizonte,
+        'ventanas_evaluadas': int(len(X_test)),
+        'directo': {
+            **_metricas_horizonte(Y_test, Y_directo),
+            'latencia_total_s': round(t_directo, 4),
+            'latencia_ms_por_ventana': round(t_directo * 1000 / max(len(X_test), 1), 4)
+        },
+        'recursivo': {
+            **_metricas_horizonte(Y_test, Y_recursivo),
+            'latencia_total_s': round(t_recursivo, 4),
+            'latencia_ms_por_ventana': round(t_recursivo * 1000 / max(len(X_test), 1), 4)
+        },
+        'aceleracion': round(t_recursivo / t_directo, 2) if t_directo > 0 else None
+    }
+
+
+def entrenar_modelo_semanal(df, epochs=10, batch_size=128, progreso=None, tramo=(0.0, 1.0)):
+    """
+    Entrena el modelo semanal de largo plazo a partir del histórico diario.
+
+    El histórico se agrega por semana y se escala con un scaler propio. Si ya
+    existe un modelo semanal en producción se evalúa como referencia.
+
+    Args:
+        progreso: Función opcional progreso(fraccion, mensaje), llamada por época
+        tramo: Fracciones (inicio, fin) del progreso total que ocupa este paso
+
+    Returns:
+        (modelo, scaler, reporte) o (None, None, None) si no hay datos suficientes
+    """
+    from model.db_loader import agregar_semanal
+    
+    semanal = agregar_semanal(df).dropna(subset=FEATURES_SEMANALES + [TARGET])
+    n = len(semanal)
+    train_end = int(n * 0.70)
+    val_end = train_end + int(n * 0.15)
+    
+    cols = FEATURES_SEMANALES + [TARGET]
+    scaler_semanal = StandardScaler()
+    scaler_semanal.fit(semanal.iloc[:train_end][cols])
+    
+    subsets = []
+    for subset in [semanal.iloc[:train_end].copy(), semanal.iloc[train_end:val_end].copy(), semanal.iloc[val_end:].copy()]:
+        subset[cols] = scaler_semanal.transform(subset[cols])
+        subsets.append(make_sequences(subset, FEATURES_SEMANALES, TARGET, n_steps=N_SEMANAS))
+    (X_train, y_train), (X_val, y_val), (X_test, y_test) = subsets
+    
+    logger.info(f"   ✓ Semanas: {n:,} filas, Secuencias: Train={len(X_train)}, Val={len(X_val)}, Test={len(X_test)}")
+    if len(X_train) == 0 or len(X_test) == 0:
+        logger.warning("   ⚠ Histórico insuficiente para el modelo semanal, se omite")
+        return None, None, None
+    
+    modelo = construir_modelo(n_steps=N_SEMANAS, n_features=len(FEATURES_SEMANALES))
+    modelo.compile(optimizer='adam', loss='mse', metrics=['mae'])
+    modelo.fit(
+        X_train, y_train,
+        validation_data=(X_val, y_val) if len(X_val) else None,
+        epochs=epochs,
+        batch_size=batch_size,
+        callbacks=[
+            tf.keras.callbacks.EarlyStopping(monitor='val_loss' if len(X_val) else 'loss', patience=5, restore_best_weights=True)
+        ] + _callbacks_progreso(progreso, tramo[0], tramo[1], epochs, "Modelo semanal"),
+        verbose=0
+    )
+    
+    reporte = {
+        'n_semanas': N_SEMANAS,
+        'metricas_nuevo': evaluar_modelo(modelo, X_test, y_test),
+        'metricas_anterior': None
+    }
+    
+    # Referencia: modelo semanal actual evaluado con su propio scaler
+    if WEEKLY_MODEL_FILE.exists() and WEEKLY_SCALER_FILE.exists():
+        try:
+            modelo_actual = tf.keras.models.load_model(str(WEEKLY_MODEL_FILE), compile=False)
+            scaler_actual = joblib.load(WEEKLY_SCALER_FILE)
+            test = semanal.iloc[val_end:].copy()
+            test[cols] = scaler_actual.transform(test[cols])
+            X_ref, y_ref = make_sequences(test, FEATURES_SEMANALES, TARGET, n_steps=N_SEMANAS)
+            reporte['metricas_anterior'] = evaluar_modelo(modelo_actual, X_ref, y_ref)
+        except Exception as e:
+            logger.warning(f"   ⚠ No se pudo evaluar el modelo semanal actual: {str(e)[:100]}")
+    
+    return modelo, scaler_semanal, reporte
+
+
 def cargar_modelo_robusto(ruta):
     """Carga modelo con múltiples intentos de compatibilidad."""
     rutas = [ruta, FILES_DIR / "modelo.h5"]
@@ -150,15 +359,30 @@ def reentrenar_y_evaluar(
     epochs=10, 
     batch_size=128,
     usar_early_stopping=True,  # Parámetro ignorado, por compatibilidad
-    patience=5  # Parámetro ignorado, por compatibilidad
+    patience=5,  # Parámetro ignorado, por compatibilidad
+    horizonte_directo=0,
+    entrenar_semanal=False,
+    progreso=None
 ):
     """
     Reentrena modelo y retorna reporte simplificado.
     
+    Args:
+        horizonte_directo: Si > 0, entrena además un modelo directo que predice
+            los próximos `horizonte_directo` días en una sola pasada y lo compara
+            contra el rollout recursivo del modelo candidato.
+        entrenar_semanal: Si True, entrena también el modelo semanal de largo
+            plazo; se versiona junto al diario en el mismo candidato.
+        progreso: Función opcional progreso(fraccion, mensaje) llamada en cada
+            paso y en cada época; si lanza una excepción se aborta el proceso.
+    
     Returns:
-        dict: {version, metricas_anterior, metricas_nuevo, comparacion, recomendacion}
+        dict: {version, metricas_anterior, metricas_nuevo, comparacion, recomendacion,
+               modelo_directo (si aplica), modelo_semanal (si aplica)}
     """
     version = datetime.now().strftime("%Y%m%d_%H%M%S")
+    # Reparto del progreso: el entrenamiento principal y los modelos opcionales
+    fin_principal = 0.75 - (0.2 if horizonte_directo else 0) - (0.2 if entrenar_semanal else 0)
     logger.info("=" * 80)
     logger.info(f"🔬 REENTRENAMIENTO - Versión {version}")
     logger.info("=" * 80)
@@ -168,6 +392,7 @@ def reentrenar_y_evaluar(
         # PASO 1: CARGAR DATOS
         # ====================================================================
         logger.info("\n📥 Paso 1: Cargando datos desde PostgreSQL...")
+        _avisar(progreso, 0.0, "Cargando datos")
         from model.db_loader import load_inventory_dataset
         df = load_inventory_dataset()
         if df is None or len(df) == 0:
@@ -181,6 +406,7 @@ def reentrenar_y_evaluar(
         # PASO 2: CARGAR MODELO Y SCALER
         # ====================================================================
         logger.info("\n📦 Paso 2: Cargando modelo actual...")
+        _avisar(progreso, 0.05, "Cargando modelo actual")
         tf.keras.backend.clear_session()
         modelo_actual = cargar_modelo_robusto(MODEL_FILE)
         scaler = joblib.load(SCALER_FILE)
@@ -191,6 +417,7 @@ def reentrenar_y_evaluar(
         # PASO 3: PREPARAR DATOS
         # ====================================================================
         logger.info("\n✂️  Paso 3: Preparando datos (split 70/15/15)...")
+        _avisar(progreso, 0.08, "Preparando secuencias")
         df = df.sort_values(["product_id", "created_at"])
         n = len(df)
         train_end = int(n * 0.70)
@@ -220,6 +447,7 @@ def reentrenar_y_evaluar(
         # PASO 4: EVALUAR MODELO ACTUAL
         # ====================================================================
         logger.info("\n📊 Paso 4: Evaluando modelo actual...")
+        _avisar(progreso, 0.12, "Evaluando modelo actual")
         metricas_anterior = evaluar_modelo(modelo_actual, X_test, y_test)
         logger.info(f"   📉 RMSE: {metricas_anterior['rmse']:.4f}")
         logger.info(f"   📉 MAE:  {metricas_anterior['mae']:.4f}")
@@ -228,16 +456,9 @@ def reentrenar_y_evaluar(
         # PASO 5: REENTRENAR MODELO
         # ====================================================================
         logger.info(f"\n🎯 Paso 5: Reentrenando modelo (máx {epochs} épocas)...")
+        _avisar(progreso, 0.15, "Reentrenando modelo")
         
-        modelo_nuevo = tf.keras.Sequential([
-            tf.keras.layers.Input(shape=(N_STEPS, len(FEATURES))),
-            tf.keras.layers.LSTM(64, return_sequences=True),
-            tf.keras.layers.Dropout(0.3),
-            tf.keras.layers.LSTM(32),
-            tf.keras.layers.Dropout(0.3),
-            tf.keras.layers.Dense(32, activation='relu'),
-            tf.keras.layers.Dense(1)
-        ])
+        modelo_nuevo = construir_modelo()
         
         # Copiar pesos
         try:
@@ -257,7 +478,7 @@ def reentrenar_y_evaluar(
             callbacks=[
                 tf.keras.callbacks.EarlyStopping(monitor='val_loss', patience=5, restore_best_weights=True),
                 tf.keras.callbacks.ReduceLROnPlateau(monitor='val_loss', factor=0.5, patience=3)
-            ],
+            ] + _callbacks_progreso(progreso, 0.15, fin_principal, epochs, "Modelo diario"),
             verbose=0
         )
         
@@ -268,14 +489,74 @@ def reentrenar_y_evaluar(
         # PASO 6: EVALUAR MODELO NUEVO
         # ====================================================================
         logger.info("\n📊 Paso 6: Evaluando modelo candidato...")
+        _avisar(progreso, fin_principal, "Evaluando modelo candidato")
         metricas_nuevo = evaluar_modelo(modelo_nuevo, X_test, y_test)
         logger.info(f"   📈 RMSE: {metricas_nuevo['rmse']:.4f}")
         logger.info(f"   📈 MAE:  {metricas_nuevo['mae']:.4f}")
         
+        # ====================================================================
+        # PASO 6b: MODELO DIRECTO MULTI-HORIZONTE (opcional)
+        # ====================================================================
+        modelo_directo = None
+        reporte_directo = None
+        if horizonte_directo and horizonte_directo > 0:
+            logger.info(f"\n🎯 Paso 6b: Entrenando modelo directo (horizonte {horizonte_directo} días)...")
+            X_train_m, Y_train_m = make_sequences_multi(df_train, FEATURES, TARGET, horizonte=horizonte_directo)
+            X_val_m, Y_val_m = make_sequences_multi(df_val, FEATURES, TARGET, horizonte=horizonte_directo)
+            X_test_m, Y_test_m = make_sequences_multi(df_test, FEATURES, TARGET, horizonte=horizonte_directo)
+            
+            if len(X_train_m) == 0 or len(X_test_m) == 0:
+                logger.warning("   ⚠ No hay suficientes datos para el horizonte solicitado, se omite")
+            else:
+                modelo_directo = construir_modelo(salidas=horizonte_directo)
+                
+                # Reutilizar las capas recurrentes del candidato (todas menos la salida)
+                try:
+                    for capa_dir, capa_nueva in zip(modelo_directo.layers[:-1], modelo_nuevo.layers[:-1]):
+                        capa_dir.set_weights(capa_nueva.get_weights())
+                    logger.info("   ✓ Capas compartidas copiadas del modelo candidato")
+                except:
+                    logger.warning("   ⚠ No se pudieron copiar pesos, entrenando desde cero")
+                
+                modelo_directo.compile(optimizer='adam', loss='mse', metrics=['mae'])
+                modelo_directo.fit(
+                    X_train_m, Y_train_m,
+                    validation_data=(X_val_m, Y_val_m) if len(X_val_m) else None,
+                    epochs=epochs,
+                    batch_size=batch_size,
+                    callbacks=[
+                        tf.keras.callbacks.EarlyStopping(monitor='val_loss' if len(X_val_m) else 'loss', patience=5, restore_best_weights=True)
+                    ] + _callbacks_progreso(progreso, fin_principal, fin_principal + 0.2, epochs, "Modelo directo"),
+                    verbose=0
+                )
+                
+                reporte_directo = evaluar_directo_vs_recursivo(modelo_directo, modelo_nuevo, X_test_m, Y_test_m, scaler)
+                logger.info(f"   📈 Directo:   MAE={reporte_directo['directo']['mae']:.4f}, "
+                            f"{reporte_directo['directo']['latencia_ms_por_ventana']:.3f} ms/ventana")
+                logger.info(f"   📉 Recursivo: MAE={reporte_directo['recursivo']['mae']:.4f}, "
+                            f"{reporte_directo['recursivo']['latencia_ms_por_ventana']:.3f} ms/ventana")
+                logger.info(f"   ⚡ Aceleración: x{reporte_directo['aceleracion']}")
+        
+        # ====================================================================
+        # PASO 6c: MODELO SEMANAL DE LARGO PLAZO (opcional)
+        # ====================================================================
+        modelo_semanal, scaler_semanal, reporte_semanal = None, None, None
+        if entrenar_semanal:
+            logger.info("\n🎯 Paso 6c: Entrenando modelo semanal de largo plazo...")
+            inicio_semanal = fin_principal + (0.2 if horizonte_directo else 0)
+            modelo_semanal, scaler_semanal, reporte_semanal = entrenar_modelo_semanal(
+                df, epochs=epochs, batch_size=batch_size,
+                progreso=progreso, tramo=(inicio_semanal, inicio_semanal + 0.2)
+            )
+            if reporte_semanal:
+                logger.info(f"   📈 RMSE: {reporte_semanal['metricas_nuevo']['rmse']:.4f}")
+                logger.info(f"   📈 MAE:  {reporte_semanal['metricas_nuevo']['mae']:.4f}")
+        
         # ====================================================================
         # PASO 7: COMPARAR MÉTRICAS
         # ====================================================================
         logger.info("\n📊 Paso 7: Comparando métricas...")
+        _avisar(progreso, 0.8, "Comparando métricas")
         rmse_cambio = ((metricas_anterior['rmse'] - metricas_nuevo['rmse']) / metricas_anterior['rmse']) * 100
         mae_cambio = ((metricas_anterior['mae'] - metricas_nuevo['mae']) / metricas_anterior['mae']) * 100
         
@@ -313,11 +594,17 @@ def reentrenar_y_evaluar(
         # PASO 9: GUARDAR CANDIDATO
         # ====================================================================
         logger.info("\n💾 Paso 9: Guardando modelo candidato...")
+        _avisar(progreso, 0.9, "Guardando modelo candidato")
         candidate_dir = CANDIDATES_DIR / version
         candidate_dir.mkdir(parents=True, exist_ok=True)
         
         modelo_nuevo.save(str(candidate_dir / "modelo_candidato.h5"))
         joblib.dump(scaler, candidate_dir / "scaler.pkl")
+        if modelo_directo is not None:
+            modelo_directo.save(str(candidate_dir / "modelo_directo_candidato.h5"))
+        if modelo_semanal is not None:
+            modelo_semanal.save(str(candidate_dir / "modelo_semanal_candidato.h5"))
+            joblib.dump(scaler_semanal, candidate_dir / "scaler_semanal.pkl")
         
         with open(candidate_dir / "metadata.json", 'w') as f:
             json.dump({
@@ -326,7 +613,9 @@ def reentrenar_y_evaluar(
                 'metricas_anterior': metricas_anterior,
                 'metricas_nuevo': metricas_nuevo,
                 'comparacion': comparacion,
-                'recomendacion': {'decision': decision, 'confianza': confianza}
+                'recomendacion': {'decision': decision, 'confianza': confianza},
+                'modelo_directo': reporte_directo,
+                'modelo_semanal': reporte_semanal
             }, f, indent=2)
         
         logger.info(f"   ✓ Modelo candidato guardado: {version}")
@@ -349,7 +638,9 @@ def reentrenar_y_evaluar(
             'datos': {
                 'filas_totales': len(df),
                 'productos_unicos': df['product_id'].nunique()
-            }
+            },
+            'modelo_directo': reporte_directo,
+            'modelo_semanal': reporte_semanal
         }
     
     except Exception as e:
@@ -373,10 +664,32 @@ def aplicar_modelo_candidato(version):
         shutil.copy(MODEL_FILE, backup_dir / "modelo_anterior.keras")
     if SCALER_FILE.exists():
         shutil.copy(SCALER_FILE, backup_dir / "scaler_anterior.pkl")
+    if DIRECT_MODEL_FILE.exists():
+        shutil.copy(DIRECT_MODEL_FILE, backup_dir / "modelo_directo_anterior.h5")
+    if WEEKLY_MODEL_FILE.exists():
+        shutil.copy(WEEKLY_MODEL_FILE, backup_dir / "modelo_semanal_anterior.h5")
+    if WEEKLY_SCALER_FILE.exists():
+        shutil.copy(WEEKLY_SCALER_FILE, backup_dir / "scaler_semanal_anterior.pkl")
     
     # Aplicar
     shutil.copy(candidate_dir / "modelo_candidato.h5", MODEL_FILE)
     shutil.copy(candidate_dir / "scaler.pkl", SCALER_FILE)
+    # Los modelos directo y semanal se versionan junto al diario: si el
+    # candidato no los trae, los anteriores (ya respaldados) se retiran para no
+    # mezclar modelos y scalers entrenados con datos distintos
+    if (candidate_dir / "modelo_directo_candidato.h5").exists():
+        shutil.copy(candidate_dir / "modelo_directo_candidato.h5", DIRECT_MODEL_FILE)
+    elif DIRECT_MODEL_FILE.exists():
+        DIRECT_MODEL_FILE.unlink()
+        logger.info("   Modelo directo anterior retirado (el candidato no lo incluye)")
+    if (candidate_dir / "modelo_semanal_candidato.h5").exists() and (candidate_dir / "scaler_semanal.pkl").exists():
+        shutil.copy(candidate_dir / "modelo_semanal_candidato.h5", WEEKLY_MODEL_FILE)
+        shutil.copy(candidate_dir / "scaler_semanal.pkl", WEEKLY_SCALER_FILE)
+    else:
+        for anterior in (WEEKLY_MODEL_FILE, WEEKLY_SCALER_FILE):
+            if anterior.exists():
+                anterior.unlink()
+        logger.info("   Modelo semanal anterior retirado (el candidato no lo incluye)")
     
     logger.info(f"✓ Modelo aplicado (backup: {backup_dir.name})")
     
@@ -411,12 +724,84 @@ def listar_modelos_candidatos():
                     'timestamp': meta.get('timestamp'),
                     'recomendacion': meta.get('recomendacion', {}).get('decision'),
                     'rmse_cambio': meta.get('comparacion', {}).get('rmse_cambio'),
-                    'mae_cambio': meta.get('comparacion', {}).get('mae_cambio')
+                    'mae_cambio': meta.get('comparacion', {}).get('mae_cambio'),
+                    'incluye_directo': meta.get('modelo_directo') is not None,
+                    'incluye_semanal': meta.get('modelo_semanal') is not None
                 })
     return sorted(candidatos, key=lambda x: x['version'], reverse=True)
 
 
+def evaluar_candidato(version, progreso=None):
+    """
+    Reevalúa un candidato pendiente contra el modelo en producción con los
+    datos actuales (el mismo 15% final que usa el reentrenamiento).
+
+    Útil cuando llegaron datos nuevos entre el reentrenamiento y la decisión.
+    El resultado se guarda en el metadata.json del candidato como 'reevaluacion'.
+
+    Returns:
+        dict: {version, metricas_actual, metricas_candidato, comparacion, datos}
+    """
+    candidate_dir = CANDIDATES_DIR / version
+    if not candidate_dir.exists():
+        raise FileNotFoundError(f"Candidato {version} no encontrado")
+    
+    logger.info(f"🔎 Reevaluando candidato {version}...")
+    _avisar(progreso, 0.0, "Cargando datos")
+    from model.db_loader import load_inventory_dataset
+    df = load_inventory_dataset()
+    if df is None or len(df) == 0:
+        raise ValueError("No hay datos en la BD")
+    df = df.dropna(subset=FEATURES + [TARGET]).sort_values(["product_id", "created_at"])
+    n = len(df)
+    df_test = df.iloc[int(n * 0.70) + int(n * 0.15):]
+    cols = FEATURES + [TARGET]
+    
+    metricas = {}
+    modelos = [
+        ('actual', MODEL_FILE, SCALER_FILE),
+        ('candidato', candidate_dir / "modelo_candidato.h5", candidate_dir / "scaler.pkl"),
+    ]
+    for i, (nombre, ruta_modelo, ruta_scaler) in enumerate(modelos):
+        _avisar(progreso, 0.2 + 0.4 * i, f"Evaluando modelo {nombre}")
+        tf.keras.backend.clear_session()
+        modelo = cargar_modelo_robusto(ruta_modelo)
+        scaler = joblib.load(ruta_scaler)
+        test = df_test.copy()
+        test[cols] = scaler.transform(test[cols])
+        X_test, y_test = make_sequences(test, FEATURES, TARGET)
+        metricas[nombre] = evaluar_modelo(modelo, X_test, y_test)
+        logger.info(f"   {nombre}: RMSE={metricas[nombre]['rmse']:.4f}, MAE={metricas[nombre]['mae']:.4f}")
+    
+    comparacion = {
+        'rmse_cambio': float((metricas['actual']['rmse'] - metricas['candidato']['rmse']) / metricas['actual']['rmse'] * 100),
+        'mae_cambio': float((metricas['actual']['mae'] - metricas['candidato']['mae']) / metricas['actual']['mae'] * 100)
+    }
+    reporte = {
+        'version': version,
+        'timestamp': datetime.now().isoformat(),
+        'metricas_actual': metricas['actual'],
+        'metricas_candidato': metricas['candidato'],
+        'comparacion': comparacion,
+        'datos': {'filas_totales': len(df), 'filas_test': len(df_test)}
+    }
+    
+    _avisar(progreso, 0.95, "Guardando reevaluación")
+    meta_path = candidate_dir / "metadata.json"
+    if meta_path.exists():
+        with open(meta_path) as f:
+            meta = json.load(f)
+        meta['reevaluacion'] = reporte
+        with open(meta_path, 'w') as f:
+            json.dump(meta, f, indent=2)
+    
+    return reporte
+
+
 if __name__ == "__main__":
+    from model.cpu_config import configurar_hilos
+    configurar_hilos("entrenamiento")
+    
     print("\n🔬 Reentrenamiento con Aprobación Manual\n")
     
     reporte = reentrenar_y_evaluar(epochs=10)
@@ -12,7 +12,8 @@ from model.reentrenamiento import (
     reentrenar_y_evaluar, 
     aplicar_modelo_candidato,
     descartar_modelo_candidato,
-    listar_modelos_candidatos
+    listar_modelos_candidatos,
+    evaluar_candidato
 )
 
 try:
@@ -27,10 +28,13 @@ except ImportError:
 
 def retrain_manual_evaluate(csv_content: bytes = None, filename: str = None, 
                            epochs: int = 15, batch_size: int = 128, 
-                           cargar_a_bd: bool = False) -> dict:
+                           cargar_a_bd: bool = False, horizonte_directo: int = 0,
+                           entrenar_semanal: bool = False, progreso=None) -> dict:
     """
     Reentrena el modelo y retorna métricas para APROBACIÓN MANUAL.
     
+    `progreso(fraccion, mensaje)` es opcional y se propaga al entrenamiento.
+    
     Returns:
         dict: Respuesta simplificada con métricas y recomendación
     """
@@ -48,7 +52,13 @@ def retrain_manual_evaluate(csv_content: bytes = None, filename: str = None,
                 cargarnuevosRegistros(tmp.name)
         
         # Reentrenar
-        reporte = reentrenar_y_evaluar(epochs=epochs, batch_size=batch_size)
+        reporte = reentrenar_y_evaluar(
+            epochs=epochs,
+            batch_size=batch_size,
+            horizonte_directo=horizonte_directo,
+            entrenar_semanal=entrenar_semanal,
+            progreso=progreso
+        )
         training_time = time.time() - start_time
         
         # Respuesta limpia
@@ -61,7 +71,9 @@ def retrain_manual_evaluate(csv_content: bytes = None, filename: str = None,
             "metricas_nuevo": reporte['metricas_nuevo'],
             "comparacion": reporte['comparacion'],
             "recomendacion": reporte['recomendacion'],
-            "datos": reporte['datos']
+            "datos": reporte['datos'],
+            "modelo_directo": reporte.get('modelo_directo'),
+            "modelo_semanal": reporte.get('modelo_semanal')
         }
     
     except Exception as e:
@@ -116,6 +128,25 @@ def retrain_manual_reject(version: str) -> dict:
         }
 
 
+def retrain_manual_evaluate_candidate(version: str, progreso=None) -> dict:
+    """Reevalúa un candidato pendiente con los datos actuales."""
+    start_time = time.time()
+    try:
+        reporte = evaluar_candidato(version, progreso=progreso)
+        return {
+            "success": True,
+            "message": "Reevaluación completada",
+            "evaluation_time_seconds": round(time.time() - start_time, 2),
+            **reporte
+        }
+    except Exception as e:
+        return {
+            "success": False,
+            "message": f"Error: {str(e)}",
+            "version": version
+        }
+
+
 def retrain_manual_list_candidates() -> dict:
     """Lista modelos candidatos pendientes."""
     try:
@@ -136,7 +167,8 @@ def retrain_manual_list_candidates() -> dict:
 # Alias para compatibilidad con endpoints existentes
 def retrain_from_csv(csv_content: bytes, filename: str, epochs: int = 15, 
                      batch_size: int = 128, modo: str = "manual", 
-                     cargar_a_bd: bool = False, **kwargs) -> dict:
+                     cargar_a_bd: bool = False, horizonte_directo: int = 0,
+                     entrenar_semanal: bool = False, progreso=None, **kwargs) -> dict:
     """
     Función principal compatible con endpoints existentes.
     Solo soporta modo manual.
@@ -152,16 +184,24 @@ def retrain_from_csv(csv_content: bytes, filename: str, epochs: int = 15,
         filename=filename,
         epochs=epochs,
         batch_size=batch_size,
-        cargar_a_bd=cargar_a_bd
+        cargar_a_bd=cargar_a_bd,
+        horizonte_directo=horizonte_directo,
+        entrenar_semanal=entrenar_semanal,
+        progreso=progreso
     )
 
 
-def retrain_from_database(epochs: int = 15, batch_size: int = 128, **kwargs) -> dict:
+def retrain_from_database(epochs: int = 15, batch_size: int = 128,
+                          horizonte_directo: int = 0, entrenar_semanal: bool = False,
+                          progreso=None, **kwargs) -> dict:
     """Reentrena solo desde datos en PostgreSQL (sin CSV)."""
     return retrain_manual_evaluate(
         csv_content=None,
         filename=None,
         epochs=epochs,
         batch_size=batch_size,
-        cargar_a_bd=False
-    )
\ No newline at end of file
+        cargar_a_bd=False,
+        horizonte_directo=horizonte_directo,
+        entrenar_semanal=entrenar_semanal,
+        progreso=progreso
+    )
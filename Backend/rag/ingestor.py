@@ -8,7 +8,7 @@ from rag.embeddings import add_batch_embeddings, delete_all_embeddings
 FILE_PATH = "files/faqs.json"
 embedder = OllamaEmbeddings(model="nomic-embed-text")
 
-def ingest_faqs(path=FILE_PATH):
+def ingest_faqs(path=FILE_PATH, prerender_audio=True):
     if not os.path.exists(path):
         print("No encuentro faqs.json")
         return
@@ -43,6 +43,14 @@ def ingest_faqs(path=FILE_PATH):
     add_batch_embeddings(items_to_insert)
     print("FAQs manuales cargadas con éxito!")
 
+    # 5. Audio y lipsync de las respuestas (lipsync/prerender.py)
+    if prerender_audio:
+        try:
+            from lipsync.prerender import prerenderizar_respuestas_fijas
+            prerenderizar_respuestas_fijas(lista_faqs, "faq_manual")
+        except Exception as e:
+            print(f"Pre-render de audio omitido: {e}")
+
 
 if __name__ == "__main__":
     ingest_faqs(path=FILE_PATH)
\ No newline at end of file
@@ -0,0 +1,42 @@
+"""
+Configuración común de las pruebas
+==================================
+Las pruebas cubren piezas del backend que no necesitan TensorFlow, gTTS ni
+Rhubarb. Los módulos que importan esas dependencias en el nivel superior se
+sustituyen por módulos falsos con `falsear_modulo`.
+
+USO (desde Backend/):
+    python -m pytest -q
+"""
+
+import sys
+import types
+from pathlib import Path
+
+import pytest
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+if str(BACKEND_DIR) not in sys.path:
+    sys.path.insert(0, str(BACKEND_DIR))
+
+
+@pytest.fixture
+def falsear_modulo(monkeypatch):
+    """Registra en sys.modules un módulo falso con los atributos dados."""
+    def _falsear(nombre: str, **atributos) -> types.ModuleType:
+        modulo = types.ModuleType(nombre)
+        for clave, valor in atributos.items():
+            setattr(modulo, clave, valor)
+        monkeypatch.setitem(sys.modules, nombre, modulo)
+        return modulo
+    return _falsear
+
+
+@pytest.fixture
+def sin_gtts(falsear_modulo):
+    """gTTS falso: importar tts.textToSpeech no requiere la librería ni red."""
+    class _GTTSNoDisponible:
+        def __init__(self, *args, **kwargs):
+            raise RuntimeError("gTTS no está disponible en las pruebas")
+
+    falsear_modulo("gtts", gTTS=_GTTSNoDisponible)
@@ -0,0 +1,164 @@
+"""
+Pruebas del pipeline de audio sin gTTS ni Rhubarb
+=================================================
+La síntesis se sustituye por un tono generado con NumPy y Rhubarb por una
+función que devuelve cues fijos, así que no hace falta red, ffmpeg ni el
+binario de lipsync.
+"""
+
+import base64
+import importlib
+import io
+import threading
+import wave
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import numpy as np
+import pytest
+from pydub import AudioSegment
+
+from tts.estiramiento import cambiar_velocidad_wsola, estirar_tiempo
+
+FRECUENCIA = 22050
+
+
+def _tono(hz: float, segundos: float, frecuencia: int = FRECUENCIA, canales: int = 1) -> AudioSegment:
+    t = np.arange(int(frecuencia * segundos)) / frecuencia
+    muestras = (0.3 * 32767 * np.sin(2 * np.pi * hz * t)).astype(np.int16)
+    if canales > 1:
+        muestras = np.repeat(muestras[:, None], canales, axis=1)
+    return AudioSegment(data=muestras.tobytes(), sample_width=2, frame_rate=frecuencia, channels=canales)
+
+
+def _frecuencia_dominante(muestras: np.ndarray, frecuencia: int) -> float:
+    espectro = np.abs(np.fft.rfft(muestras * np.hanning(len(muestras))))
+    return np.fft.rfftfreq(len(muestras), 1 / frecuencia)[np.argmax(espectro)]
+
+
+# ==================== ESTIRAMIENTO ====================
+
+@pytest.mark.parametrize("velocidad", [0.8, 1.4, 2.0])
+def test_estirar_tiempo_ajusta_la_duracion(velocidad):
+    muestras = np.random.default_rng(0).normal(size=FRECUENCIA)
+    salida = estirar_tiempo(muestras, velocidad, FRECUENCIA)
+    assert salida.shape == (int(round(FRECUENCIA / velocidad)),)
+
+
+def test_estirar_tiempo_conserva_canales_y_tono():
+    audio = _tono(440, 1.0, canales=2)
+    muestras = np.array(audio.get_array_of_samples()).reshape(-1, 2)
+    salida = estirar_tiempo(muestras, 1.4, FRECUENCIA)
+
+    assert salida.shape == (int(round(len(muestras) / 1.4)), 2)
+    assert abs(_frecuencia_dominante(salida[:, 0], FRECUENCIA) - 440) < 5
+
+
+def test_estirar_tiempo_velocidad_invalida():
+    with pytest.raises(ValueError):
+        estirar_tiempo(np.zeros(100), 0, FRECUENCIA)
+
+
+def test_estirar_tiempo_audio_mas_corto_que_una_trama():
+    salida = estirar_tiempo(np.ones(10), 2.0, FRECUENCIA)
+    assert salida.shape == (5,)
+
+
+def test_cambiar_velocidad_wsola_devuelve_audiosegment():
+    audio = _tono(300, 1.0)
+    rapido = cambiar_velocidad_wsola(audio, 1.4)
+    assert (rapido.frame_rate, rapido.channels, rapido.sample_width) == (FRECUENCIA, 1, 2)
+    assert abs(len(rapido) - 1000 / 1.4) <= 1
+
+
+# ==================== FRAGMENTOS ====================
+
+@pytest.fixture
+def fragmentos(sin_gtts):
+    return importlib.import_module("lipsync.fragmentos")
+
+
+def test_dividir_oraciones_une_las_cortas(fragmentos):
+    texto = "Hola. El producto Laptop HP se agota en cinco días según el modelo. Gracias."
+    # "Hola." se une a la siguiente y "Gracias.", la última, a la anterior
+    assert fragmentos.dividir_oraciones(texto) == [texto]
+    assert fragmentos.dividir_oraciones(texto, min_caracteres=5) == [
+        "Hola.", "El producto Laptop HP se agota en cinco días según el modelo.", "Gracias."
+    ]
+
+
+def test_dividir_oraciones_respeta_saltos_de_linea(fragmentos):
+    texto = "Primera línea con bastante texto\nSegunda línea con bastante texto"
+    assert fragmentos.dividir_oraciones(texto, min_caracteres=20) == [
+        "Primera línea con bastante texto", "Segunda línea con bastante texto"
+    ]
+    assert fragmentos.dividir_oraciones("") == []
+
+
+def test_unir_cues_desplaza_y_fusiona_en_la_union(fragmentos):
+    primero = {"metadata": {"soundFile": "a.wav"}, "mouthCues": [
+        {"start": 0.0, "end": 0.5, "value": "B"},
+        {"start": 0.5, "end": 1.2, "value": "X"},   # se recorta a la duración real
+    ]}
+    segundo = {"metadata": {}, "mouthCues": [
+        {"start": 0.0, "end": 0.3, "value": "X"},   # continúa el silencio anterior
+        {"start": 0.3, "end": 0.8, "value": "C"},
+    ]}
+    unido = fragmentos.unir_cues([primero, segundo], [1.0, 0.8])
+
+    assert unido["metadata"] == {"soundFile": "a.wav", "duration": 1.8}
+    assert unido["mouthCues"] == [
+        {"start": 0.0, "end": 0.5, "value": "B"},
+        {"start": 0.5, "end": 1.3, "value": "X"},
+        {"start": 1.3, "end": 1.8, "value": "C"},
+    ]
+
+
+def test_unir_cues_sin_fragmentos(fragmentos):
+    assert fragmentos.unir_cues([], []) == {"metadata": {"duration": 0.0}, "mouthCues": []}
+
+
+# ==================== AUDIO CONCURRENTE ====================
+
+def test_generar_audio_avatar_concurrente_no_comparte_rutas(sin_gtts, monkeypatch, tmp_path):
+    lipsyncgen = importlib.import_module("lipsync.lipsyncgen")
+    tonos = {"primera respuesta": (300, 1.0), "segunda respuesta": (600, 1.5)}
+    monkeypatch.setattr(lipsyncgen, "sintetizar", lambda texto, idioma, voz: _tono(*tonos[texto]))
+    monkeypatch.setattr(lipsyncgen, "DIRECTORIO_TEMPORAL_AUDIO", str(tmp_path))
+
+    # Las dos llamadas deben estar dentro de Rhubarb a la vez
+    ambas_dentro = threading.Barrier(2, timeout=10)
+    rutas = {}
+
+    def rhubarb_falso(wav_path, json_path=None):
+        assert json_path is None
+        ambas_dentro.wait()
+        with wave.open(str(wav_path), "rb") as wav:
+            duracion = wav.getnframes() / wav.getframerate()
+            assert (wav.getframerate(), wav.getnchannels()) == (lipsyncgen.FRECUENCIA_RHUBARB, 1)
+        rutas[threading.get_ident()] = (Path(wav_path), duracion)
+        ambas_dentro.wait()
+        return {"metadata": {"duration": duracion}, "mouthCues": []}
+
+    monkeypatch.setattr(lipsyncgen, "_ejecutar_rhubarb", rhubarb_falso)
+
+    with ThreadPoolExecutor(max_workers=2) as pool:
+        futuros = {texto: pool.submit(lipsyncgen.generar_audio_avatar, texto) for texto in tonos}
+        resultados = {texto: futuro.result(timeout=30) for texto, futuro in futuros.items()}
+
+    archivos = [ruta for ruta, _ in rutas.values()]
+    assert len(archivos) == 2
+    assert archivos[0] != archivos[1]
+    assert archivos[0].parent != archivos[1].parent
+    assert all(ruta.parent.parent == tmp_path for ruta in archivos)
+    # Los directorios de trabajo se borran al terminar
+    assert list(tmp_path.iterdir()) == []
+
+    # Cada respuesta lleva su propio audio y su propio lipsync
+    for texto, (_, segundos) in tonos.items():
+        resultado = resultados[texto]
+        esperado = segundos / 1.4
+        assert abs(resultado["lipsync"]["metadata"]["duration"] - esperado) < 0.01
+        with wave.open(io.BytesIO(base64.b64decode(resultado["audio_wav"])), "rb") as wav:
+            assert abs(wav.getnframes() / wav.getframerate() - esperado) < 0.01
+        assert set(resultado["tiempos"]) == {"sintesis", "velocidad", "lipsync", "codificacion", "total"}
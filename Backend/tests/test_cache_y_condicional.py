@@ -0,0 +1,153 @@
+"""Pruebas de la caché de respuestas y de los GET condicionales."""
+
+import importlib
+from datetime import datetime, timezone
+
+import pytest
+from fastapi import Response
+
+from endpoint import cache_respuestas
+from endpoint.cache_respuestas import CacheRespuestas
+
+
+def test_cache_devuelve_lo_guardado_y_cuenta_fallos():
+    cache = CacheRespuestas("prueba", ttl_s=60, max_entradas=10, max_bytes=10_000)
+    assert cache.obtener("a") is None
+    cache.guardar("a", {"respuesta": "hola"})
+    assert cache.obtener("a") == {"respuesta": "hola"}
+
+
+def test_cache_expira_por_ttl(monkeypatch):
+    reloj = [1000.0]
+    monkeypatch.setattr(cache_respuestas.time, "monotonic", lambda: reloj[0])
+    cache = CacheRespuestas("prueba", ttl_s=10, max_entradas=10, max_bytes=10_000)
+
+    cache.guardar("a", "valor")
+    reloj[0] += 9
+    assert cache.obtener("a") == "valor"
+    reloj[0] += 2
+    assert cache.obtener("a") is None
+    assert len(cache._datos) == 0 and cache._bytes == 0
+
+
+def test_cache_expulsa_la_menos_usada():
+    cache = CacheRespuestas("prueba", ttl_s=60, max_entradas=2, max_bytes=10_000)
+    cache.guardar("a", 1)
+    cache.guardar("b", 2)
+    cache.obtener("a")          # "b" pasa a ser la menos usada
+    cache.guardar("c", 3)
+    assert cache.obtener("b") is None
+    assert cache.obtener("a") == 1 and cache.obtener("c") == 3
+
+
+def test_cache_respeta_el_limite_de_bytes():
+    valor = "x" * 100
+    tamano = cache_respuestas._tamano(valor)
+    cache = CacheRespuestas("prueba", ttl_s=60, max_entradas=100, max_bytes=tamano * 2)
+
+    for clave in ("a", "b", "c"):
+        cache.guardar(clave, valor)
+    assert list(cache._datos) == ["b", "c"]
+    assert cache._bytes <= cache.max_bytes
+
+    # Un valor mayor que toda la caché no se guarda ni expulsa nada
+    cache.guardar("grande", "x" * (tamano * 3))
+    assert cache.obtener("grande") is None
+    assert list(cache._datos) == ["b", "c"]
+
+
+def test_cache_con_ttl_cero_no_guarda():
+    cache = CacheRespuestas("prueba", ttl_s=0, max_entradas=10, max_bytes=10_000)
+    cache.guardar("a", 1)
+    assert cache.obtener("a") is None
+
+
+def test_clave_chat_cambia_con_modelo_y_datos():
+    base = cache_respuestas.clave_chat("stock laptop", "v1", "2024-01-01")
+    assert base == cache_respuestas.clave_chat("stock laptop", "v1", "2024-01-01")
+    assert base != cache_respuestas.clave_chat("stock laptop", "v2", "2024-01-01")
+    assert base != cache_respuestas.clave_chat("stock laptop", "v1", "2024-01-02")
+
+
+# ==================== GET CONDICIONAL ====================
+
+MODIFICADO = datetime(2024, 5, 10, 12, 30, tzinfo=timezone.utc)
+
+
+class _Solicitud:
+    def __init__(self, **cabeceras):
+        self.headers = {nombre.replace("_", "-"): valor for nombre, valor in cabeceras.items()}
+
+
+@pytest.fixture
+def condicional(falsear_modulo, monkeypatch):
+    """endpoint.condicional con un model.methods falso (sin TensorFlow)."""
+    falsear_modulo(
+        "model.methods",
+        version_modelo=lambda: "v1",
+        marca_datos=lambda: "marca",
+        fecha_modificacion=lambda: MODIFICADO,
+    )
+    modulo = importlib.import_module("endpoint.condicional")
+    monkeypatch.setattr(modulo, "version_modelo", lambda: "v1")
+    monkeypatch.setattr(modulo, "marca_datos", lambda: "marca")
+    monkeypatch.setattr(modulo, "fecha_modificacion", lambda: MODIFICADO)
+    return modulo
+
+
+def test_etag_depende_de_modelo_y_parametros(condicional, monkeypatch):
+    etag = condicional.calcular_etag(("predict-all", "filas"))
+    assert etag.startswith('W/"')
+    assert etag == condicional.calcular_etag(("predict-all", "filas"))
+    assert etag != condicional.calcular_etag(("predict-all", "columnar"))
+
+    monkeypatch.setattr(condicional, "version_modelo", lambda: "v2")
+    assert etag != condicional.calcular_etag(("predict-all", "filas"))
+
+
+def test_if_none_match_devuelve_304(condicional):
+    etag = condicional.Condicional(None, ("p",)).etag
+    actual = condicional.Condicional(_Solicitud(if_none_match=f'"otro", {etag}'), ("p",))
+    assert actual.no_modificado()
+
+    respuesta = actual.respuesta_304()
+    assert respuesta.status_code == 304
+    assert respuesta.headers["etag"] == etag
+    assert respuesta.headers["last-modified"] == "Fri, 10 May 2024 12:30:00 GMT"
+
+
+def test_etag_fuerte_coincide_por_comparacion_debil(condicional):
+    etag = condicional.Condicional(None, ("p",)).etag
+    fuerte = etag[2:]
+    assert condicional.Condicional(_Solicitud(if_none_match=fuerte), ("p",)).no_modificado()
+
+
+def test_etag_distinto_no_es_304(condicional):
+    solicitud = _Solicitud(if_none_match='W/"viejo"', if_modified_since="Sat, 11 May 2024 00:00:00 GMT")
+    # If-None-Match tiene prioridad sobre If-Modified-Since
+    assert not condicional.Condicional(solicitud, ("p",)).no_modificado()
+
+
+def test_if_modified_since(condicional):
+    posterior = _Solicitud(if_modified_since="Fri, 10 May 2024 12:30:00 GMT")
+    anterior = _Solicitud(if_modified_since="Fri, 10 May 2024 12:29:59 GMT")
+    invalida = _Solicitud(if_modified_since="no es una fecha")
+    assert condicional.Condicional(posterior, ("p",)).no_modificado()
+    assert not condicional.Condicional(anterior, ("p",)).no_modificado()
+    assert not condicional.Condicional(invalida, ("p",)).no_modificado()
+
+
+def test_vigente_desde_invalida_la_ventana_de_ayer(condicional):
+    hoy = datetime(2024, 5, 11, tzinfo=timezone.utc)
+    solicitud = _Solicitud(if_modified_since="Fri, 10 May 2024 18:00:00 GMT")
+    assert condicional.Condicional(solicitud, ("p",)).no_modificado()
+    assert not condicional.Condicional(solicitud, ("p",), vigente_desde=hoy).no_modificado()
+
+
+def test_aplicar_copia_los_validadores(condicional):
+    actual = condicional.Condicional(None, ("p",))
+    response = Response()
+    resultado = actual.aplicar({"ok": True}, response)
+    assert resultado == {"ok": True}
+    assert response.headers["etag"] == actual.etag
+    assert response.headers["cache-control"] == condicional.CACHE_CONTROL
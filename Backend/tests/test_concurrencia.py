@@ -0,0 +1,115 @@
+"""Pruebas de SingleFlight y del control de admisión."""
+
+import asyncio
+
+import pytest
+from fastapi import HTTPException
+
+from endpoint.admision import ControlAdmision
+from endpoint.singleflight import SingleFlight
+
+
+def test_singleflight_comparte_el_computo_de_la_misma_clave():
+    llamadas = []
+
+    async def escenario():
+        vuelo = SingleFlight("prueba")
+
+        async def fabrica():
+            llamadas.append(1)
+            await asyncio.sleep(0.05)
+            return {"stock": 10}
+
+        resultados = await asyncio.gather(*(vuelo.ejecutar("producto-1", fabrica) for _ in range(5)))
+        return vuelo, resultados
+
+    vuelo, resultados = asyncio.run(escenario())
+    assert len(llamadas) == 1
+    assert all(r is resultados[0] for r in resultados)
+    assert vuelo._en_vuelo == {}
+
+
+def test_singleflight_claves_distintas_no_se_comparten():
+    llamadas = []
+
+    async def escenario():
+        vuelo = SingleFlight("prueba")
+
+        def fabrica(clave):
+            async def _fabrica():
+                llamadas.append(clave)
+                await asyncio.sleep(0.01)
+                return clave
+            return _fabrica
+
+        return await asyncio.gather(vuelo.ejecutar("a", fabrica("a")), vuelo.ejecutar("b", fabrica("b")))
+
+    assert asyncio.run(escenario()) == ["a", "b"]
+    assert sorted(llamadas) == ["a", "b"]
+
+
+def test_singleflight_sobrevive_a_la_cancelacion_del_primer_cliente():
+    async def escenario():
+        vuelo = SingleFlight("prueba")
+
+        async def fabrica():
+            await asyncio.sleep(0.05)
+            return 42
+
+        primero = asyncio.ensure_future(vuelo.ejecutar("clave", fabrica))
+        await asyncio.sleep(0)
+        segundo = asyncio.ensure_future(vuelo.ejecutar("clave", fabrica))
+        await asyncio.sleep(0)
+        primero.cancel()
+        return await segundo
+
+    assert asyncio.run(escenario()) == 42
+
+
+def test_admision_rechaza_con_429_si_la_cola_esta_llena():
+    async def escenario():
+        control = ControlAdmision("prueba", concurrentes=1, cola=1, espera_max_s=1.0)
+        inicio = await control.entrar()
+        en_cola = asyncio.ensure_future(control.entrar())
+        await asyncio.sleep(0)
+
+        with pytest.raises(HTTPException) as error:
+            await control.entrar()
+
+        control.salir(inicio)
+        control.salir(await en_cola)
+        return error.value, control
+
+    error, control = asyncio.run(escenario())
+    assert error.status_code == 429
+    assert int(error.headers["Retry-After"]) >= 1
+    assert control._activos == 0 and control._en_cola == 0
+
+
+def test_admision_responde_503_si_la_espera_se_agota():
+    async def escenario():
+        control = ControlAdmision("prueba", concurrentes=1, cola=4, espera_max_s=0.05)
+        inicio = await control.entrar()
+        with pytest.raises(HTTPException) as error:
+            await control.entrar()
+        control.salir(inicio)
+        return error.value, control
+
+    error, control = asyncio.run(escenario())
+    assert error.status_code == 503
+    assert control._en_cola == 0
+
+
+def test_admision_libera_el_cupo_aunque_falle_el_servicio():
+    async def escenario():
+        control = ControlAdmision("prueba", concurrentes=1, cola=0, espera_max_s=0.05)
+        with pytest.raises(ValueError):
+            async with control.admitir():
+                raise ValueError("fallo del endpoint")
+        async with control.admitir():
+            pass
+        return control
+
+    control = asyncio.run(escenario())
+    assert control._activos == 0
+    assert not control._semaforo.locked()
@@ -0,0 +1,121 @@
+"""Pruebas de la cola, la cancelación y los tipos exclusivos del gestor de trabajos."""
+
+import asyncio
+import threading
+import time
+
+import pytest
+
+from jobs.gestor import ColaLlena, GestorTrabajos, TrabajoCancelado
+
+
+@pytest.fixture
+def gestor(tmp_path):
+    gestor = GestorTrabajos(trabajadores=1, cola=1, historial=50, directorio=tmp_path)
+    yield gestor
+    gestor.apagar()
+
+
+def _esperar_estado(gestor, id_trabajo, estado, timeout=5.0):
+    limite = time.monotonic() + timeout
+    while time.monotonic() < limite:
+        if gestor.obtener(id_trabajo)["estado"] == estado:
+            return
+        time.sleep(0.01)
+    raise AssertionError(f"El trabajo {id_trabajo} no llegó a {estado}: {gestor.obtener(id_trabajo)}")
+
+
+def _bloqueante(liberar: threading.Event):
+    def fn(progreso):
+        while not liberar.wait(0.01):
+            progreso(0.5, "esperando")
+        return {"success": True}
+    return fn
+
+
+def test_rechaza_trabajos_con_la_cola_llena(gestor):
+    liberar = threading.Event()
+    try:
+        en_curso = gestor.enviar("reporte_csv", _bloqueante(liberar))
+        _esperar_estado(gestor, en_curso["id"], "en_curso")
+        pendiente = gestor.enviar("reporte_csv", _bloqueante(liberar))
+        assert pendiente["estado"] == "pendiente"
+
+        with pytest.raises(ColaLlena):
+            gestor.enviar("reporte_csv", _bloqueante(liberar))
+    finally:
+        liberar.set()
+
+    _esperar_estado(gestor, pendiente["id"], "completado")
+    assert gestor.obtener(en_curso["id"])["progreso"] == 1.0
+
+
+def test_cancela_pendientes_y_en_curso(gestor):
+    liberar = threading.Event()
+    en_curso = gestor.enviar("reporte_csv", _bloqueante(liberar))
+    _esperar_estado(gestor, en_curso["id"], "en_curso")
+    pendiente = gestor.enviar("reporte_csv", _bloqueante(liberar))
+
+    # El pendiente se cancela sin llegar a ejecutarse
+    assert gestor.cancelar(pendiente["id"])["estado"] == "cancelado"
+    # El que está en curso se detiene en su siguiente llamada a progreso()
+    gestor.cancelar(en_curso["id"])
+    _esperar_estado(gestor, en_curso["id"], "cancelado")
+
+    with pytest.raises(TrabajoCancelado):
+        asyncio.run(gestor.esperar(en_curso["id"]))
+    assert gestor.cancelar("no-existe") is None
+
+
+def test_fallos_quedan_registrados(gestor):
+    def falla(progreso):
+        raise ValueError("sin datos")
+
+    def falla_suave(progreso):
+        return {"success": False, "message": "modelo no encontrado"}
+
+    trabajo = gestor.enviar("reporte_csv", falla)
+    with pytest.raises(ValueError):
+        asyncio.run(gestor.esperar(trabajo["id"]))
+    assert gestor.obtener(trabajo["id"])["error"] == "sin datos"
+
+    suave = gestor.enviar("reporte_csv", falla_suave)
+    asyncio.run(gestor.esperar(suave["id"]))
+    assert gestor.obtener(suave["id"])["estado"] == "fallido"
+
+
+def test_tipos_exclusivos_no_se_solapan(tmp_path):
+    gestor = GestorTrabajos(trabajadores=4, cola=4, historial=50, directorio=tmp_path)
+    activos, maximo = [0], [0]
+    lock = threading.Lock()
+
+    def reentrenar(progreso):
+        with lock:
+            activos[0] += 1
+            maximo[0] = max(maximo[0], activos[0])
+        time.sleep(0.05)
+        with lock:
+            activos[0] -= 1
+        return {"success": True}
+
+    try:
+        trabajos = [gestor.enviar("reentrenamiento", reentrenar) for _ in range(3)]
+        for trabajo in trabajos:
+            asyncio.run(gestor.esperar(trabajo["id"]))
+    finally:
+        gestor.apagar()
+    assert maximo[0] == 1
+
+
+def test_recupera_trabajos_interrumpidos(tmp_path):
+    liberar = threading.Event()
+    gestor = GestorTrabajos(trabajadores=1, cola=1, historial=50, directorio=tmp_path)
+    trabajo = gestor.enviar("reporte_csv", _bloqueante(liberar))
+    _esperar_estado(gestor, trabajo["id"], "en_curso")
+
+    # Un gestor nuevo (reinicio del servidor) lee el estado persistido
+    recuperado = GestorTrabajos(trabajadores=1, cola=1, historial=50, directorio=tmp_path)
+    liberar.set()
+    gestor.apagar()
+    recuperado.apagar()
+    assert recuperado.obtener(trabajo["id"])["estado"] == "interrumpido"
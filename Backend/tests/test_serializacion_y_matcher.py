@@ -0,0 +1,79 @@
+"""Pruebas de la serialización de predicciones y de la segmentación de mensajes."""
+
+import importlib
+
+import numpy as np
+import pytest
+
+from endpoint.serializacion import matriz_a_respuesta
+
+PRODUCTOS = ["Laptop HP", "Mouse"]
+FECHAS = ["2024-01-01", "2024-01-02", "2024-01-03"]
+MATRIZ = np.array([
+    [10.456, 9.2, 8.0],
+    [5.0, 4.994, 3.5],
+])
+
+
+def test_filas_ordenadas_por_fecha_y_producto():
+    filas = matriz_a_respuesta(PRODUCTOS, FECHAS, MATRIZ, por_producto={"current_stock": np.array([12, 6])})
+    assert len(filas) == len(PRODUCTOS) * len(FECHAS)
+    assert [(f["date"], f["product_name"]) for f in filas[:3]] == [
+        ("2024-01-01", "Laptop HP"), ("2024-01-01", "Mouse"), ("2024-01-02", "Laptop HP")
+    ]
+    assert filas[0] == {"product_name": "Laptop HP", "predicted_stock": 10.46, "current_stock": 12, "date": "2024-01-01"}
+    assert filas[3]["predicted_stock"] == 4.99
+    assert isinstance(filas[0]["current_stock"], int)
+
+
+def test_columnar_equivale_a_filas():
+    extra = {"current_stock": np.array([12, 6])}
+    filas = matriz_a_respuesta(PRODUCTOS, FECHAS, MATRIZ, por_producto=extra)
+    columnas = matriz_a_respuesta(PRODUCTOS, FECHAS, MATRIZ, formato="columnar", por_producto=extra)
+
+    assert all(isinstance(v, list) for v in columnas.values())
+    reconstruidas = [
+        {nombre: columnas[nombre][k] for nombre in ("product_name", "predicted_stock", "current_stock", "date")}
+        for k in range(len(filas))
+    ]
+    assert reconstruidas == filas
+
+
+def test_entero_trunca_el_stock():
+    filas = matriz_a_respuesta(PRODUCTOS, FECHAS, MATRIZ, entero=True)
+    assert [f["predicted_stock"] for f in filas[:2]] == [10, 5]
+    assert all(isinstance(f["predicted_stock"], int) for f in filas)
+
+
+# ==================== SEGMENTACIÓN ====================
+
+@pytest.fixture
+def matcher(falsear_modulo):
+    """ai.matcher sin cargar SentenceTransformer (solo se usa al instanciar)."""
+    falsear_modulo("sentence_transformers", SentenceTransformer=object)
+    pytest.importorskip("sqlalchemy")
+    return importlib.import_module("ai.matcher")
+
+
+def test_segmenta_varias_intenciones(matcher):
+    mensaje = "cuáles son los más vendidos y cuándo se agota la Laptop HP"
+    assert matcher.segmentar_mensaje(mensaje) == [
+        "cuáles son los más vendidos", "cuándo se agota la Laptop HP"
+    ]
+
+
+def test_no_separa_enumeraciones_de_una_palabra(matcher):
+    assert matcher.segmentar_mensaje("stock de Laptop HP y Mouse") == ["stock de Laptop HP y Mouse"]
+
+
+def test_no_corta_fechas_ni_decimales(matcher):
+    assert matcher.segmentar_mensaje("predicción para el 25/12/2024 con 1,5 kg") == [
+        "predicción para el 25/12/2024 con 1,5 kg"
+    ]
+    assert matcher.segmentar_mensaje("ventas del 2024-12-25; stock de la Laptop HP") == [
+        "ventas del 2024-12-25", "stock de la Laptop HP"
+    ]
+
+
+def test_mensaje_vacio(matcher):
+    assert matcher.segmentar_mensaje("") == [""]
@@ -0,0 +1,83 @@
+"""
+Benchmark del cambio de velocidad
+=================================
+Compara AudioSegment.speedup (pydub) con WSOLA (tts/estiramiento.py) sobre
+audios de varias longitudes de texto, con la velocidad que usa /chat.
+
+Por defecto sintetiza los textos con gTTS (requiere red y ffmpeg). Con
+--sintetico usa una señal armónica con la duración aproximada de cada texto,
+sin red.
+
+USO:
+    python -m tts.benchmark_velocidad
+    python -m tts.benchmark_velocidad --sintetico --repeticiones 5
+"""
+
+import time
+
+import numpy as np
+from pydub import AudioSegment
+
+from tts.textToSpeech import sintetizar, cambiar_velocidad
+
+FRASE = "El inventario de la Laptop HP se agotará aproximadamente en tres semanas. "
+
+# Número de frases por caso: saludo, respuesta típica, FAQ larga, reporte leído
+LONGITUDES = [1, 4, 12, 36]
+
+# Duración aproximada de una frase en gTTS (segundos), para --sintetico
+SEGUNDOS_POR_FRASE = 4.5
+
+
+def _senal_sintetica(segundos, frecuencia=24000):
+    """Tono armónico con vibrato y envolvente silábica, parecido a voz."""
+    t = np.arange(int(segundos * frecuencia)) / frecuencia
+    f0 = 150 + 30 * np.sin(2 * np.pi * 0.5 * t)
+    fase = 2 * np.pi * np.cumsum(f0) / frecuencia
+    senal = sum(np.sin(h * fase) / h for h in range(1, 8)) * (0.5 + 0.5 * np.sin(2 * np.pi * 3 * t))
+    datos = (senal * 6000).astype(np.int16)
+    return AudioSegment(data=datos.tobytes(), sample_width=2, frame_rate=frecuencia, channels=1)
+
+
+def _medir(audio, velocidad, metodo, repeticiones):
+    tiempos = []
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        resultado = cambiar_velocidad(audio, velocidad, metodo=metodo)
+        tiempos.append((time.perf_counter() - inicio) * 1000)
+    return min(tiempos), len(resultado) / 1000
+
+
+def benchmark(velocidad=1.4, repeticiones=3, sintetico=False):
+    print(f"\n🔬 Benchmark de cambio de velocidad (x{velocidad}, mejor de {repeticiones})\n")
+    print(f"   {'frases':>6} {'audio':>8} {'pydub':>11} {'wsola':>11} {'mejora':>7} {'salida pydub/wsola':>20}")
+    print("=" * 70)
+
+    filas = []
+    for frases in LONGITUDES:
+        if sintetico:
+            audio = _senal_sintetica(frases * SEGUNDOS_POR_FRASE)
+        else:
+            audio = sintetizar(FRASE * frases)
+
+        ms_pydub, dur_pydub = _medir(audio, velocidad, "pydub", repeticiones)
+        ms_wsola, dur_wsola = _medir(audio, velocidad, "wsola", repeticiones)
+        filas.append({"frases": frases, "segundos": len(audio) / 1000,
+                      "pydub_ms": ms_pydub, "wsola_ms": ms_wsola})
+        print(f"   {frases:>6} {len(audio) / 1000:>7.1f}s {ms_pydub:>9.1f}ms {ms_wsola:>9.1f}ms "
+              f"{ms_pydub / ms_wsola:>6.1f}x {dur_pydub:>9.2f}s/{dur_wsola:.2f}s")
+
+    print("=" * 70)
+    return filas
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Benchmark de pydub speedup vs WSOLA")
+    parser.add_argument("--velocidad", type=float, default=1.4)
+    parser.add_argument("--repeticiones", type=int, default=3)
+    parser.add_argument("--sintetico", action="store_true", help="Usar una señal sintética en vez de gTTS")
+    args = parser.parse_args()
+
+    benchmark(args.velocidad, args.repeticiones, args.sintetico)
@@ -1,27 +1,76 @@
 from gtts import gTTS
 from pydub import AudioSegment
 from pydub.playback import play
-import os
+import io
+import wave
+
+from tts.estiramiento import cambiar_velocidad_wsola
+
+
+def sintetizar(texto, idioma='es', voz='com'):
+    """
+    Audio de gTTS decodificado una sola vez a PCM en memoria.
+
+    El MP3 de gTTS se escribe en un buffer (sin archivo temporal) y se
+    decodifica con ffmpeg; el resto del pipeline trabaja sobre el PCM.
+
+    Args:
+        voz: Dominio de Google Translate (tld de gTTS), define el acento ("com", "com.mx", "es")
+    """
+    mp3 = io.BytesIO()
+    gTTS(text=texto, lang=idioma, tld=voz, slow=False).write_to_fp(mp3)
+    mp3.seek(0)
+    return AudioSegment.from_file(mp3, format="mp3")
+
+
+def cambiar_velocidad(audio, velocidad, metodo="wsola"):
+    """
+    Cambia la velocidad manteniendo el tono.
+
+    Args:
+        metodo: "wsola" (NumPy, tts/estiramiento.py) o "pydub" (AudioSegment.speedup)
+    """
+    if velocidad == 1:
+        return audio
+    if metodo == "pydub":
+        return audio.speedup(playback_speed=velocidad)
+    return cambiar_velocidad_wsola(audio, velocidad)
+
+
+def wav_bytes(audio, frecuencia=None, canales=None):
+    """
+    Codifica el PCM como WAV de 16 bits en memoria (sin ffmpeg).
+
+    Args:
+        audio: AudioSegment
+        frecuencia: Frecuencia de muestreo de salida (None = la del audio)
+        canales: Número de canales de salida (None = los del audio)
+    """
+    if frecuencia and audio.frame_rate != frecuencia:
+        audio = audio.set_frame_rate(frecuencia)
+    if canales and audio.channels != canales:
+        audio = audio.set_channels(canales)
+    if audio.sample_width != 2:
+        audio = audio.set_sample_width(2)
+
+    buffer = io.BytesIO()
+    with wave.open(buffer, "wb") as wav:
+        wav.setnchannels(audio.channels)
+        wav.setsampwidth(audio.sample_width)
+        wav.setframerate(audio.frame_rate)
+        wav.writeframes(audio.raw_data)
+    return buffer.getvalue()
+
 
 def tts(texto, idioma='es', velocidad=1.4, guardar_archivo=True, nombre_archivo="audios/audio.mp3"):
-    # Generar audio con gTTS
-    tts = gTTS(text=texto, lang=idioma, slow=False)
-    
-    # Guardar temporalmente
-    archivo_temp = "temp_audio.mp3"
-    tts.save(archivo_temp)
-    
-    # Cargar y modificar velocidad con pydub
-    audio = AudioSegment.from_mp3(archivo_temp)
+    # Generar audio con gTTS (decodificado una vez, en memoria)
+    audio = sintetizar(texto, idioma)
     
     # Cambiar velocidad manteniendo el tono
-    audio_rapido = audio.speedup(playback_speed=velocidad)
+    audio_rapido = cambiar_velocidad(audio, velocidad)
     
     if guardar_archivo:
         audio_rapido.export(nombre_archivo, format="mp3")
         print(f"Audio guardado en: {nombre_archivo}")
     
-    # Limpiar archivo temporal
-    os.remove(archivo_temp)
-    
-    return audio_rapido
\ No newline at end of file
+    return audio_rapido